@@ -1,9 +1,22 @@
 # core/urls.py
+from django.conf import settings
 from django.urls import path
 from core import views
 from core.views import search_receipts
 # from core.views import generat_receipt_pdf
-from core.views.ContactLookupview import ContactLookupView
+from core.views.DocumentDownloadView import DocumentFileDownloadView
+from core.views.ExportView import (
+    ExportJobDetailView,
+    ExportJobDownloadView,
+    ExportJobListCreateView,
+    ReceiptCSVExportView,
+)
+from core.views.ChunkedUploadView import (
+    ChunkedUploadCommitView,
+    ChunkedUploadDetailView,
+    ChunkedUploadInitView,
+)
+from core.views.ContactLookupview import ContactLookupView, ContactNameSearchView
 from core.views.Receipt_delete import ReceiptDeleteView, ReceiptUpdateByNumberView
 from core.views.RegiserandDisplayDocumentsView import (
     DocumentListView,
@@ -21,7 +34,10 @@ from core.views.ReceiptDisplayView import (
 )
 from core.views.Search import SearchView
 # from core.views.generat_receipt_pdf import generate_receipts_pdf
-from core.views.CheckReceiptExistsView import CheckReceiptExistsView
+from core.views.CheckReceiptExistsView import (
+    BatchCheckReceiptExistsView,
+    CheckReceiptExistsView,
+)
 from core.views.lookupviews import (
     ReceiptKindListAPIView,
     ReceiptKindCreateView,
@@ -31,6 +47,7 @@ from core.views.lookupviews import (
     ReceiptCategoryCreateView,
     ReceiptTypeListAPIView,
     ReceiptTypeCreateView,
+    LookupTablesView,
 )
 from core.views.Draft_views import DraftsView
 
@@ -51,9 +68,15 @@ urlpatterns = [
         UploadReceiptDocumentView.as_view(),
         name="upload-document",
     ),
+    # Resumable (chunked) uploads of large scans
+    path("uploads", ChunkedUploadInitView.as_view(), name="chunked-upload-init"),
+    path("uploads/commit", ChunkedUploadCommitView.as_view(), name="chunked-upload-commit"),
+    path("uploads/<str:upload_id>", ChunkedUploadDetailView.as_view(), name="chunked-upload-detail"),
     path("receipts", ReceiptListView.as_view(), name="receipt-list"),
+    path("receipts/export.csv", ReceiptCSVExportView.as_view(), name="receipt-export-csv"),
     path("receipts/<int:id>", ReceiptDetailView.as_view(), name="receipt-detail"),
     # Lookup data
+    path("lookups", LookupTablesView.as_view(), name="lookup-tables"),
     path("receipt-kinds", ReceiptKindListAPIView.as_view(), name="receipt-kind-list"),
     path(
         "receipt-kinds/new",
@@ -61,6 +84,7 @@ urlpatterns = [
         name="receipt-kind-create",
     ),
     path('check-receipt-exists/', CheckReceiptExistsView.as_view(), name='check-receipt-exists'),
+    path('check-receipts-exist/', BatchCheckReceiptExistsView.as_view(), name='check-receipts-exist'),
     path('drafts', DraftsView.as_view(), name='drafts'),
 
     path(
@@ -98,6 +122,15 @@ urlpatterns = [
         DocumentListView.as_view(),
         name="retriving reciept documetns",
     ),
+    path(
+        "get-documents/<int:id>/files/<str:kind>",
+        DocumentFileDownloadView.as_view(),
+        name="document-file-download",
+    ),
+    # Export jobs (run by `manage.py runworker`)
+    path("exports", ExportJobListCreateView.as_view(), name="export-list-create"),
+    path("exports/<int:id>", ExportJobDetailView.as_view(), name="export-detail"),
+    path("exports/<int:id>/download", ExportJobDownloadView.as_view(), name="export-download"),
     path(
         "receipts/search/",
         search_receipts.ReceiptSearchView.as_view(),
@@ -130,6 +163,7 @@ urlpatterns = [
         name="receipt-category-create",
     ),
      path('contacts/lookup/', ContactLookupView.as_view(), name='contact-lookup'),
+    path('contacts/search/', ContactNameSearchView.as_view(), name='contact-name-search'),
     path(
         "upload-receipt-documents",
         UploadReceiptDocumentView.as_view(),
@@ -142,3 +176,11 @@ urlpatterns = [
         name="receipt-type-create",
     ),
 ]
+
+# Under ASGI (global_config/asgi.py) the read endpoints are served by their
+# async variants; the API docs keep describing the sync views
+sync_urlpatterns = urlpatterns
+if settings.ASYNC_READ_VIEWS:
+    from core.views.AsyncReadViews import with_async_views
+
+    urlpatterns = with_async_views(sync_urlpatterns)
@@ -7,6 +7,7 @@ class CoreConfig(AppConfig):
 
     def ready(self):
         import core.signals # Keep signals!
+        import core.tasks  # noqa: F401  (registers the TaskQueue tasks)
 
         # TODO: Remove after full migration to local storage
         # import cloudinary
@@ -0,0 +1,44 @@
+# core/benchmark_app.py
+"""
+WSGI / ASGI entry points for `manage.py benchmark_concurrency`: the
+global_config applications, plus BENCHMARK_DB_LATENCY_MS of sleep before
+every query, standing in for the round trip to a remote database (e.g.
+when benchmarking against SQLite on the same machine).
+
+    gunicorn core.benchmark_app:wsgi
+    uvicorn core.benchmark_app:asgi
+"""
+
+import os
+import time
+
+from django.db.backends.signals import connection_created
+
+LATENCY = float(os.environ.get("BENCHMARK_DB_LATENCY_MS") or 0) / 1000
+
+
+def _delay(execute, sql, params, many, context):
+    time.sleep(LATENCY)
+    return execute(sql, params, many, context)
+
+
+def _add_latency(sender, connection, **kwargs):
+    if _delay not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_delay)
+
+
+if LATENCY:
+    connection_created.connect(_add_latency)
+
+
+def __getattr__(name):
+    # Imported on demand: asgi.py switches on the async views before settings load
+    if name == "wsgi":
+        from global_config.wsgi import application
+
+        return application
+    if name == "asgi":
+        from global_config.asgi import application
+
+        return application
+    raise AttributeError(name)
@@ -0,0 +1,53 @@
+# core/management/commands/archive_receipts.py
+import math
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.services.receipt_archive import ReceiptArchive
+from core.services.task_queue import TaskQueue
+
+
+class Command(BaseCommand):
+    help = (
+        "Move the receipts of closed fiscal years to the cold archive, or back "
+        "(see core/services/receipt_archive.py). Without --year, archives every "
+        "year older than RECEIPT_ARCHIVE_KEEP_YEARS (cron-safe). The work is "
+        "queued for runworker in chunks; a stopped run resumes when started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--year", type=int, action="append", dest="years", metavar="YEAR",
+            help="Fiscal year (the calendar year it starts in); repeatable. Must be closed.",
+        )
+        parser.add_argument("--restore", action="store_true", help="Put archived years back (needs --year)")
+        parser.add_argument(
+            "--now", action="store_true",
+            help="Run the chunks in this process instead of queueing them",
+        )
+
+    def handle(self, *args, **options):
+        restore, years = options["restore"], options["years"]
+        if restore and not years:
+            raise CommandError(
+                f"--restore needs --year (archived: {', '.join(map(str, ReceiptArchive.archived_years())) or 'none'})."
+            )
+        if not years:
+            years = ReceiptArchive.archivable_years()
+            if not years:
+                self.stdout.write(f"Nothing to archive before FY{ReceiptArchive.cutoff_year()}.")
+                return
+        if not restore:
+            open_years = [year for year in years if not ReceiptArchive.is_closed(year)]
+            if open_years:
+                raise CommandError(f"Fiscal year {open_years[0]} is not closed yet.")
+
+        for year in years:
+            if options["now"]:
+                moved, _ = ReceiptArchive.run(year, restore=restore, time_budget=math.inf, log=self.stdout.write)
+                self.stdout.write(self.style.SUCCESS(
+                    f"FY{year}: {moved} receipts {'restored' if restore else 'archived'}."
+                ))
+            else:
+                TaskQueue.enqueue("archive_receipts", {"fiscal_year": year, "restore": restore})
+                self.stdout.write(f"FY{year}: queued ({'restore' if restore else 'archive'}).")
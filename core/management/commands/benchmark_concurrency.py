@@ -0,0 +1,218 @@
+# core/management/commands/benchmark_concurrency.py
+import http.client
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.models.contact import Contact
+from core.services.synthetic_data import SyntheticDataGenerator
+
+PATHS = [
+    "/api/receipts",
+    "/api/receipts/search/?query=trading",
+    "/api/receipts/search/?group_by=month",
+    "/api/get-documents",
+    "/api/contacts/lookup/?tin_prefix=8",
+    "/api/lookups",
+]
+
+SERVERS = {
+    # Same worker count for both; what differs is requests in flight per worker
+    "wsgi": lambda workers, port: [
+        sys.executable, "-m", "gunicorn", "core.benchmark_app:wsgi",
+        "--workers", str(workers), "--bind", f"127.0.0.1:{port}", "--timeout", "120",
+    ],
+    "asgi": lambda workers, port: [
+        sys.executable, "-m", "uvicorn", "core.benchmark_app:asgi",
+        "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+        "--log-level", "warning", "--no-access-log",
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Throughput and latency of the read endpoints under concurrent load: "
+        "gunicorn sync workers (WSGI, DRF views) against uvicorn workers "
+        "(ASGI, core/views/AsyncReadViews.py), same worker count. Serves the "
+        "configured database, which must hold the company (see "
+        "generate_synthetic_data); --db-latency-ms adds a per-query delay "
+        "when that database is local. Results are written as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--servers", nargs="+", choices=list(SERVERS), default=list(SERVERS))
+        parser.add_argument("--workers", type=int, default=2, help="Worker processes per server")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Clients in flight")
+        parser.add_argument("--requests", type=int, default=300, help="Requests per concurrency level")
+        parser.add_argument("--db-latency-ms", type=float, default=0, help="Simulated round trip per query")
+        parser.add_argument(
+            "--parallel-queries", action="store_true",
+            help="ASYNC_PARALLEL_QUERIES for the ASGI server (independent queries on separate connections)",
+        )
+        parser.add_argument("--tin", default=SyntheticDataGenerator.company_tin(0), help="Company to query as")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--output", help="JSON file (default: benchmark-concurrency-<commit>-<db vendor>.json)")
+
+    # ========================
+    # Servers
+    # ========================
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def start(self, server, options, log):
+        env = {
+            **os.environ,
+            "ASYNC_READ_VIEWS": str(server == "asgi"),
+            "ASYNC_PARALLEL_QUERIES": str(server == "asgi" and options["parallel_queries"]),
+            "BENCHMARK_DB_LATENCY_MS": str(options["db_latency_ms"]),
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "global_config.settings"),
+        }
+        return subprocess.Popen(
+            SERVERS[server](options["workers"], options["port"]),
+            cwd=settings.BASE_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_until_ready(self, process, port, headers, log, timeout=60):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                log.seek(0)
+                raise CommandError(f"Server exited with {process.returncode}:\n{log.read().decode()[-2000:]}")
+            try:
+                status, _ = self.request(http.client.HTTPConnection("127.0.0.1", port, timeout=5), PATHS[-1], headers)
+                if status == 200:
+                    return
+            except OSError:
+                pass
+            time.sleep(0.25)
+        raise CommandError(f"Server not answering on port {port} after {timeout}s")
+
+    # ========================
+    # Load
+    # ========================
+    @staticmethod
+    def request(conn, path, headers):
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status, response
+
+    def run_level(self, port, headers, concurrency, total):
+        """Fire `total` requests (PATHS round-robin) from `concurrency` keep-alive clients."""
+        counter = itertools.count()
+        lock = threading.Lock()
+
+        def client():
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+            timings, errors = [], 0
+            while True:
+                with lock:
+                    index = next(counter)
+                if index >= total:
+                    break
+                started = time.perf_counter()
+                try:
+                    status, _ = self.request(conn, PATHS[index % len(PATHS)], headers)
+                except (OSError, http.client.HTTPException):
+                    status = None
+                    conn.close()
+                    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                timings.append((time.perf_counter() - started) * 1000)
+                errors += status != 200
+            conn.close()
+            return timings, errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            results = list(pool.map(lambda _: client(), range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(t for client_timings, _ in results for t in client_timings)
+        return {
+            "concurrency": concurrency,
+            "requests": len(timings),
+            "errors": sum(errors for _, errors in results),
+            "requests_per_second": round(len(timings) / elapsed, 1),
+            "ms": {
+                "median": round(statistics.median(timings), 2),
+                "p95": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+                "max": round(timings[-1], 2),
+            },
+        }
+
+    # ========================
+    # Entry point
+    # ========================
+    def handle(self, *args, **options):
+        tin = options["tin"]
+        if not Contact.objects.filter(tin_number=tin).exists():
+            raise CommandError(f"No company {tin} in the database; run generate_synthetic_data first.")
+        headers = {"Authorization": f"Bearer {SyntheticDataGenerator.token(tin)}"}
+        port = options["port"]
+
+        self.stdout.write(
+            f"{connection.vendor}, {options['workers']} workers, "
+            f"{options['db_latency_ms']:g} ms simulated query latency, {len(PATHS)} endpoints\n"
+        )
+        results = []
+        for server in options["servers"]:
+            with tempfile.TemporaryFile() as log:
+                process = self.start(server, options, log)
+                try:
+                    self.wait_until_ready(process, port, headers, log)
+                    self.run_level(port, headers, options["workers"] * 2, len(PATHS) * options["workers"] * 2)
+                    for concurrency in options["concurrency"]:
+                        result = {"server": server, **self.run_level(port, headers, concurrency, options["requests"])}
+                        results.append(result)
+                        self.stdout.write(
+                            f"{server}  {concurrency:4d} clients  {result['requests_per_second']:8.1f} req/s  "
+                            f"{result['ms']['median']:8.1f} ms median  {result['ms']['p95']:8.1f} ms p95  "
+                            f"{result['errors']} errors"
+                        )
+                finally:
+                    process.terminate()
+                    try:
+                        process.wait(timeout=30)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+
+        commit = self.git_commit()
+        report = {
+            "meta": {
+                "commit": commit,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "workers": options["workers"],
+                "db_latency_ms": options["db_latency_ms"],
+                "parallel_queries": options["parallel_queries"],
+                "company_tin": tin,
+                "paths": PATHS,
+            },
+            "results": results,
+        }
+        output = options["output"] or f"benchmark-concurrency-{commit or 'local'}-{connection.vendor}.json"
+        with open(output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {output}"))
@@ -0,0 +1,262 @@
+# core/management/commands/benchmark_endpoints.py
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from core.models.contact import Contact
+from core.models.Documents import ReceiptDocument
+from core.models.item import Item
+from core.models.look_up_tables import ReceiptCatagory, ReceiptKind, ReceiptName, ReceiptType
+from core.services.synthetic_data import SyntheticDataGenerator
+
+GROUP_BYS = ["category", "kind", "name", "type", "issued_to", "issued_by", "calendar_type", "month", "year", "vat_status"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the core endpoints (create_receipt, receipt search, document and "
+        "receipt lists, draft autosave, uploads) and count their queries. "
+        "By default runs in a throwaway test database filled with synthetic "
+        "data (SQLite or Postgres, whatever DATABASES points at); results are "
+        "written as JSON so runs on different commits can be compared."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--receipts", type=int, default=1000, help="Receipts in the dataset")
+        parser.add_argument("--lines", type=int, default=3, help="Average lines per receipt")
+        parser.add_argument("--repeat", type=int, default=10, help="Timed runs per case (after 1 warm-up)")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="JSON file (default: benchmark-<commit>-<db vendor>.json)")
+        parser.add_argument("--only", nargs="*", help="Run only cases whose name starts with one of these")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse / keep the test database")
+        parser.add_argument(
+            "--tin",
+            help="Benchmark this existing company in the configured database instead "
+                 "(no test database, no generated data; writes are NOT rolled back)",
+        )
+        parser.add_argument(
+            "--locmem-cache", action="store_true",
+            help="Use an in-process cache instead of CACHES (e.g. no Redis on this machine)",
+        )
+
+    # ========================
+    # Setup
+    # ========================
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    # ========================
+    # Measurements
+    # ========================
+    def measure(self, name, method, path, repeat, make_request, expected_status):
+        """Warm up once, then time `repeat` runs; the query count is the last run's."""
+        timings, queries, status = [], 0, None
+        for run in range(repeat + 1):
+            with contextlib.redirect_stdout(io.StringIO()):  # Views and JWT decoding print()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = make_request(run)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                    elapsed = time.perf_counter() - started
+            status = response.status_code
+            if status != expected_status:
+                raise CommandError(
+                    f"{name}: {method} {path} returned {status}, expected {expected_status}: "
+                    f"{getattr(response, 'content', b'')[:300]!r}"
+                )
+            if run:
+                timings.append(elapsed * 1000)
+                queries = len(captured)
+
+        timings.sort()
+        result = {
+            "name": name,
+            "method": method,
+            "path": path,
+            "status": status,
+            "queries": queries,
+            "runs": repeat,
+            "ms": {
+                "min": round(timings[0], 2),
+                "median": round(statistics.median(timings), 2),
+                "p95": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 2),
+                "max": round(timings[-1], 2),
+            },
+        }
+        self.stdout.write(
+            f"{name:32s} {result['ms']['median']:9.1f} ms median  "
+            f"{result['ms']['p95']:9.1f} ms p95  {queries:5d} queries"
+        )
+        return result
+
+    def cases(self, client, tin, run_id):
+        """(name, method, path, make_request(run), expected status) for every benchmarked call."""
+        company = Contact.objects.get(tin_number=tin)
+        supplier = Contact.objects.exclude(pk=company.pk).order_by("id").first()
+        items = list(Item.objects.order_by("id")[:5])
+        lookups = {
+            model: model.objects.order_by("id").values_list("id", flat=True).first()
+            for model in (ReceiptCatagory, ReceiptKind, ReceiptName, ReceiptType)
+        }
+        document = (
+            ReceiptDocument.objects.filter(for_company=company, status="uploaded", linked_receipt__isnull=True)
+            .select_related("main_receipt").order_by("id").first()
+        )
+        if supplier is None or not items or None in lookups.values():
+            raise CommandError(f"Company {tin} has no suppliers, items or lookup rows to benchmark with.")
+
+        def create_receipt(run):
+            payload = {
+                "issued_by_details": {"tin_number": supplier.tin_number, "name": supplier.name},
+                "issued_to_details": {"tin_number": company.tin_number, "name": company.name},
+                "receipt_number": f"BN{run_id}{run:05d}",
+                "receipt_date": datetime.now().date().isoformat(),
+                "calendar_type": "gregorian",
+                "receipt_category_id": lookups[ReceiptCatagory],
+                "receipt_kind_id": lookups[ReceiptKind],
+                "receipt_type_id": lookups[ReceiptType],
+                "receipt_name_id": lookups[ReceiptName],
+                "payment_method_type": "cash",
+                "items": [
+                    {
+                        "item_code": item.item_code,
+                        "item_description": item.item_description,
+                        "unit_cost": str(item.unit_cost),
+                        "quantity": "2",
+                        "tax_type": item.tax_type,
+                    }
+                    for item in items
+                ],
+            }
+            return client.post("/api/create-receipt", payload, content_type="application/json")
+
+        def upload(run):
+            return client.post("/api/upload-receipt-documents", {
+                "main_receipt_data.receipt_number": f"BU{run_id}{run:05d}",
+                "main_receipt_data.main_receipt": SimpleUploadedFile(
+                    "scan.pdf", f"%PDF-1.4 benchmark {run_id} {run}".encode() + os.urandom(64 * 1024),
+                    content_type="application/pdf",
+                ),
+            })
+
+        def get(path):
+            return lambda run: client.get(path)
+
+        cases = [
+            ("create_receipt", "POST", "/api/create-receipt", create_receipt, 201),
+            ("search", "GET", "/api/receipts/search/", get("/api/receipts/search/"), 200),
+            ("search_query", "GET", "/api/receipts/search/?query=trading",
+             get("/api/receipts/search/?query=trading"), 200),
+        ]
+        cases += [
+            (f"search_group_by_{group}", "GET", f"/api/receipts/search/?group_by={group}",
+             get(f"/api/receipts/search/?group_by={group}"), 200)
+            for group in GROUP_BYS
+        ]
+        cases += [
+            ("document_list", "GET", "/api/get-documents", get("/api/get-documents"), 200),
+            ("receipt_list", "GET", "/api/receipts", get("/api/receipts"), 200),
+            ("upload", "POST", "/api/upload-receipt-documents", upload, 201),
+        ]
+        if document is not None:
+            number = document.main_receipt.receipt_number
+            cases.append((
+                "draft_patch", "PATCH", "/api/drafts",
+                lambda run: client.patch(
+                    "/api/drafts",
+                    {"receipt_number": number, "notes": f"autosave {run}"},
+                    content_type="application/json",
+                ),
+                200,
+            ))
+        return cases
+
+    # ========================
+    # Entry point
+    # ========================
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        settings_overrides = {"MEDIA_ROOT": tempfile.mkdtemp(prefix="benchmark-media-")}
+        if options["locmem_cache"]:
+            settings_overrides["CACHES"] = {
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+            }
+
+        setup_test_environment()
+        old_config = None
+        dataset = None
+        try:
+            with override_settings(**settings_overrides):
+                if options["tin"]:
+                    tin = options["tin"]
+                else:
+                    old_config = setup_databases(verbosity=0, interactive=False, keepdb=options["keepdb"])
+                    tin = SyntheticDataGenerator.company_tin(0, options["seed"])
+                    if not Contact.objects.filter(tin_number=tin).exists():
+                        started = time.perf_counter()
+                        dataset = SyntheticDataGenerator(seed=options["seed"]).generate(
+                            receipts=options["receipts"], lines=options["lines"]
+                        )
+                        self.stdout.write(
+                            f"Generated {dataset['receipts']} receipts / {dataset['lines']} lines "
+                            f"in {time.perf_counter() - started:.1f}s"
+                        )
+
+                client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(tin)}")
+                run_id = f"{int(time.time()) % 100000:05d}"
+                self.stdout.write(f"{connection.vendor}, company {tin}, {repeat} runs per case\n")
+                results = [
+                    self.measure(name, method, path, repeat, make_request, expected)
+                    for name, method, path, make_request, expected in self.cases(client, tin, run_id)
+                    if not options["only"] or name.startswith(tuple(options["only"]))
+                ]
+        finally:
+            if old_config is not None:
+                teardown_databases(old_config, verbosity=0, keepdb=options["keepdb"])
+            teardown_test_environment()
+
+        commit = self.git_commit()
+        report = {
+            "meta": {
+                "commit": commit,
+                "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "database": connection.vendor,
+                "django": django.get_version(),
+                "python": platform.python_version(),
+                "repeat": repeat,
+                "company_tin": tin,
+                "dataset": dataset,
+            },
+            "results": results,
+        }
+        output = options["output"] or f"benchmark-{commit or 'local'}-{connection.vendor}.json"
+        with open(output, "w") as handle:
+            json.dump(report, handle, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {output}"))
@@ -0,0 +1,125 @@
+# core/management/commands/benchmark_renderers.py
+import gzip
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from global_config.middleware import CompressionMiddleware, brotli
+from global_config.renderers import FastJSONRenderer, orjson
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark JSON rendering and compressed size for a synthetic "
+        "receipt search result (same row shape as /api/receipts/search/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--receipts", type=int, default=10_000)
+        parser.add_argument("--lines", type=int, default=3, help="Lines per receipt")
+        parser.add_argument("--repeat", type=int, default=5, help="Best of N runs")
+        parser.add_argument("--seed", type=int, default=42)
+
+    # ========================
+    # Synthetic data
+    # ========================
+    def build_rows(self, receipts, lines, seed):
+        rng = random.Random(seed)
+        start = date(2024, 1, 1)
+        rows = []
+        for i in range(receipts):
+            items = []
+            for j in range(lines):
+                quantity = Decimal(rng.randint(1, 50))
+                unit_cost = Decimal(rng.randint(100, 100_000)) / 100
+                subtotal = quantity * unit_cost
+                tax = (subtotal * Decimal("0.15")).quantize(Decimal("0.01"))
+                items.append({
+                    "item_code": f"ITM-{i % 500:05d}-{j}",
+                    "item_description": f"Item {i % 500} line {j}",
+                    "quantity": float(quantity),
+                    "unit_cost": float(unit_cost),
+                    "subtotal": float(subtotal),
+                    "tax_type": "VAT",
+                    "tax_amount": float(tax),
+                    "total": float(subtotal + tax),
+                })
+            subtotal = sum(item["subtotal"] for item in items)
+            tax = sum(item["tax_amount"] for item in items)
+            rows.append({
+                "receipt_number": f"INV-{i:07d}",
+                "receipt_date": start + timedelta(days=i % 365),
+                "calendar_type": "Gregorian",
+                "issued_by": f"Supplier {i % 200}",
+                "issued_to": "Buyer PLC",
+                "category": rng.choice(["Revenue", "Expense", "CRV"]),
+                "kind": "Sales",
+                "name": "Cash Sales",
+                "type": "Local",
+                "subtotal": subtotal,
+                "tax": tax,
+                "total": subtotal + tax,
+                "claimable_vat": tax,
+                "non_claimable_vat": 0.0,
+                "is_vat_expired": False,
+                "reason": None,
+                "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+                "items": items,
+            })
+        return {"count": receipts, "results": rows}
+
+    # ========================
+    # Measurements
+    # ========================
+    def best_of(self, repeat, func):
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    def handle(self, *args, **options):
+        data = self.build_rows(options["receipts"], options["lines"], options["seed"])
+        repeat = options["repeat"]
+        self.stdout.write(
+            f"{options['receipts']} receipts x {options['lines']} lines, best of {repeat}\n"
+        )
+
+        stdlib_time, stdlib_body = self.best_of(repeat, lambda: JSONRenderer().render(data))
+        self.stdout.write(f"JSONRenderer (stdlib)   {stdlib_time * 1000:9.1f} ms")
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson not installed: FastJSONRenderer = stdlib"))
+            body = stdlib_body
+        else:
+            fast_time, body = self.best_of(repeat, lambda: FastJSONRenderer().render(data))
+            self.stdout.write(
+                f"FastJSONRenderer        {fast_time * 1000:9.1f} ms  "
+                f"({stdlib_time / fast_time:.1f}x faster)"
+            )
+
+        middleware = CompressionMiddleware
+        self.stdout.write("")
+        self.stdout.write(f"identity                {len(body):12,d} bytes")
+        gzip_time, gzipped = self.best_of(
+            repeat, lambda: gzip.compress(body, compresslevel=middleware.gzip_level, mtime=0)
+        )
+        self.stdout.write(
+            f"gzip (level {middleware.gzip_level})          {len(gzipped):12,d} bytes  "
+            f"{len(gzipped) / len(body):6.1%}  {gzip_time * 1000:7.1f} ms"
+        )
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("brotli not installed: br is never negotiated"))
+        else:
+            br_time, compressed = self.best_of(
+                repeat, lambda: brotli.compress(body, quality=middleware.brotli_quality)
+            )
+            self.stdout.write(
+                f"br (quality {middleware.brotli_quality})          {len(compressed):12,d} bytes  "
+                f"{len(compressed) / len(body):6.1%}  {br_time * 1000:7.1f} ms"
+            )
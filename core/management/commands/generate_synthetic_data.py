@@ -0,0 +1,43 @@
+# core/management/commands/generate_synthetic_data.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.services.synthetic_data import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic tenants (companies, contacts, "
+        "items, receipts with lines, uploaded documents, drafts) using bulk inserts. "
+        "For benchmarks and load tests; never run against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1)
+        parser.add_argument("--contacts", type=int, default=200, help="Shared supplier/customer pool")
+        parser.add_argument("--items", type=int, default=500, help="Catalog items")
+        parser.add_argument("--receipts", type=int, default=1000, help="Receipts per company")
+        parser.add_argument("--lines", type=int, default=3, help="Average lines per receipt")
+        parser.add_argument("--documents", type=int, default=50, help="Unlinked uploads per company")
+        parser.add_argument("--drafts", type=int, default=20, help="Drafts per company (<= documents)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=42, help="Same seed, same data; change it to add more")
+
+    def handle(self, *args, **options):
+        generator = SyntheticDataGenerator(seed=options["seed"], batch_size=options["batch_size"])
+        started = time.perf_counter()
+        counts = generator.generate(
+            companies=options["companies"],
+            contacts=options["contacts"],
+            items=options["items"],
+            receipts=options["receipts"],
+            lines=options["lines"],
+            documents=options["documents"],
+            drafts=options["drafts"],
+            log=self.stdout.write,
+        )
+        elapsed = time.perf_counter() - started
+        summary = ", ".join(f"{count} {name}" for name, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f"Created {summary} in {elapsed:.1f}s."))
+        self.stdout.write(f"First company TIN: {generator.company_tin(0, options['seed'])}")
@@ -0,0 +1,22 @@
+# core/management/commands/merge_temp_items.py
+from django.core.management.base import BaseCommand
+
+from core.services.item_catalog import merge_temp_items
+
+
+class Command(BaseCommand):
+    help = (
+        "Merge legacy TEMP-<receipt>-<index> items into canonical items keyed by "
+        "their (description, unit, tax_type, gl_account) fingerprint. Safe to re-run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        stats = merge_temp_items(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Promoted {stats['promoted']} canonical items, merged {stats['merged']} duplicates."
+            )
+        )
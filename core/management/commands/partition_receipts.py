@@ -0,0 +1,76 @@
+# core/management/commands/partition_receipts.py
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.services.receipt_partitions import ReceiptPartitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Fiscal-year range partitions of core_receipt / core_receiptline on "
+        "Postgres (see core/services/receipt_partitions.py). Without options, "
+        "creates the partitions for the coming years (cron-safe)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert", action="store_true",
+            help="Rebuild the tables partitioned; locks them while the rows are copied",
+        )
+        parser.add_argument(
+            "--drop-unpartitioned", action="store_true",
+            help="Drop the <table>_unpartitioned copies left by --convert",
+        )
+        parser.add_argument(
+            "--explain", metavar="TIN",
+            help="Show the plans of this company's date-range queries and the partitions they scan",
+        )
+        parser.add_argument("--from-date", type=date.fromisoformat, help="For --explain (default: start of this fiscal year)")
+        parser.add_argument("--to-date", type=date.fromisoformat, help="For --explain (default: today)")
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not ReceiptPartitions.supported(using):
+            raise CommandError("Receipt partitioning needs PostgreSQL.")
+        log = self.stdout.write
+
+        if options["convert"]:
+            if not settings.RECEIPT_PARTITIONING:
+                raise CommandError("Set RECEIPT_PARTITIONING=True first, so that migrate keeps adding partitions.")
+            try:
+                ReceiptPartitions.convert(using, log=log)
+            except RuntimeError as e:
+                raise CommandError(str(e))
+        elif not ReceiptPartitions.is_partitioned(ReceiptPartitions.TABLES[0], using):
+            raise CommandError("Receipts are not partitioned (see --convert).")
+
+        if options["drop_unpartitioned"]:
+            ReceiptPartitions.drop_unpartitioned(using)
+            log("Dropped the unpartitioned tables.")
+
+        created = ReceiptPartitions.ensure(using, log=log)
+        if not created:
+            log("Partitions up to date.")
+
+        if options["explain"]:
+            self.explain(options["explain"], options["from_date"], options["to_date"], using)
+
+    def explain(self, tin, from_date, to_date, using):
+        to_date = to_date or date.today()
+        from_date = from_date or ReceiptPartitions.bounds(ReceiptPartitions.fiscal_year(to_date))[0]
+        expected = ReceiptPartitions.expected_partitions(from_date, to_date, using)
+        pruned = True
+        for name, plan, scanned in ReceiptPartitions.explain(tin, from_date, to_date, using):
+            extra = set(scanned) - expected
+            pruned &= not extra
+            self.stdout.write(f"\n== {name}: scans {', '.join(scanned) or 'no partitions'}\n{plan}")
+            if extra:
+                self.stdout.write(self.style.ERROR(f"Not pruned: {', '.join(sorted(extra))}"))
+        if pruned:
+            self.stdout.write(self.style.SUCCESS(f"\nOnly the partitions for {from_date} to {to_date} are scanned."))
+        else:
+            raise CommandError("Some queries scan partitions outside the date range.")
@@ -0,0 +1,15 @@
+# core/management/commands/purge_chunked_uploads.py
+from django.core.management.base import BaseCommand
+
+from core.services.chunked_upload import ChunkedUploadStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete chunked uploads that were abandoned (untouched for CHUNKED_UPLOAD_TTL seconds). "
+        "Run periodically, e.g. hourly from cron."
+    )
+
+    def handle(self, *args, **options):
+        removed = ChunkedUploadStore.purge_expired()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired uploads."))
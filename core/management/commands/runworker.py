@@ -0,0 +1,47 @@
+# core/management/commands/runworker.py
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.services.task_queue import TaskQueue
+
+
+def _work(once):
+    TaskQueue.work(once=once)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run deferred tasks queued with TaskQueue.enqueue() (core/tasks.py). "
+        "Workers claim tasks with SELECT ... FOR UPDATE SKIP LOCKED, so several "
+        "can run side by side (--processes, or several hosts). Export jobs "
+        "(POST /api/exports) only ever run here."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1, help="Worker processes to start")
+        parser.add_argument("--once", action="store_true", help="Exit when no task is due")
+
+    def handle(self, *args, **options):
+        processes, once = options["processes"], options["once"]
+        if processes <= 1:
+            self.stdout.write(f"Task worker started ({len(TaskQueue.registry)} task types).")
+            TaskQueue.work(once=once)
+            return
+
+        # Children must open their own database connections
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=_work, args=(once,), daemon=True)
+            for _ in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {processes} task workers.")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
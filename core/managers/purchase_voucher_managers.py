@@ -0,0 +1,13 @@
+# core/managers/purchase_voucher_managers.py
+
+from django.db import models
+
+# Pre-storage BinaryField columns; emptied by migration 0006, kept for rollback
+LEGACY_BINARY_FIELDS = ("document", "attachment")
+
+
+class PurchaseVoucherManager(models.Manager):
+    """Never SELECT the legacy blob columns unless explicitly asked for (.only / undefer)."""
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*LEGACY_BINARY_FIELDS)
@@ -0,0 +1,117 @@
+# core/managers/receipt_managers.py
+
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import DecimalField, F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+MONEY_FIELD = DecimalField(max_digits=20, decimal_places=2)
+
+_CONTACT_COLUMNS = ["name", "tin_number", "address"]
+
+# What each ReceiptDisplaySerializer field needs from the database.
+# Fields not listed here are plain Receipt columns of the same name.
+DISPLAY_FIELD_PLAN = {
+    "issued_by_details": {
+        "columns": [f"issued_by__{c}" for c in _CONTACT_COLUMNS],
+        "related": ["issued_by"],
+    },
+    "issued_to_details": {
+        "columns": [f"issued_to__{c}" for c in _CONTACT_COLUMNS],
+        "related": ["issued_to"],
+    },
+    "receipt_category": {"columns": ["receipt_category__name"], "related": ["receipt_category"]},
+    "receipt_kind": {"columns": ["receipt_kind__name"], "related": ["receipt_kind"]},
+    "receipt_type": {"columns": ["receipt_type__name"], "related": ["receipt_type"]},
+    "receipt_name": {"columns": ["receipt_name__name"], "related": ["receipt_name"]},
+    # CRV vs normal lines is decided by the category name
+    "items": {
+        "columns": ["receipt_category__name"],
+        "related": ["receipt_category"],
+        "prefetch": ["items", "crv_items"],
+    },
+    "subtotal": {"totals": True},
+    "tax": {"totals": True},
+    "total": {"totals": True},
+    "withholding_amount": {"columns": ["is_withholding_applicable"], "totals": True},
+    "net_payable_to_supplier": {"columns": ["is_withholding_applicable"], "totals": True},
+    "documents": {
+        "columns": [
+            "source_document__id",
+            "source_document__main_receipt__receipt_number",
+            "source_document__main_receipt__main_receipt",
+            "source_document__main_receipt__main_receipt_filename",
+            "source_document__main_receipt__main_receipt_content_type",
+            "source_document__main_receipt__uploaded_at",
+            "source_document__withholding_receipt__withholding_receipt_number",
+            "source_document__withholding_receipt__withholding_receipt",
+            "source_document__withholding_receipt__withholding_receipt_filename",
+            "source_document__withholding_receipt__withholding_receipt_content_type",
+            "source_document__withholding_receipt__uploaded_at",
+        ],
+        "related": [
+            "source_document__main_receipt",
+            "source_document__withholding_receipt",
+        ],
+    },
+}
+
+
+class ReceiptQuerySet(models.QuerySet):
+    def with_totals(self, tax_type=None, prefix="annotated"):
+        """
+        Annotate line totals in SQL (same maths as Receipt.subtotal / Receipt.tax):
+          - <prefix>_subtotal = Σ(quantity × unit_cost − discount_amount)
+          - <prefix>_tax      = Σ(tax_amount)
+        Correlated subqueries, so no GROUP BY and no row multiplication.
+        Pass tax_type to only sum lines of that tax type.
+        """
+        from core.models.Receipt import ReceiptLine
+
+        lines = ReceiptLine.objects.filter(receipt=OuterRef("pk"))
+        if tax_type:
+            lines = lines.filter(tax_type__iexact=tax_type)
+        lines = lines.values("receipt")
+        subtotal = lines.annotate(
+            value=Sum(F("quantity") * F("unit_cost") - F("discount_amount"), output_field=MONEY_FIELD)
+        ).values("value")
+        tax = lines.annotate(value=Sum("tax_amount")).values("value")
+
+        zero = Value(Decimal("0.00"), output_field=MONEY_FIELD)
+        return self.annotate(**{
+            f"{prefix}_subtotal": Coalesce(Subquery(subtotal, output_field=MONEY_FIELD), zero),
+            f"{prefix}_tax": Coalesce(Subquery(tax, output_field=MONEY_FIELD), zero),
+        })
+
+    def for_fields(self, field_names):
+        """
+        Read path for ReceiptListSerializer, limited to `field_names`:
+        only the columns, joins, prefetches and annotations those fields need.
+        Query count per page is fixed (page + lines + CRV items at most),
+        regardless of page size.
+        """
+        from core.models.Receipt import ReceiptLine
+
+        columns, related, prefetch = {"id"}, set(), set()
+        needs_totals = False
+        for name in field_names:
+            plan = DISPLAY_FIELD_PLAN.get(name, {"columns": [name]})
+            columns.update(plan.get("columns", []))
+            related.update(plan.get("related", []))
+            prefetch.update(plan.get("prefetch", []))
+            needs_totals = needs_totals or plan.get("totals", False)
+
+        queryset = self
+        if related:
+            queryset = queryset.select_related(*sorted(related))
+        queryset = queryset.only(*sorted(columns))
+        if needs_totals:
+            queryset = queryset.with_totals()
+        if "items" in prefetch:
+            queryset = queryset.prefetch_related(
+                Prefetch("items", queryset=ReceiptLine.objects.select_related("item"))
+            )
+        if "crv_items" in prefetch:
+            queryset = queryset.prefetch_related("crv_items")
+        return queryset
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:02
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='receipt',
+            index=models.Index(models.F('recorded_by'), django.db.models.functions.text.Upper('receipt_number'), name='receipt_recorder_upper_number'),
+        ),
+    ]
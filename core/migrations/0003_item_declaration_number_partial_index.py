@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_receipt_upper_number_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('declaration_number__isnull', False), models.Q(('declaration_number', ''), _negated=True)), fields=['declaration_number'], name='item_declaration_number_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:13
+
+import re
+import unicodedata
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+
+# Frozen copy of core.services.contact_name_search.normalize_contact_name as
+# of this migration, so later changes to it don't change what this one does
+def _ethiopic_row_map(source_row, target_row):
+    mapping = {}
+    for order in range(8):
+        source, target = chr(source_row + order), chr(target_row + order)
+        if unicodedata.name(source, None) and unicodedata.name(target, None):
+            mapping[ord(source)] = target
+    return mapping
+
+
+ETHIOPIC_FOLDING = {
+    **_ethiopic_row_map(0x1210, 0x1200),
+    **_ethiopic_row_map(0x1280, 0x1200),
+    **_ethiopic_row_map(0x1220, 0x1230),
+    **_ethiopic_row_map(0x12D0, 0x12A0),
+    **_ethiopic_row_map(0x1340, 0x1338),
+}
+SEPARATORS_RE = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_contact_name(name):
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    name = name.translate(ETHIOPIC_FOLDING)
+    return SEPARATORS_RE.sub(" ", name).strip()[:200].rstrip()
+
+
+def fill_search_name(apps, schema_editor):
+    Contact = apps.get_model('core', 'Contact')
+    batch = []
+    for contact in Contact.objects.only('id', 'name').iterator(chunk_size=2000):
+        contact.search_name = normalize_contact_name(contact.name)
+        batch.append(contact)
+        if len(batch) == 2000:
+            Contact.objects.bulk_update(batch, ['search_name'])
+            batch = []
+    if batch:
+        Contact.objects.bulk_update(batch, ['search_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_item_declaration_number_partial_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='contact',
+            name='search_name',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(fill_search_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contact',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_name'], name='contact_search_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
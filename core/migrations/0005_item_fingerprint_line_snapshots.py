@@ -0,0 +1,86 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:15
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+SNAPSHOT_FIELDS = [
+    'item_description', 'unit_of_measurement', 'gl_account', 'nature',
+    'hs_code', 'declaration_number', 'item_type', 'has_import_export',
+]
+CHUNK = 50000
+
+
+def snapshot_lines_from_items(apps, schema_editor):
+    """Existing lines show what their Item says today; copy that onto the line."""
+    Item = apps.get_model('core', 'Item')
+    ReceiptLine = apps.get_model('core', 'ReceiptLine')
+    item = Item.objects.filter(pk=OuterRef('item_id'))
+    values = {field: Subquery(item.values(field)[:1]) for field in SNAPSHOT_FIELDS}
+
+    last_id = ReceiptLine.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last_id + 1, CHUNK):
+        ReceiptLine.objects.filter(id__gte=start, id__lt=start + CHUNK).update(**values)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_contact_search_name'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='item',
+            name='item_declaration_number_idx',
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='declaration_number',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='gl_account',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='has_import_export',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='hs_code',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='item_description',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='item_type',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='nature',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.AddField(
+            model_name='receiptline',
+            name='unit_of_measurement',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(snapshot_lines_from_items, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='receiptline',
+            index=models.Index(condition=models.Q(('declaration_number__isnull', False), models.Q(('declaration_number', ''), _negated=True)), fields=['declaration_number'], name='line_declaration_number_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
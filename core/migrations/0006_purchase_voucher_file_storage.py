@@ -0,0 +1,60 @@
+# Generated by Django 5.2.4 on 2026-10-19 19:18
+
+import core.models.PurchaseVoucher
+from django.core.files.base import ContentFile
+from django.db import migrations, models, transaction
+from django.db.models import Q
+
+CHUNK = 50  # Rows (with their blobs) held in memory at a time
+
+
+def move_blobs_to_storage(apps, schema_editor):
+    """
+    Write each voucher's document/attachment bytes to media storage and empty
+    the BinaryField columns. Chunks commit separately, so an interrupted run
+    resumes where it stopped (rows still holding bytes).
+    """
+    PurchaseVoucher = apps.get_model('core', 'PurchaseVoucher')
+    pending = list(
+        PurchaseVoucher.objects.filter(Q(document__isnull=False) | Q(attachment__isnull=False))
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    for start in range(0, len(pending), CHUNK):
+        chunk = pending[start:start + CHUNK]
+        with transaction.atomic(using=schema_editor.connection.alias):
+            for voucher in PurchaseVoucher.objects.filter(id__in=chunk).iterator(chunk_size=CHUNK):
+                for field in ('document', 'attachment'):
+                    data = getattr(voucher, field)
+                    if data is None:
+                        continue
+                    filename = getattr(voucher, f'{field}_filename') or f'{field}-{voucher.id}'
+                    getattr(voucher, f'{field}_file').save(filename, ContentFile(bytes(data)), save=False)
+                    setattr(voucher, f'{field}_filename', filename)
+                    setattr(voucher, field, None)
+                voucher.save(update_fields=[
+                    'document', 'document_file', 'document_filename',
+                    'attachment', 'attachment_file', 'attachment_filename',
+                ])
+
+
+class Migration(migrations.Migration):
+    atomic = False  # Commit per chunk (see move_blobs_to_storage)
+
+    dependencies = [
+        ('core', '0005_item_fingerprint_line_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchasevoucher',
+            name='attachment_file',
+            field=models.FileField(blank=True, null=True, upload_to=core.models.PurchaseVoucher.purchase_voucher_upload_path),
+        ),
+        migrations.AddField(
+            model_name='purchasevoucher',
+            name='document_file',
+            field=models.FileField(blank=True, null=True, upload_to=core.models.PurchaseVoucher.purchase_voucher_upload_path),
+        ),
+        migrations.RunPython(move_blobs_to_storage, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-19 20:12
+
+from django.db import migrations, models
+from django.db.models import Max, OuterRef, Subquery
+
+CHUNK = 50000
+
+
+def copy_receipt_dates(apps, schema_editor):
+    """Existing lines take their receipt's date."""
+    Receipt = apps.get_model('core', 'Receipt')
+    ReceiptLine = apps.get_model('core', 'ReceiptLine')
+    receipt_date = Subquery(Receipt.objects.filter(pk=OuterRef('receipt_id')).values('receipt_date')[:1])
+
+    last_id = ReceiptLine.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last_id + 1, CHUNK):
+        ReceiptLine.objects.filter(id__gte=start, id__lt=start + CHUNK).update(receipt_date=receipt_date)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receiptline',
+            name='receipt_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(copy_receipt_dates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='receiptline',
+            name='receipt_date',
+            field=models.DateField(editable=False),
+        ),
+    ]
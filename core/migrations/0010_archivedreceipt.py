@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 20:41
+
+import django.db.models.deletion
+import django.db.models.functions.text
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_receiptline_receipt_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReceipt',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fiscal_year', models.PositiveSmallIntegerField(help_text='See ReceiptPartitions.fiscal_year')),
+                ('receipt_number', models.CharField(max_length=50)),
+                ('receipt_date', models.DateField()),
+                ('calendar_type', models.CharField(blank=True, max_length=11, null=True)),
+                ('reason_of_receiving', models.TextField(blank=True, null=True)),
+                ('expired_vat', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('created_at', models.DateTimeField()),
+                ('subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('tax', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=20)),
+                ('tax_types', models.CharField(blank=True, default='', max_length=255)),
+                ('archive_name', models.CharField(help_text='Storage name of the .jsonl.gz file', max_length=255)),
+                ('offset', models.BigIntegerField()),
+                ('length', models.PositiveIntegerField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('issued_by', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.contact')),
+                ('issued_to', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.contact')),
+                ('receipt_category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.receiptcatagory')),
+                ('receipt_kind', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.receiptkind')),
+                ('receipt_name', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.receiptname')),
+                ('receipt_type', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.receipttype')),
+                ('recorded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_receipts', to='core.contact')),
+            ],
+            options={
+                'ordering': ['-receipt_date'],
+                'indexes': [models.Index(fields=['recorded_by', 'receipt_date'], name='archived_recorder_date_idx'), models.Index(models.F('recorded_by'), django.db.models.functions.text.Upper('receipt_number'), name='archived_recorder_upper_number'), models.Index(fields=['fiscal_year', 'archive_name', 'offset'], name='archived_year_file_idx')],
+            },
+        ),
+    ]
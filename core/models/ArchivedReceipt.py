@@ -0,0 +1,74 @@
+# core/models/ArchivedReceipt.py
+from decimal import Decimal
+
+from django.db import models
+from django.db.models.functions import Upper
+
+from core.models.contact import Contact
+from core.models.look_up_tables import (
+    ReceiptCatagory,
+    ReceiptKind,
+    ReceiptType,
+    ReceiptName,
+)
+
+
+class ArchivedReceipt(models.Model):
+    """
+    Stub left behind for a receipt of a closed fiscal year moved to the cold
+    archive (see core/services/receipt_archive.py): the header columns that
+    search filters on, and where the full record (lines, CRV items, document
+    links and the detail view's output) sits in the archive store.
+    The parties and lookups are PROTECTed, so the receipt can be restored.
+    """
+
+    # The receipt's own id: detail URLs keep working, and a restore reuses it
+    id = models.BigIntegerField(primary_key=True)
+    fiscal_year = models.PositiveSmallIntegerField(help_text="See ReceiptPartitions.fiscal_year")
+
+    # ========================
+    # Receipt header (ReceiptSearchView filters)
+    # ========================
+    recorded_by = models.ForeignKey(
+        Contact, null=True, blank=True, on_delete=models.CASCADE, related_name="archived_receipts"
+    )
+    issued_by = models.ForeignKey(Contact, on_delete=models.PROTECT, related_name="+")
+    issued_to = models.ForeignKey(Contact, on_delete=models.PROTECT, related_name="+")
+    receipt_number = models.CharField(max_length=50)
+    receipt_date = models.DateField()
+    calendar_type = models.CharField(max_length=11, blank=True, null=True)
+    receipt_category = models.ForeignKey(
+        ReceiptCatagory, on_delete=models.PROTECT, blank=True, null=True, related_name="+"
+    )
+    receipt_kind = models.ForeignKey(ReceiptKind, on_delete=models.PROTECT, related_name="+")
+    receipt_type = models.ForeignKey(ReceiptType, on_delete=models.PROTECT, related_name="+")
+    receipt_name = models.ForeignKey(ReceiptName, on_delete=models.PROTECT, related_name="+")
+    reason_of_receiving = models.TextField(blank=True, null=True)
+    expired_vat = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0.00"))
+    created_at = models.DateTimeField()
+
+    # Totals over all lines, and the lines' tax types as ",VAT,TOT,"
+    subtotal = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0.00"))
+    tax = models.DecimalField(max_digits=20, decimal_places=2, default=Decimal("0.00"))
+    tax_types = models.CharField(max_length=255, blank=True, default="")
+
+    # ========================
+    # Archive location: one gzip member per receipt
+    # ========================
+    archive_name = models.CharField(max_length=255, help_text="Storage name of the .jsonl.gz file")
+    offset = models.BigIntegerField()
+    length = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Archived {self.receipt_number} ({self.receipt_date}, FY{self.fiscal_year})"
+
+    class Meta:
+        ordering = ["-receipt_date"]
+        indexes = [
+            models.Index(fields=["recorded_by", "receipt_date"], name="archived_recorder_date_idx"),
+            # Receipt number checks per company (see find_existing_receipt_numbers)
+            models.Index("recorded_by", Upper("receipt_number"), name="archived_recorder_upper_number"),
+            # Restore scans a year file by file
+            models.Index(fields=["fiscal_year", "archive_name", "offset"], name="archived_year_file_idx"),
+        ]
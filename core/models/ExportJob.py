@@ -0,0 +1,72 @@
+# core/models/ExportJob.py
+import uuid
+
+from django.db import models
+
+
+def export_upload_path(instance, filename):
+    """
+    Generate: exports/{company_tin}/{job_id}_{random}.ext
+    Example: exports/0921209714/42_3f2a9c1e.csv
+    """
+    return f"exports/{instance.company_tin}/{instance.pk}_{uuid.uuid4().hex[:8]}.{instance.format}"
+
+
+class ExportJob(models.Model):
+    """
+    A receipt export (CSV / XLSX / PDF) requested through POST /api/exports
+    and produced by a `manage.py runworker` task (see core/services/export_jobs.py).
+    """
+
+    FORMAT_CHOICES = [("csv", "CSV"), ("xlsx", "Excel"), ("pdf", "PDF")]
+    MODE_CHOICES = [("receipts", "One row per receipt"), ("lines", "One row per receipt line")]
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    company_tin = models.CharField(max_length=10, db_index=True)
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="receipts")
+    filters = models.JSONField(default=dict, blank=True, help_text="ReceiptSearchView filters")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    file = models.FileField(upload_to=export_upload_path, null=True, blank=True)
+    error = models.TextField(blank=True, default="")
+
+    # Worker bookkeeping
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Export {self.pk} ({self.format}, {self.status})"
+
+    @property
+    def progress(self):
+        """Percent done, or None while the row count is unknown."""
+        if self.status == self.SUCCEEDED:
+            return 100
+        if not self.rows_total:
+            return None
+        return min(99, int(self.rows_done * 100 / self.rows_total))
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            # Stale job scan (ExportQueue.purge_expired)
+            models.Index(fields=["status", "created_at"], name="exportjob_status_created_idx"),
+        ]
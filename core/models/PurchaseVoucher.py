@@ -1,5 +1,22 @@
 # models/PurchaseVoucher.py
+import uuid
+from pathlib import Path
+
 from django.db import models
+from django.utils.text import get_valid_filename
+
+from core.managers.purchase_voucher_managers import PurchaseVoucherManager
+
+
+def purchase_voucher_upload_path(instance, filename):
+    """
+    Generate: purchase_vouchers/{purchase_recipt_number}_{random}.ext
+    Example: purchase_vouchers/PV-001_3f2a9c1e.pdf
+    The number is user input: 'PV/001' → 'PV001', so it can't add directories.
+    """
+    ext = Path(filename).suffix.lower()
+    number = instance.purchase_recipt_number or "unknown"
+    return f"purchase_vouchers/{get_valid_filename(f'{number}_{uuid.uuid4().hex[:8]}{ext}')}"
 
 
 class PurchaseVoucher(models.Model):
@@ -11,21 +28,32 @@ class PurchaseVoucher(models.Model):
     description = models.TextField(blank=True, null=True)
     purchase_recipt_number = models.CharField(max_length=100)
 
-    # Binary fields to store file contents
-    document = models.BinaryField(blank=True, null=True)  # Store file as bytes
+    # Files live in media storage (like receipt documents); metadata stays here
+    document_file = models.FileField(
+        upload_to=purchase_voucher_upload_path, blank=True, null=True
+    )
     document_filename = models.CharField(
         max_length=255, blank=True, null=True
     )  # To preserve filename
     document_content_type = models.CharField(max_length=100, blank=True, null=True)
 
-    attachment = models.BinaryField(blank=True, null=True)
+    attachment_file = models.FileField(
+        upload_to=purchase_voucher_upload_path, blank=True, null=True
+    )
     attachment_filename = models.CharField(max_length=255, blank=True, null=True)
     attachment_content_type = models.CharField(max_length=100, blank=True, null=True)
 
+    # Legacy: file bytes stored in the row. Emptied into the FileFields above
+    # by migration 0006; deferred by the default manager.
+    document = models.BinaryField(blank=True, null=True)
+    attachment = models.BinaryField(blank=True, null=True)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)  # Set once on creation
     updated_at = models.DateTimeField(auto_now=True)  # Updated on every save
 
+    objects = PurchaseVoucherManager()
+
     def __str__(self):
         return self.purchase_recipt_number
 
@@ -3,6 +3,7 @@
 from datetime import date
 from decimal import Decimal
 from django.db import models
+from django.db.models.functions import Upper
 from django.core.validators import MinValueValidator
 from django.core.exceptions import ValidationError
 from dateutil.relativedelta import relativedelta
@@ -17,6 +18,7 @@ from core.models.look_up_tables import (
     ReceiptName,
 )
 from core.models.PurchaseVoucher import PurchaseVoucher
+from core.managers.receipt_managers import ReceiptQuerySet
 
 
 # ========================
@@ -185,6 +187,8 @@ class Receipt(models.Model):
         help_text="VAT lost due to late submission or expired claim period"
     )
 
+    objects = ReceiptQuerySet.as_manager()
+
     @property
     def subtotal(self):
         """Sum of all line item subtotals."""
@@ -258,6 +262,12 @@ class Receipt(models.Model):
             models.Index(fields=["issued_to"]),
             models.Index(fields=["receipt_date"]),
             models.Index(fields=["receipt_number"]),
+            # Case-insensitive receipt number lookups per company (existence checks)
+            models.Index(
+                "recorded_by",
+                Upper("receipt_number"),
+                name="receipt_recorder_upper_number",
+            ),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -272,8 +282,14 @@ class Receipt(models.Model):
             self.expired_vat = self.tax
         else:
             self.expired_vat = Decimal("0.00")
+        adding = self._state.adding
         super().save(*args, **kwargs)
 
+        # Lines carry the date too (see ReceiptLine.receipt_date)
+        update_fields = kwargs.get("update_fields")
+        if not adding and (update_fields is None or "receipt_date" in update_fields):
+            self.items.exclude(receipt_date=self.receipt_date).update(receipt_date=self.receipt_date)
+
 
 # ========================
 # 2. Receipt Line Model
@@ -285,6 +301,10 @@ class ReceiptLine(models.Model):
         related_name="items",
     )
     item = models.ForeignKey(Item, on_delete=models.PROTECT, help_text="Catalog item")
+    # Copy of receipt.receipt_date: the partition key when the tables are
+    # range-partitioned (core/services/receipt_partitions.py), and what line
+    # queries filter on to prune those partitions
+    receipt_date = models.DateField(editable=False)
 
     quantity = models.DecimalField(
         max_digits=10, decimal_places=2, default=Decimal("1.00")
@@ -296,6 +316,17 @@ class ReceiptLine(models.Model):
         max_digits=20, decimal_places=2, default=Decimal("0.00")
     )
 
+    # Snapshot of the item as written on this receipt (the catalog Item is
+    # shared and never overwritten by later receipts)
+    item_description = models.TextField(blank=True, default="")
+    unit_of_measurement = models.CharField(max_length=50, null=True, blank=True)
+    gl_account = models.CharField(max_length=50, null=True, blank=True)
+    nature = models.CharField(max_length=50, null=True, blank=True)
+    hs_code = models.CharField(max_length=50, null=True, blank=True)
+    declaration_number = models.CharField(max_length=100, null=True, blank=True)
+    item_type = models.CharField(max_length=50, null=True, blank=True)
+    has_import_export = models.BooleanField(default=False)
+
     @property
     def subtotal(self):
         return self.quantity * self.unit_cost - self.discount_amount
@@ -307,6 +338,8 @@ class ReceiptLine(models.Model):
     def save(self, *args, **kwargs):
         if not self.unit_cost:
             self.unit_cost = self.item.unit_cost
+        if self.receipt_date is None:
+            self.receipt_date = self.receipt.receipt_date
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -315,6 +348,16 @@ class ReceiptLine(models.Model):
     class Meta:
         verbose_name = "Receipt Line"
         verbose_name_plural = "Receipt Lines"
+        indexes = [
+            # Import/export line search: only lines that carry a declaration
+            # number are indexed; pattern ops serve the prefix (LIKE 'x%') filter
+            models.Index(
+                fields=["declaration_number"],
+                name="line_declaration_number_idx",
+                opclasses=["varchar_pattern_ops"],
+                condition=models.Q(declaration_number__isnull=False) & ~models.Q(declaration_number=""),
+            ),
+        ]
 
 
 # ========================
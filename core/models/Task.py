@@ -0,0 +1,49 @@
+# core/models/Task.py
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """
+    Deferred work queued with TaskQueue.enqueue() once the request's
+    transaction commits, and run by `manage.py runworker` processes
+    (see core/services/task_queue.py and core/tasks.py).
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=100, help_text="Registered task name (core/tasks.py)")
+    kwargs = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Not claimed before (retry backoff)")
+    error = models.TextField(blank=True, default="")
+
+    # Worker bookkeeping
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    worker = models.CharField(max_length=100, blank=True, default="")
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Task {self.pk} ({self.name}, {self.status})"
+
+    class Meta:
+        ordering = ["run_after"]
+        indexes = [
+            # Queue scan: due queued / stale running task first
+            models.Index(fields=["status", "run_after"], name="task_status_run_after_idx"),
+        ]
@@ -1,2 +1,5 @@
 
 # Add any other model files here
+from . import ExportJob  # noqa: F401  (registers the model; not imported elsewhere at startup)
+from . import Task  # noqa: F401
+from . import ArchivedReceipt  # noqa: F401
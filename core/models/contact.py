@@ -3,6 +3,10 @@ from django.core.validators import RegexValidator
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
+from django.contrib.postgres.indexes import GinIndex
+
+from core.services.contact_name_search import normalize_contact_name
+from core.managers.contact_managers import ContactQuerySet
 
 
 class Contact(models.Model):
@@ -27,11 +31,24 @@ class Contact(models.Model):
     # 🟢 Unchanged: simple text field for address
     address = models.TextField(blank=True, null=True)
 
+    # Normalized name for fuzzy search (see normalize_contact_name), kept in sync by save()
+    search_name = models.CharField(max_length=200, blank=True, default="", editable=False)
+
+    objects = ContactQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Contact"
         verbose_name_plural = "Contacts"
         # ✅ Prevent duplicate TINs
         unique_together = [('tin_number',)]
+        indexes = [
+            # Trigram pre-filter for name search (pg_trgm)
+            GinIndex(
+                fields=["search_name"],
+                name="contact_search_name_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def clean(self):
         """Run validation before save"""
@@ -49,6 +66,10 @@ class Contact(models.Model):
                 raise ValidationError({"tin_number": "TIN must be exactly 10 digits (numbers only)."})
 
     def save(self, *args, **kwargs):
+        self.search_name = normalize_contact_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "search_name"}
         # ✅ Always run full clean (including clean() and field validators)
         self.full_clean()
         super().save(*args, **kwargs)
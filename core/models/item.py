@@ -38,6 +38,12 @@ class Item(models.Model):
         max_digits=20, decimal_places=2, default=Decimal("0.00")
     )
 
+    # Identity of items recorded without an item_code (see item_fingerprint);
+    # NULL for items that have a real code
+    fingerprint = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False
+    )
+
     def __str__(self):
         return f"{self.item_code}: {self.item_description}"
 
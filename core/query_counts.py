@@ -0,0 +1,217 @@
+# core/query_counts.py
+"""
+Query-count regression checks (used by core/tests.py).
+
+Every read endpoint of core/api_urls.py is requested against two generated
+datasets (SMALL and LARGE receipts, see SyntheticDataGenerator). A page
+whose query count grows with the data has an N+1; one whose count exceeds
+its entry in core/query_budgets.json has grown new queries. Either way the
+failure lists the extra statements and the project frames that ran them.
+
+Re-record the budgets after an intended change with
+    UPDATE_QUERY_BUDGETS=1 DB_ENGINE=sqlite python manage.py test core
+"""
+
+import json
+import os
+import re
+import traceback
+from collections import Counter
+from contextlib import ExitStack, redirect_stdout
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, connections
+
+from core.models.DraftReceipt import DraftReceipt
+from core.models.Receipt import Receipt
+from core.services.synthetic_data import SyntheticDataGenerator
+
+SMALL, LARGE = 10, 1000
+BUDGET_FILE = Path(__file__).resolve().parent / "query_budgets.json"
+
+GROUP_BYS = ["category", "kind", "name", "type", "issued_to", "issued_by", "calendar_type", "month", "year", "vat_status"]
+
+# (name, path template, database vendors or None for any). Templates are
+# filled from dataset_context(). Not covered: write endpoints (their counts
+# depend on the payload, see benchmark_endpoints), file downloads, and
+# get-documents/<receipt_number>/ (ReceiptDocumentDetailView looks up a
+# field ReceiptDocument does not have).
+ENDPOINTS = [
+    ("receipt_list", "/api/receipts", None),
+    ("receipt_list_items", "/api/receipts?expand=items", None),
+    ("receipt_detail", "/api/receipts/{receipt_id}", None),
+    ("receipt_search", "/api/receipts/search/", None),
+    ("receipt_search_query", "/api/receipts/search/?query=trading", None),
+    ("receipt_search_items", "/api/receipts/search/?expand=items", None),
+    *[
+        (f"receipt_search_group_by_{group}", f"/api/receipts/search/?group_by={group}", None)
+        for group in GROUP_BYS
+    ],
+    ("receipt_export_csv", "/api/receipts/export.csv", None),
+    ("document_list", "/api/get-documents", None),
+    ("draft_list", "/api/drafts", None),
+    ("draft_detail", "/api/drafts?receipt_number={draft_number}", None),
+    ("declaration_lines", "/api/RetriveImportExportRelatedReceipts/", None),
+    ("check_receipt_exists", "/api/check-receipt-exists/?receipt_number={receipt_number}", None),
+    ("contact_lookup", "/api/contacts/lookup/?tin_prefix=8", None),
+    ("contact_name_search", "/api/contacts/search/?name=trading", None),
+    ("receipt_kinds", "/api/receipt-kinds", None),
+    ("receipt_names", "/api/receipt-names/", None),
+    ("receipt_categories", "/api/receipt-categories/", None),
+    ("receipt_types", "/api/receipt-types/", None),
+    ("export_jobs", "/api/exports", None),
+    ("withholding_30_percent", "/api/30percent-withholding/", None),
+]
+
+
+# ========================
+# Datasets
+# ========================
+def build_dataset(receipts, seed=42):
+    """Generate one tenant with `receipts` receipts (documents and drafts scale with it)."""
+    generator = SyntheticDataGenerator(seed=seed, batch_size=500)
+    generator.generate(
+        companies=1, contacts=50, items=100, receipts=receipts, lines=3,
+        documents=receipts, drafts=receipts // 2,
+    )
+    return dataset_context(generator.company_tin(0, seed))
+
+
+def dataset_context(tin):
+    receipt = Receipt.objects.filter(recorded_by__tin_number=tin).order_by("id").first()
+    draft = DraftReceipt.objects.filter(company__tin_number=tin).order_by("created_at").first()
+    return {
+        "tin": tin,
+        "receipt_id": receipt.id,
+        "receipt_number": receipt.receipt_number,
+        "draft_number": draft.uploaded_document_number,
+    }
+
+
+# ========================
+# Recording
+# ========================
+class QueryLog:
+    """
+    execute_wrapper recording each statement with the project frames that
+    issued it, or, when the queryset is evaluated by library code (DRF
+    generic views, pagination), the innermost frames outside the ORM.
+    """
+
+    PROJECT_ROOT = str(settings.BASE_DIR)
+    ORM_DIR = f"{os.sep}django{os.sep}db{os.sep}"
+
+    def __init__(self):
+        self.queries = []
+
+    @classmethod
+    def is_project_frame(cls, filename):
+        return (
+            filename.startswith(cls.PROJECT_ROOT)
+            and f"{os.sep}site-packages{os.sep}" not in filename  # A virtualenv inside the project
+        )
+
+    def __call__(self, execute, sql, params, many, context):
+        stack = [frame for frame in traceback.extract_stack() if frame.filename != __file__]
+        origin = [frame for frame in stack if self.is_project_frame(frame.filename)]
+        if not origin:
+            origin = [frame for frame in stack if self.ORM_DIR not in frame.filename]
+        self.queries.append((sql, [
+            f"{frame.filename}:{frame.lineno} in {frame.name}" for frame in origin[-4:]
+        ]))
+        return execute(sql, params, many, context)
+
+
+_placeholder_list_re = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+
+
+def normalize_sql(sql):
+    """Same statement shape whatever the IN (...) list length."""
+    return _placeholder_list_re.sub("(%s, ...)", sql)
+
+
+def request_queries(client, path):
+    """(status code, [(sql, frames)]) for one GET, streamed bodies consumed."""
+    log = QueryLog()
+    with ExitStack() as stack:
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(log))
+        with redirect_stdout(StringIO()):  # Views and JWT decoding print()
+            response = client.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+    return response.status_code, log.queries
+
+
+def endpoint_queries(client, context):
+    """{endpoint name: (status, queries)} for every ENDPOINTS entry on this database."""
+    results = {}
+    for name, template, vendors in ENDPOINTS:
+        if vendors and connection.vendor not in vendors:
+            continue
+        path = template.format(**context)
+        request_queries(client, path)  # Warm per-process caches (lookup tables, TIN index, ...)
+        results[name] = request_queries(client, path)
+    return results
+
+
+# ========================
+# Budgets
+# ========================
+def load_budgets():
+    if not BUDGET_FILE.exists():
+        return {}
+    return json.loads(BUDGET_FILE.read_text())
+
+
+def save_budgets(large):
+    budgets = load_budgets()
+    budgets.update({name: len(queries) for name, (_, queries) in sorted(large.items())})
+    BUDGET_FILE.write_text(json.dumps(dict(sorted(budgets.items())), indent=2) + "\n")
+
+
+def _describe(queries):
+    lines = []
+    for sql, frames in queries:
+        lines.append(f"    {sql[:300]}")
+        lines.extend(f"        at {frame}" for frame in frames)
+    return "\n".join(lines)
+
+
+def extra_queries(small_queries, large_queries):
+    """Statements the large run made beyond the small run's (by normalized SQL)."""
+    remaining = Counter(normalize_sql(sql) for sql, _ in small_queries)
+    extra = []
+    for sql, frames in large_queries:
+        key = normalize_sql(sql)
+        if remaining[key]:
+            remaining[key] -= 1
+        else:
+            extra.append((sql, frames))
+    return extra
+
+
+def check(small, large, budgets):
+    """Failure messages (empty when every endpoint is flat and within budget)."""
+    failures = []
+    for name, (status, queries) in large.items():
+        small_status, small_queries = small[name]
+        if status >= 500 or small_status >= 500:
+            failures.append(f"{name}: HTTP {small_status} / {status}")
+            continue
+        if len(queries) != len(small_queries):
+            failures.append(
+                f"{name}: {len(small_queries)} queries with {SMALL} receipts, "
+                f"{len(queries)} with {LARGE}. Extra:\n"
+                + _describe(extra_queries(small_queries, queries))
+            )
+        budget = budgets.get(name)
+        if budget is None:
+            failures.append(f"{name}: no budget in {BUDGET_FILE.name} (run with UPDATE_QUERY_BUDGETS=1)")
+        elif len(queries) > budget:
+            failures.append(
+                f"{name}: {len(queries)} queries, budget {budget}. All queries:\n" + _describe(queries)
+            )
+    return failures
@@ -7,6 +7,7 @@ from rest_framework.exceptions import ValidationError as DRFValidationError
 from django.core.files.base import ContentFile
 from django.utils.text import get_valid_filename
 import logging
+import time
 from django.core.files.storage import default_storage
 logger = logging.getLogger(__name__)
 
@@ -17,6 +18,7 @@ from core.models.Documents import (
     WithholdingReceiptDocument
 )
 from core.models.contact import Contact
+from core.services import metrics
 
 
 class DocumentListItemSerializer(serializers.Serializer):
@@ -117,10 +119,23 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
             "notes",
         ]
 
-    def validate(self, data):
+    def get_files(self):
+        """
+        Uploaded files by form key ("main_receipt_data.main_receipt", ...):
+        context["files"] when given (assembled chunked uploads), else request.FILES.
+        """
+        files = self.context.get("files")
+        if files is not None:
+            return files
         request = self.context.get("request")
-        if not request or not request.FILES:
+        return request.FILES if request else {}
+
+    def validate(self, data):
+        files = self.get_files()
+        if not files:
             raise DRFValidationError("No file uploaded.")
+        for key, uploaded in files.items():
+            metrics.UPLOAD_BYTES.labels(key.rsplit(".", 1)[-1]).observe(uploaded.size or 0)
 
         has_main_by_id = "main_receipt" in data
         has_main_by_data = "main_receipt_data" in data
@@ -158,11 +173,18 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
 
         # Prevent duplicate file content
         main_file_key = "main_receipt_data.main_receipt"
-        if main_file_key in request.FILES:
-            uploaded_file = request.FILES[main_file_key]
-            file_content = uploaded_file.read()
-            file_hash = hashlib.md5(file_content).hexdigest()
-            uploaded_file.seek(0)
+        if main_file_key in files:
+            # Chunked uploads were hashed while they streamed in
+            file_hash = self.context.get("file_hashes", {}).get(main_file_key)
+            if not file_hash:
+                uploaded_file = files[main_file_key]
+                started = time.perf_counter()
+                md5 = hashlib.md5()
+                for chunk in uploaded_file.chunks():
+                    md5.update(chunk)
+                file_hash = md5.hexdigest()
+                metrics.UPLOAD_HASH_SECONDS.observe(time.perf_counter() - started)
+                uploaded_file.seek(0)
 
             if MainReceiptDocument.objects.filter(main_receipt_hash=file_hash).exists():
                 raise DRFValidationError({"file": "This exact file has already been uploaded."})
@@ -185,7 +207,7 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        request = self.context.get("request")
+        files = self.get_files()
         for_company = self.context.get("for_company")
          
         if not for_company:
@@ -207,22 +229,25 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
         main_receipt = None
         if main_data:
             main_file_key = "main_receipt_data.main_receipt"
-            if main_file_key not in request.FILES:
+            if main_file_key not in files:
                 raise DRFValidationError({"main_receipt_data": f"File '{main_file_key}' is required."})
 
-            main_file = request.FILES[main_file_key]
+            main_file = files[main_file_key]
 
             # Set metadata
             main_data.setdefault("main_receipt_filename", get_valid_filename(main_file.name))
             main_data.setdefault("main_receipt_content_type", main_file.content_type or "application/octet-stream")
 
             attach_key = "main_receipt_data.attachment"
-            if attach_key in request.FILES:
-                attach_file = request.FILES[attach_key]
+            if attach_key in files:
+                attach_file = files[attach_key]
                 main_data.setdefault("attachment_filename", get_valid_filename(attach_file.name))
                 main_data.setdefault("attachment_content_type", attach_file.content_type or "application/octet-stream")
 
             main_data["company_tin"] = for_company.tin_number
+            # Files are saved once, below, under their final names
+            main_data.pop("main_receipt", None)
+            main_data.pop("attachment", None)
 
             # Create instance (without saving file yet)
             main_receipt = MainReceiptDocument(**main_data)
@@ -235,7 +260,7 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
                 main_file.seek(0)
                 main_receipt.main_receipt.save(
                     name=filename,
-                    content=ContentFile(main_file.read()),
+                    content=main_file,
                     save=True
                 )
                 logger.info(f"Main receipt saved: {main_receipt.main_receipt.path}")
@@ -245,15 +270,15 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
                 raise DRFValidationError({"file": f"Failed to save main receipt: {str(e)}"})
 
             # Save attachment
-            if attach_key in request.FILES:
-                attach_file = request.FILES[attach_key]
+            if attach_key in files:
+                attach_file = files[attach_key]
                 attach_ext = os.path.splitext(attach_file.name)[1]
                 attach_filename = f"{main_data['receipt_number']}_{for_company.tin_number}_attachment{attach_ext}"
                 try:
                     attach_file.seek(0)
                     main_receipt.attachment.save(
                         name=attach_filename,
-                        content=ContentFile(attach_file.read()),
+                        content=attach_file,
                         save=True
                     )
                     logger.info(f"Attachment saved: {main_receipt.attachment.path}")
@@ -272,15 +297,15 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
         withholding_receipt = None
         if withholding_data is not None:
             wht_file_key = "withholding_receipt_data.withholding_receipt"
-            if wht_file_key in request.FILES:
-                wht_file = request.FILES[wht_file_key]
+            if wht_file_key in files:
+                wht_file = files[wht_file_key]
 
                 withholding_data.setdefault("withholding_receipt_filename", get_valid_filename(wht_file.name))
                 withholding_data.setdefault("withholding_receipt_content_type", wht_file.content_type or "application/octet-stream")
 
                 wht_attach_key = "withholding_receipt_data.withholding_attachment"
-                if wht_attach_key in request.FILES:
-                    attach_file = request.FILES[wht_attach_key]
+                if wht_attach_key in files:
+                    attach_file = files[wht_attach_key]
                     withholding_data.setdefault("withholding_attachment_filename", get_valid_filename(attach_file.name))
                     withholding_data.setdefault("withholding_attachment_content_type", attach_file.content_type or "application/octet-stream")
 
@@ -290,6 +315,8 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
                     })
 
                 withholding_data["company_tin"] = for_company.tin_number
+                withholding_data.pop("withholding_receipt", None)
+                withholding_data.pop("withholding_attachment", None)
 
                 withholding_receipt = WithholdingReceiptDocument(**withholding_data)
                 withholding_receipt.save()
@@ -301,7 +328,7 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
                     wht_file.seek(0)
                     withholding_receipt.withholding_receipt.save(
                         name=filename,
-                        content=ContentFile(wht_file.read()),
+                        content=wht_file,
                         save=True
                     )
                     logger.info(f"Withholding receipt saved: {withholding_receipt.withholding_receipt.path}")
@@ -311,15 +338,15 @@ class UploadReceiptSerializer(serializers.ModelSerializer):
                     raise DRFValidationError({"file": f"Failed to save withholding receipt: {str(e)}"})
 
                 # Save attachment
-                if wht_attach_key in request.FILES:
-                    attach_file = request.FILES[wht_attach_key]
+                if wht_attach_key in files:
+                    attach_file = files[wht_attach_key]
                     attach_ext = os.path.splitext(attach_file.name)[1]
                     attach_filename = f"{withholding_data['withholding_receipt_number']}_{for_company.tin_number}_attachment{attach_ext}"
                     try:
                         attach_file.seek(0)
                         withholding_receipt.withholding_attachment.save(
                             name=attach_filename,
-                            content=ContentFile(attach_file.read()),
+                            content=attach_file,
                             save=True
                         )
                         logger.info(f"Withholding attachment saved: {withholding_receipt.withholding_attachment.path}")
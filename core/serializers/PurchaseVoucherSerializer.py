@@ -4,27 +4,40 @@ from core.models.PurchaseVoucher import PurchaseVoucher
 
 
 class PurchaseVoucherSerializer(serializers.ModelSerializer):
+    # Uploads; stored in media storage, returned as URLs
     document = serializers.FileField(required=False, write_only=True)
     attachment = serializers.FileField(required=False, write_only=True)
+    document_url = serializers.SerializerMethodField()
+    attachment_url = serializers.SerializerMethodField()
 
     class Meta:
         model = PurchaseVoucher
-        fields = "__all__"
+        exclude = ["document_file", "attachment_file"]
 
-    def create(self, validated_data):
+    def _file_url(self, file):
+        if not file:
+            return None
         request = self.context.get("request")
-        if request and request.FILES:
-            doc_file = request.FILES.get("document")
-            attach_file = request.FILES.get("attachment")
-
-            if doc_file:
-                validated_data["document"] = doc_file.read()
-                validated_data["document_filename"] = doc_file.name
-                validated_data["document_content_type"] = doc_file.content_type
-
-            if attach_file:
-                validated_data["attachment"] = attach_file.read()
-                validated_data["attachment_filename"] = attach_file.name
-                validated_data["attachment_content_type"] = attach_file.content_type
+        return request.build_absolute_uri(file.url) if request else file.url
+
+    def get_document_url(self, obj):
+        return self._file_url(obj.document_file)
+
+    def get_attachment_url(self, obj):
+        return self._file_url(obj.attachment_file)
+
+    def create(self, validated_data):
+        doc_file = validated_data.pop("document", None)
+        attach_file = validated_data.pop("attachment", None)
+
+        if doc_file:
+            validated_data["document_file"] = doc_file
+            validated_data["document_filename"] = doc_file.name
+            validated_data["document_content_type"] = doc_file.content_type
+
+        if attach_file:
+            validated_data["attachment_file"] = attach_file
+            validated_data["attachment_filename"] = attach_file.name
+            validated_data["attachment_content_type"] = attach_file.content_type
 
         return super().create(validated_data)
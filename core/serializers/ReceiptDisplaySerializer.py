@@ -8,6 +8,7 @@ from core.models.item import Item
 from core.models.CRVITEM import CRVItem
 from core.models.Receipt import ReceiptLine
 from core.services.RetrivingFromLookUpTables import RetrievingFromLookupTables
+from core.serializers.sparse_fields import SparseFieldsetMixin
 
 
 # ✅ Use unique ref_name to avoid drf_yasg conflict
@@ -33,8 +34,24 @@ class ItemDisplaySerializer(serializers.ModelSerializer):
         ref_name = "ReceiptDisplayItem"
 
 
+class LineItemSnapshotSerializer(serializers.Serializer):
+    """Same shape as ItemDisplaySerializer, read from the line's own snapshot."""
+
+    item_code = serializers.CharField(source="item.item_code")
+    item_description = serializers.CharField()
+    unit_of_measurement = serializers.CharField()
+    gl_account = serializers.CharField()
+    nature = serializers.CharField()
+    tax_type = serializers.CharField()
+    unit_cost = serializers.DecimalField(max_digits=20, decimal_places=2)
+
+    class Meta:
+        ref_name = "ReceiptDisplayLineItem"
+
+
 class ReceiptLineDisplaySerializer(serializers.ModelSerializer):
-    item = ItemDisplaySerializer(read_only=True)
+    # What the receipt said about the item (the catalog Item is shared)
+    item = LineItemSnapshotSerializer(source="*", read_only=True)
 
     class Meta:
         model = ReceiptLine
@@ -70,7 +87,14 @@ from django.utils.html import strip_tags
 from rest_framework import serializers
 from decimal import Decimal
 
-class ReceiptDisplaySerializer(serializers.ModelSerializer):
+class ReceiptDisplaySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Supports ?fields=, ?exclude= and ?expand= (see core/serializers/sparse_fields.py).
+    """
+
+    # Nested / heavy fields that can be requested with ?expand=
+    expandable_fields = ("items", "documents", "issued_by_details", "issued_to_details")
+
     # Issuer and receiver details
     issued_by_details = ContactDisplaySerializer(source="issued_by", read_only=True)
     issued_to_details = ContactDisplaySerializer(source="issued_to", read_only=True)
@@ -146,7 +170,7 @@ class ReceiptDisplaySerializer(serializers.ModelSerializer):
     def get_items(self, obj):
         category_name = self.get_receipt_category(obj)
         if category_name and category_name.lower() == "crv":
-            return CRVItemDisplaySerializer(obj.crvitem_set.all(), many=True).data
+            return CRVItemDisplaySerializer(obj.crv_items.all(), many=True).data
         else:
             return ReceiptLineDisplaySerializer(obj.items.all(), many=True).data
 
@@ -226,6 +250,53 @@ class ReceiptDisplaySerializer(serializers.ModelSerializer):
             return {"error": "Failed to load document metadata"}
 
 
+class ReceiptListSerializer(ReceiptDisplaySerializer):
+    """
+    Same output as ReceiptDisplaySerializer, but reads everything from
+    Receipt.objects.for_fields(): lookup names from select_related rows,
+    totals from SQL annotations, lines/CRV items from prefetch caches.
+    """
+
+    @staticmethod
+    def _lookup_name(lookup):
+        return strip_tags(lookup.name.strip()) if lookup and lookup.name else None
+
+    @staticmethod
+    def _money(value):
+        return (value or Decimal("0.00")).quantize(Decimal("0.00"))
+
+    def get_receipt_category(self, obj):
+        return self._lookup_name(obj.receipt_category)
+
+    def get_receipt_kind(self, obj):
+        return self._lookup_name(obj.receipt_kind)
+
+    def get_receipt_type(self, obj):
+        return self._lookup_name(obj.receipt_type)
+
+    def get_receipt_name(self, obj):
+        return self._lookup_name(obj.receipt_name)
+
+    def get_subtotal(self, obj):
+        return str(self._money(obj.annotated_subtotal))
+
+    def get_tax(self, obj):
+        return str(self._money(obj.annotated_tax))
+
+    def get_total(self, obj):
+        return str(self._money(obj.annotated_subtotal + obj.annotated_tax))
+
+    def get_withholding_amount(self, obj):
+        if obj.is_withholding_applicable:
+            return str(self._money(obj.annotated_subtotal * Decimal("0.02")))
+        return "0.00"
+
+    def get_net_payable_to_supplier(self, obj):
+        withholding = Decimal(self.get_withholding_amount(obj))
+        total = obj.annotated_subtotal + obj.annotated_tax
+        return str(self._money(total - withholding))
+
+
 class ThirtyPercentWithholdingReceiptSerializer(serializers.ModelSerializer):
     class Meta:
         model = ThirtyPercentWithholdingReceipt
@@ -1,4 +1,6 @@
 # serializers/ReceiptLineSearchSerializer.py
+from decimal import Decimal
+
 from rest_framework import serializers
 from core.models.Receipt import ReceiptLine
 
@@ -40,14 +42,11 @@ class ReceiptLineSearchSerializer(serializers.ModelSerializer):
         return obj.item.item_code if obj.item else None
 
     def get_item_description(self, obj):
-        return obj.item.item_description if obj.item else None
+        # Line snapshot: what this receipt said, not today's catalog text
+        return obj.item_description or None
 
     def get_declaration_number(self, obj):
-        return (
-            obj.item.declaration_number
-            if obj.item and obj.item.declaration_number
-            else None
-        )
+        return obj.declaration_number or None
 
     def get_receipt_number(self, obj):
         return obj.receipt.receipt_number if obj.receipt else None
@@ -74,8 +73,17 @@ class ReceiptLineSearchSerializer(serializers.ModelSerializer):
     def get_is_vat_expired(self, obj):
         return obj.receipt.is_vat_expired if obj.receipt else False
 
+    def _receipt_tax(self, obj):
+        # SearchView annotates the receipt's tax total; fall back to the property
+        tax = getattr(obj, "receipt_tax", None)
+        return obj.receipt.tax if tax is None else tax
+
     def get_claimable_vat(self, obj):
-        return obj.receipt.claimable_vat if obj.receipt else 0
+        if not obj.receipt:
+            return 0
+        return Decimal("0.00") if obj.receipt.is_vat_expired else self._receipt_tax(obj)
 
     def get_non_claimable_vat(self, obj):
-        return obj.receipt.non_claimable_vat if obj.receipt else 0
+        if not obj.receipt:
+            return 0
+        return self._receipt_tax(obj) if obj.receipt.is_vat_expired else Decimal("0.00")
@@ -21,6 +21,7 @@ from core.models.Documents import Withholding
 from core.models.CRVITEM import CRVItem
 from core.models.Receipt import ReceiptLine
 from core.models.Receipt import Receipt
+from core.models.ArchivedReceipt import ArchivedReceipt
 from core.services.ReceiptService import ReceiptService
 from core.services.RetrivingFromLookUpTables import RetrievingFromLookupTables
 
@@ -436,10 +437,13 @@ class ReceiptSerializer(serializers.Serializer):
         if not receipt_number:
             raise serializers.ValidationError({"receipt_number": "This field is required."})
 
-        # 🔒 Final business rule: Prevent duplicate receipt numbers
+        # 🔒 Final business rule: Prevent duplicate receipt numbers (archived years included)
         if Receipt.objects.filter(
             receipt_number__iexact=receipt_number,
             recorded_by=recorded_by
+        ).exists() or ArchivedReceipt.objects.filter(
+            receipt_number__iexact=receipt_number,
+            recorded_by=recorded_by
         ).exists():
             raise serializers.ValidationError({
                 "receipt_number": f"A receipt with number '{receipt_number}' for your company "
@@ -464,41 +468,25 @@ class ReceiptSerializer(serializers.Serializer):
                 "non_field_errors": ["Company context is missing. Cannot create receipt."]
             })
 
-        # ✅ GET OR CREATE: issued_by
-        if issued_by_data is not None:
-            tin_number = issued_by_data["tin_number"].strip()
-            try:
-                issued_by = Contact.objects.get(tin_number=tin_number)
-                # Update name and address
-                issued_by.name = issued_by_data.get("name", "")
-                issued_by.address = issued_by_data.get("address", "")
-                issued_by.save()
-            except Contact.DoesNotExist:
-                issued_by = Contact.objects.create(
-                    tin_number=tin_number,
-                    name=issued_by_data.get("name", ""),
-                    address=issued_by_data.get("address", "")
-                )
-        else:
+        if issued_by_data is None:
             raise serializers.ValidationError({"issued_by_details": ["This field is required."]})
-
-        # ✅ GET OR CREATE: issued_to
-        if issued_to_data is not None:
-            tin_number = issued_to_data["tin_number"].strip()
-            try:
-                issued_to = Contact.objects.get(tin_number=tin_number)
-                issued_to.name = issued_to_data.get("name", "")
-                issued_to.address = issued_to_data.get("address", "")
-                issued_to.save()
-            except Contact.DoesNotExist:
-                issued_to = Contact.objects.create(
-                    tin_number=tin_number,
-                    name=issued_to_data.get("name", ""),
-                    address=issued_to_data.get("address", "")
-                )
-        else:
+        if issued_to_data is None:
             raise serializers.ValidationError({"issued_to_details": ["This field is required."]})
 
+        # ✅ UPSERT both parties in one statement (name/address are overwritten;
+        # issued_to wins if both share a TIN)
+        party_rows = [
+            {
+                "tin_number": data["tin_number"].strip(),
+                "name": data.get("name", ""),
+                "address": data.get("address", ""),
+            }
+            for data in (issued_by_data, issued_to_data)
+        ]
+        contacts = Contact.objects.upsert_contacts(party_rows)
+        issued_by = contacts[party_rows[0]["tin_number"]]
+        issued_to = contacts[party_rows[1]["tin_number"]]
+
         # ✅ ADD resolved objects
         validated_data['issued_by'] = issued_by
         validated_data['issued_to'] = issued_to
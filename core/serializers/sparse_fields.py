@@ -0,0 +1,65 @@
+# core/serializers/sparse_fields.py
+
+from rest_framework.exceptions import ValidationError
+
+
+def parse_field_list(raw) -> list:
+    """'a, b,,c' → ['a', 'b', 'c']"""
+    return [part.strip() for part in (raw or "").split(",") if part.strip()]
+
+
+def resolve_sparse_fields(query_params, available, expandable=()):
+    """
+    Apply the ?fields= / ?exclude= / ?expand= convention to `available`
+    (ordered field names). Returns the selected names, in `available` order.
+
+    - no params            → every field (backward compatible)
+    - fields=a,b           → only a and b
+    - expand=items         → also include these nested fields (from `expandable`)
+    - exclude=documents    → drop these fields
+    """
+    fields = parse_field_list(query_params.get("fields"))
+    exclude = parse_field_list(query_params.get("exclude"))
+    expand = parse_field_list(query_params.get("expand"))
+
+    errors = {}
+    unknown = [name for name in fields + exclude if name not in available]
+    if unknown:
+        errors["fields"] = f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(available)}"
+    not_expandable = [name for name in expand if name not in expandable]
+    if not_expandable:
+        errors["expand"] = (
+            f"Cannot expand: {', '.join(not_expandable)}. Allowed: {', '.join(expandable)}"
+        )
+    if errors:
+        raise ValidationError(errors)
+
+    selected = set(fields) if fields else set(available)
+    selected.update(expand)
+    selected.difference_update(exclude)
+    return [name for name in available if name in selected]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin: drops the fields not selected by the request's
+    ?fields= / ?exclude= / ?expand= params (see resolve_sparse_fields).
+    Views should project their queryset with the same selection, via
+    `Serializer.requested_fields(request)`, so dropped fields are never queried.
+    """
+
+    expandable_fields = ()
+
+    @classmethod
+    def requested_fields(cls, request):
+        available = list(cls.Meta.fields)
+        if request is None:
+            return available
+        return resolve_sparse_fields(request.query_params, available, cls.expandable_fields)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = set(self.requested_fields(self.context.get("request")))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
@@ -18,6 +18,9 @@ from core.models.item import Item
 
 # Services
 from core.services.RetrivingFromLookUpTables import RetrievingFromLookupTables
+from core.services.item_catalog import item_fingerprint, resolve_items
+from core.services.metrics import track_receipt_creation
+from core.services.task_queue import TaskQueue
 
 
 class ReceiptService:
@@ -159,6 +162,7 @@ class ReceiptService:
         }
 
     @staticmethod
+    @track_receipt_creation
     @transaction.atomic
     def create_receipt(validated_data: dict) -> Receipt:
         """
@@ -227,8 +231,9 @@ class ReceiptService:
                 for item_data in items_data:
                     CRVItem.objects.create(receipt=receipt, **item_data)
             else:
-                for index, item_data in enumerate(items_data):
-                    item_code = item_data.get("item_code", f"TEMP-{receipt.id}-{index}")
+                line_specs = []
+                for item_data in items_data:
+                    item_code = (item_data.get("item_code") or "").strip()
                     item_description = item_data["item_description"]
                     unit_of_measurement = item_data.get("unit_of_measurement", "unit")
                     gl_account = item_data.get("gl_account", "4000")
@@ -242,36 +247,6 @@ class ReceiptService:
                     declaration_number = item_data.get("declaration_number", "")
                     item_type = item_data.get("item_type", "goods")
 
-                    # Get or create Item
-                    item, created = Item.objects.get_or_create(
-                        item_code=item_code,
-                        defaults={
-                            "item_description": item_description,
-                            "unit_of_measurement": unit_of_measurement,
-                            "gl_account": gl_account,
-                            "nature": nature,
-                            "tax_type": tax_type,
-                            "unit_cost": unit_cost,
-                            "hs_code": hs_code,
-                            "has_import_export": has_import_export,
-                            "declaration_number": declaration_number,
-                            "item_type": item_type,
-                        },
-                    )
-
-                    if not created:
-                        item.item_description = item_description
-                        item.unit_of_measurement = unit_of_measurement
-                        item.gl_account = gl_account
-                        item.nature = nature
-                        item.tax_type = tax_type
-                        item.unit_cost = unit_cost
-                        item.hs_code = hs_code
-                        item.has_import_export = has_import_export
-                        item.declaration_number = declaration_number
-                        item.item_type = item_type
-                        item.save()
-
                     # Calculate totals
                     quantity = Decimal(str(item_data.get("quantity", 1)))
                     discount_amount = Decimal(str(item_data.get("discount_amount", "0.00")))
@@ -291,82 +266,46 @@ class ReceiptService:
                         Decimal("0.00"), rounding=ROUND_HALF_UP
                     )
 
-                    # Create ReceiptLine
-                    ReceiptLine.objects.create(
-                        receipt=receipt,
-                        item=item,
-                        quantity=quantity,
-                        unit_cost=unit_cost,
-                        tax_type=tax_type,
-                        tax_amount=tax_amount,
-                        discount_amount=discount_amount,
-                    )
+                    snapshot = {
+                        "item_description": item_description,
+                        "unit_of_measurement": unit_of_measurement,
+                        "gl_account": gl_account,
+                        "nature": nature,
+                        "hs_code": hs_code,
+                        "has_import_export": has_import_export,
+                        "declaration_number": declaration_number,
+                        "item_type": item_type,
+                    }
+                    line_specs.append({
+                        # No item_code → identity from the normalized description/unit/tax/GL
+                        "item_code": item_code,
+                        "fingerprint": None if item_code else item_fingerprint(
+                            item_description, unit_of_measurement, tax_type, gl_account
+                        ),
+                        # Catalog defaults, only used when the Item doesn't exist yet
+                        "defaults": {**snapshot, "tax_type": tax_type, "unit_cost": unit_cost},
+                        "line": {
+                            **snapshot,
+                            "quantity": quantity,
+                            "unit_cost": unit_cost,
+                            "tax_type": tax_type,
+                            "tax_amount": tax_amount,
+                            "discount_amount": discount_amount,
+                        },
+                    })
+
+                # Get or create every Item in a fixed number of queries (existing
+                # catalog rows are left as they are; the line keeps its own snapshot)
+                items = resolve_items(line_specs)
+                ReceiptLine.objects.bulk_create([
+                    ReceiptLine(receipt=receipt, item=item, receipt_date=receipt.receipt_date, **spec["line"])
+                    for spec, item in zip(line_specs, items)
+                ])
         else:
             print("No items provided for receipt creation")
 
-        # === STEP 4: LINK TO EXISTING ReceiptDocument — MATCH (PREFIX+NUMBER) OR (NUMBER ONLY) ===
-        import re
-
-        system_number = receipt.receipt_number.strip()
-
-        # Try to split into prefix and digits (e.g., FS246 → "FS", "246")
-        match = re.match(r"^([A-Za-z]+)(\d+)$", system_number)
-        if match:
-            prefix, doc_digits = match.groups()
-            candidates = [
-                system_number,           # FS246
-                system_number.upper(),   # FS246
-                system_number.lower(),   # fs246
-                doc_digits,              # 246
-            ]
-        else:
-            # No prefix+number pattern → just use as-is
-            candidates = [system_number]
-
-        receipt_document = None
-
-        try:
-            for candidate in candidates:
-                try:
-                    # First: try exact match
-                    main_docs = MainReceiptDocument.objects.filter(receipt_number=candidate)
-                    if not main_docs.exists():
-                        # Fallback: case-insensitive
-                        main_docs = MainReceiptDocument.objects.filter(receipt_number__iexact=candidate)
-
-                    for main_doc in main_docs:
-                        try:
-                            rd = ReceiptDocument.objects.get(
-                                main_receipt=main_doc,
-                                for_company=recorded_by,
-                                linked_receipt__isnull=True,
-                                status='uploaded'
-                            )
-                            receipt_document = rd
-                            break
-                        except ReceiptDocument.DoesNotExist:
-                            continue
-                    if receipt_document:
-                        break
-                except Exception as e:
-                    import logging
-                    logger = logging.getLogger(__name__)
-                    logger.debug(f"Error matching candidate '{candidate}': {e}")
-                    continue
-
-            # 🔗 If found, link back
-            if receipt_document:
-                receipt_document.linked_receipt = receipt
-                receipt_document.status = 'processed'
-                receipt_document.save()
-                print(f"✅ Linked uploaded doc '{receipt_document.main_receipt.receipt_number}' → '{system_number}'")
-            else:
-                print(f"❌ No uploaded document found for: {system_number} (tried: {candidates})")
-
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.exception(f"Unexpected error linking document for receipt {system_number}")
+        # === STEP 4: Link the uploaded ReceiptDocument, after commit (core/tasks.py) ===
+        TaskQueue.enqueue("link_receipt_document", {"receipt_id": receipt.id})
 
         # === STEP 5: Handle Purchase Voucher (optional) ===
         if pv_data:
@@ -403,3 +342,63 @@ class ReceiptService:
             receipt.save()
 
         return receipt
+
+    @staticmethod
+    def link_uploaded_document(receipt_id: int):
+        """
+        Link the receipt to its uploaded ReceiptDocument: MATCH (PREFIX+NUMBER)
+        OR (NUMBER ONLY). Runs as a task; linking again is a no-op.
+        """
+        import re
+
+        receipt = Receipt.objects.select_related("recorded_by").get(id=receipt_id)
+        if ReceiptDocument.objects.filter(linked_receipt=receipt).exists():
+            return None
+        recorded_by = receipt.recorded_by
+        system_number = receipt.receipt_number.strip()
+
+        # Try to split into prefix and digits (e.g., FS246 → "FS", "246")
+        match = re.match(r"^([A-Za-z]+)(\d+)$", system_number)
+        if match:
+            prefix, doc_digits = match.groups()
+            candidates = [
+                system_number,           # FS246
+                system_number.upper(),   # FS246
+                system_number.lower(),   # fs246
+                doc_digits,              # 246
+            ]
+        else:
+            # No prefix+number pattern → just use as-is
+            candidates = [system_number]
+
+        with transaction.atomic():
+            receipt_document = None
+            for candidate in candidates:
+                # First: try exact match
+                main_docs = MainReceiptDocument.objects.filter(receipt_number=candidate)
+                if not main_docs.exists():
+                    # Fallback: case-insensitive
+                    main_docs = MainReceiptDocument.objects.filter(receipt_number__iexact=candidate)
+
+                for main_doc in main_docs:
+                    # Locked: two receipts with the same number must not both take it
+                    receipt_document = ReceiptDocument.objects.select_for_update().filter(
+                        main_receipt=main_doc,
+                        for_company=recorded_by,
+                        linked_receipt__isnull=True,
+                        status='uploaded'
+                    ).first()
+                    if receipt_document:
+                        break
+                if receipt_document:
+                    break
+
+            # 🔗 If found, link back
+            if receipt_document:
+                receipt_document.linked_receipt = receipt
+                receipt_document.status = 'processed'
+                receipt_document.save()
+                print(f"✅ Linked uploaded doc '{main_doc.receipt_number}' → '{system_number}'")
+            else:
+                print(f"❌ No uploaded document found for: {system_number} (tried: {candidates})")
+        return receipt_document
@@ -1,4 +1,5 @@
 # utils.py or lookup_utils.py
+from core.services.metrics import cache_result
 
 
 class RetrievingFromLookupTables:
@@ -15,7 +16,9 @@ class RetrievingFromLookupTables:
     @classmethod
     def get_category_name_by_id(cls, category_id):
         if category_id in cls._category_cache:
+            cache_result("lookup_category", True)
             return cls._category_cache[category_id]
+        cache_result("lookup_category", False)
 
         try:
             from core.models.look_up_tables import (
@@ -37,7 +40,9 @@ class RetrievingFromLookupTables:
     @classmethod
     def get_kind_name_by_id(cls, kind_id):
         if kind_id in cls._kind_cache:
+            cache_result("lookup_kind", True)
             return cls._kind_cache[kind_id]
+        cache_result("lookup_kind", False)
 
         try:
             from core.models.look_up_tables import ReceiptKind
@@ -57,7 +62,9 @@ class RetrievingFromLookupTables:
     @classmethod
     def get_type_name_by_id(cls, type_id):
         if type_id in cls._type_cache:
+            cache_result("lookup_type", True)
             return cls._type_cache[type_id]
+        cache_result("lookup_type", False)
 
         try:
             from core.models.look_up_tables import ReceiptType
@@ -77,7 +84,9 @@ class RetrievingFromLookupTables:
     @classmethod
     def get_name_name_by_id(cls, name_id):  # Or call it get_receipt_name_by_id
         if name_id in cls._name_cache:
+            cache_result("lookup_name", True)
             return cls._name_cache[name_id]
+        cache_result("lookup_name", False)
 
         try:
             from core.models.look_up_tables import ReceiptName
@@ -93,3 +102,21 @@ class RetrievingFromLookupTables:
             print(f"Error fetching receipt name (template) for ID {name_id}: {e}")
             cls._name_cache[name_id] = None
             return None
+
+    @classmethod
+    def preload(cls):
+        """Fill every cache in one query per table (worker warm-up)."""
+        from core.models.look_up_tables import (
+            ReceiptCatagory,
+            ReceiptKind,
+            ReceiptName,
+            ReceiptType,
+        )
+
+        for model, cache in (
+            (ReceiptCatagory, cls._category_cache),
+            (ReceiptKind, cls._kind_cache),
+            (ReceiptType, cls._type_cache),
+            (ReceiptName, cls._name_cache),
+        ):
+            cache.update(model.objects.values_list("id", "name"))
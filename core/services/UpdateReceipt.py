@@ -6,64 +6,84 @@ from django.shortcuts import get_object_or_404
 
 from core.models.Receipt import ReceiptLine
 from core.models.item import Item
+from core.services.item_catalog import item_fingerprint, resolve_items
+
+# Copied onto each line, as ReceiptService.create_receipt does
+SNAPSHOT_FIELDS = (
+    "item_description", "unit_of_measurement", "gl_account", "nature",
+    "hs_code", "declaration_number", "item_type", "has_import_export",
+)
 
 
 class ReceiptUpdateService:
+    @staticmethod
+    def _catalog_spec(item_data):
+        """resolve_items() spec for an item given inline (no 'item' ID)."""
+        item_code = (item_data.get("item_code") or "").strip()
+        unit_of_measurement = item_data.get("unit_of_measurement", "unit")
+        tax_type = item_data.get("tax_type", "")
+        gl_account = item_data.get("gl_account", "4000")
+        return {
+            "item_code": item_code,
+            "fingerprint": None if item_code else item_fingerprint(
+                item_data["item_description"], unit_of_measurement, tax_type, gl_account
+            ),
+            "defaults": {
+                "item_description": item_data["item_description"],
+                "unit_of_measurement": unit_of_measurement,
+                "gl_account": gl_account,
+                "nature": item_data.get("nature", "goods"),
+                "hs_code": item_data.get("hs_code", ""),
+                "declaration_number": item_data.get("declaration_number", ""),
+                "item_type": item_data.get("item_type", "goods"),
+                "has_import_export": item_data.get("has_import_export", False),
+                "tax_type": tax_type,
+                "unit_cost": Decimal(str(item_data["unit_cost"])),
+            },
+        }
+
     @staticmethod
     @transaction.atomic
     def update_receipt_items(receipt, items_data):
-        # Delete existing items
-        receipt.items.all().delete()
-
-        # Reset totals
-        subtotal = Decimal("0.00")
-        tax = Decimal("0.00")
-        claimable_vat = Decimal("0.00")
-        expired_vat = Decimal("0.00")
-
+        # Catalog item of each line: by 'item' ID, or found/created from the inline details
+        items = []
         for item_data in items_data:
-            # Extract item_id from payload
             item_id = item_data.get("item")
-            if not item_id:
-                raise ValueError("Each item must include 'item' (ID of the Item).")
+            if item_id:
+                items.append(get_object_or_404(Item, id=item_id))
+            elif item_data.get("item_description"):
+                items.append(None)
+            else:
+                raise ValueError("Each item must include 'item' (ID of the Item) or its details.")
+        inline = [item_data for item_data, item in zip(items_data, items) if item is None]
+        resolved = iter(resolve_items([ReceiptUpdateService._catalog_spec(d) for d in inline]) if inline else [])
+        items = [item or next(resolved) for item in items]
 
-            item = get_object_or_404(Item, id=item_id)
+        # Delete existing items
+        receipt.items.all().delete()
 
+        for item_data, item in zip(items_data, items):
             # Use Decimal safely
             quantity = Decimal(str(item_data.get("quantity", 1)))
             unit_cost = Decimal(str(item_data.get("unit_cost", item.unit_cost)))
             discount_amount = Decimal(str(item_data.get("discount_amount", 0)))
             tax_amount = Decimal(str(item_data.get("tax_amount", 0)))
 
-            line_subtotal = (quantity * unit_cost) - discount_amount
-            subtotal += line_subtotal
-            tax += tax_amount
-
-            is_vat_expired = item_data.get("is_vat_expired", False)
-            if is_vat_expired:
-                expired_vat += tax_amount
-            else:
-                claimable_vat += tax_amount
-
-            # Create ReceiptLine with only valid fields
+            # Create ReceiptLine; the snapshot takes the payload's values over the item's
             ReceiptLine.objects.create(
                 receipt=receipt,
                 item=item,
                 quantity=quantity,
                 unit_cost=unit_cost,
-                tax_type=item.tax_type,  # or override from payload
+                tax_type=item_data.get("tax_type") or item.tax_type,
                 tax_amount=tax_amount,
                 discount_amount=discount_amount,
+                **{
+                    field: item_data[field] if field in item_data else getattr(item, field)
+                    for field in SNAPSHOT_FIELDS
+                },
             )
 
-        # Update receipt totals
-        receipt.subtotal = subtotal
-        receipt.tax = tax
-        receipt.total = subtotal + tax
-        receipt.claimable_vat = claimable_vat
-        receipt.non_claimable_vat = Decimal("0.00")
-        receipt.expired_vat = expired_vat
-        receipt.is_vat_expired = expired_vat > Decimal("0.00")
-
+        # Totals are computed from the lines; save() refreshes expired_vat
         receipt.save()
         return receipt
@@ -0,0 +1,315 @@
+# core/services/chunked_upload.py
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from decouple import config
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedUploadError(Exception):
+    """Rejected chunk or upload; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+class AssembledUpload(UploadedFile):
+    """
+    A finished chunked upload, handed to UploadReceiptSerializer like a
+    request.FILES entry. temporary_file_path() lets FileSystemStorage move
+    the file into media/ instead of copying it.
+    """
+
+    def __init__(self, path, name, content_type, size):
+        super().__init__(open(path, "rb"), name, content_type, size)
+        self._path = path
+
+    def temporary_file_path(self):
+        return self._path
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            pass  # Moved into storage already
+
+
+class ChunkedUploadStore:
+    """
+    On-disk state of resumable uploads, one directory per upload:
+
+        <CHUNKED_UPLOAD_DIR>/<upload_id>/meta.json   owner, size, chunks, expiry
+        <CHUNKED_UPLOAD_DIR>/<upload_id>/data        bytes received so far
+
+    Chunks are appended in order (each PUT must start at the current offset),
+    so a dropped connection resumes from `offset`. The md5 of the data is
+    kept per worker while chunks stream in; a worker that did not see the
+    earlier chunks catches up by hashing the data file once.
+    Uploads untouched for CHUNKED_UPLOAD_TTL seconds are removed by
+    purge_expired() (on init, and via `manage.py purge_chunked_uploads`).
+    """
+
+    ROOT = Path(config("CHUNKED_UPLOAD_DIR", default=str(settings.BASE_DIR / "chunked_uploads")))
+    TTL = config("CHUNKED_UPLOAD_TTL", default=60 * 60 * 24, cast=int)
+    MAX_SIZE = config("CHUNKED_UPLOAD_MAX_BYTES", default=100 * 1024 * 1024, cast=int)
+    CHUNK_SIZE = 5 * 1024 * 1024  # Suggested to clients
+    BLOCK_SIZE = 64 * 1024
+    MAX_TRACKED_HASHERS = 1000
+
+    _id_re = re.compile(r"^[0-9a-f]{32}$")
+    _content_range_re = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+    # upload_id → (offset, md5) for uploads this worker has been receiving;
+    # one upload's entry is only used under its _locked(), the dict under _hashers_lock
+    _hashers = {}
+    _hashers_lock = threading.Lock()
+
+    # ========================
+    # Paths / metadata
+    # ========================
+    @classmethod
+    def _dir(cls, upload_id) -> Path:
+        if not cls._id_re.match(upload_id or ""):
+            raise ChunkedUploadError("Upload not found or expired.", status=404)
+        return cls.ROOT / upload_id
+
+    @staticmethod
+    def _write_meta(directory, meta):
+        tmp = directory / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta))
+        os.replace(tmp, directory / "meta.json")
+
+    @classmethod
+    def _read_meta(cls, upload_id, company_tin) -> dict:
+        directory = cls._dir(upload_id)
+        try:
+            meta = json.loads((directory / "meta.json").read_text())
+        except (FileNotFoundError, ValueError):
+            raise ChunkedUploadError("Upload not found or expired.", status=404)
+        if meta["company_tin"] != company_tin or meta["expires_at"] < time.time():
+            raise ChunkedUploadError("Upload not found or expired.", status=404)
+        return meta
+
+    @classmethod
+    @contextmanager
+    def _locked(cls, upload_id):
+        """Serialize writers of one upload across workers and threads."""
+        directory = cls._dir(upload_id)
+        try:
+            handle = open(directory / "lock", "a+b")
+        except FileNotFoundError:
+            raise ChunkedUploadError("Upload not found or expired.", status=404)
+        with handle:
+            if fcntl is not None:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                yield directory
+                return
+            # msvcrt locks a byte range; LK_LOCK gives up after ~10 seconds
+            handle.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(handle.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+            try:
+                yield directory
+            finally:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+
+    @staticmethod
+    def status(meta) -> dict:
+        return {
+            "upload_id": meta["upload_id"],
+            "filename": meta["filename"],
+            "size": meta["size"],
+            "offset": meta["offset"],
+            "complete": meta["offset"] == meta["size"],
+            "expires_at": meta["expires_at"],
+        }
+
+    # ========================
+    # Protocol
+    # ========================
+    @classmethod
+    def init(cls, company_tin, filename, size, content_type=None) -> dict:
+        if not filename:
+            raise ChunkedUploadError("filename is required.")
+        try:
+            size = int(size)
+        except (TypeError, ValueError):
+            raise ChunkedUploadError("size must be the total file size in bytes.")
+        if size <= 0 or size > cls.MAX_SIZE:
+            raise ChunkedUploadError(f"size must be between 1 and {cls.MAX_SIZE} bytes.", status=413)
+
+        cls.purge_expired()
+        upload_id = uuid.uuid4().hex
+        directory = cls.ROOT / upload_id
+        directory.mkdir(parents=True)
+        (directory / "data").touch()
+        meta = {
+            "upload_id": upload_id,
+            "company_tin": company_tin,
+            "filename": os.path.basename(filename),
+            "content_type": content_type or "application/octet-stream",
+            "size": size,
+            "offset": 0,
+            "chunks": [],
+            "expires_at": time.time() + cls.TTL,
+        }
+        cls._write_meta(directory, meta)
+        with cls._hashers_lock:
+            if len(cls._hashers) > cls.MAX_TRACKED_HASHERS:
+                cls._hashers.clear()  # Abandoned elsewhere; rebuilt from disk if resumed here
+            cls._hashers[upload_id] = (0, hashlib.md5())
+        return cls.status(meta)
+
+    @classmethod
+    def get(cls, upload_id, company_tin) -> dict:
+        return cls.status(cls._read_meta(upload_id, company_tin))
+
+    @classmethod
+    def parse_content_range(cls, header):
+        """'bytes 0-1048575/52428800' → (0, 1048575, 52428800)"""
+        match = cls._content_range_re.match((header or "").strip())
+        if not match:
+            raise ChunkedUploadError("Content-Range header 'bytes <start>-<end>/<size>' is required.")
+        return tuple(int(value) for value in match.groups())
+
+    @classmethod
+    def write_chunk(cls, upload_id, company_tin, content_range, stream) -> dict:
+        """Append the bytes of `stream` at `start`; returns the new status."""
+        start, end, total = cls.parse_content_range(content_range)
+        with cls._locked(upload_id) as directory:
+            meta = cls._read_meta(upload_id, company_tin)
+            if total != meta["size"] or end < start or end >= total:
+                raise ChunkedUploadError(
+                    f"Content-Range must lie within 0-{meta['size'] - 1}/{meta['size']}.",
+                    status=416, offset=meta["offset"],
+                )
+            if start != meta["offset"]:
+                raise ChunkedUploadError(
+                    f"Chunk must start at offset {meta['offset']}.",
+                    status=409, offset=meta["offset"],
+                )
+
+            hasher = cls._hasher(upload_id, directory, meta["offset"])
+            chunk_md5 = hashlib.md5()
+            expected = end - start + 1
+            received = 0
+            with open(directory / "data", "r+b") as data:
+                data.seek(start)
+                while received < expected:
+                    block = stream.read(min(cls.BLOCK_SIZE, expected - received)) if stream else b""
+                    if not block:
+                        break
+                    data.write(block)
+                    chunk_md5.update(block)
+                    hasher.update(block)
+                    received += len(block)
+                # Keep nothing from a short chunk: the client resends it
+                data.truncate(start + received if received == expected else start)
+
+            if received != expected:
+                raise ChunkedUploadError(
+                    f"Expected {expected} bytes, received {received}.",
+                    status=400, offset=meta["offset"],
+                )
+
+            meta["offset"] = start + received
+            meta["chunks"].append({"start": start, "end": end, "md5": chunk_md5.hexdigest()})
+            meta["expires_at"] = time.time() + cls.TTL
+            cls._write_meta(directory, meta)
+            with cls._hashers_lock:
+                cls._hashers[upload_id] = (meta["offset"], hasher)
+            return cls.status(meta)
+
+    @classmethod
+    def _hasher(cls, upload_id, directory, offset):
+        """
+        md5 over the first `offset` bytes, from this worker's state if it is
+        current. A copy: the cached state only moves on once a chunk is stored.
+        """
+        with cls._hashers_lock:
+            known_offset, hasher = cls._hashers.get(upload_id, (None, None))
+        if known_offset == offset:
+            return hasher.copy()
+        hasher = hashlib.md5()
+        with open(directory / "data", "rb") as data:
+            remaining = offset
+            while remaining:
+                block = data.read(min(cls.BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        return hasher
+
+    @classmethod
+    def assemble(cls, upload_id, company_tin):
+        """(AssembledUpload, md5 hex) for a complete upload."""
+        directory = cls._dir(upload_id)
+        meta = cls._read_meta(upload_id, company_tin)
+        if meta["offset"] != meta["size"]:
+            raise ChunkedUploadError(
+                f"Upload is incomplete ({meta['offset']} of {meta['size']} bytes).",
+                status=409, offset=meta["offset"],
+            )
+        digest = cls._hasher(upload_id, directory, meta["offset"]).hexdigest()
+        upload = AssembledUpload(
+            str(directory / "data"), meta["filename"], meta["content_type"], meta["size"]
+        )
+        return upload, digest
+
+    @classmethod
+    def has_data(cls, upload_id) -> bool:
+        return (cls._dir(upload_id) / "data").exists()
+
+    @classmethod
+    def discard(cls, upload_id):
+        with cls._hashers_lock:
+            cls._hashers.pop(upload_id, None)
+        shutil.rmtree(cls._dir(upload_id), ignore_errors=True)
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Remove abandoned uploads; returns how many were removed."""
+        if not cls.ROOT.exists():
+            return 0
+        now, removed = time.time(), 0
+        for entry in os.scandir(cls.ROOT):
+            if not entry.is_dir() or not cls._id_re.match(entry.name):
+                continue
+            try:
+                expires_at = json.loads(Path(entry.path, "meta.json").read_text())["expires_at"]
+            except (FileNotFoundError, ValueError, KeyError):
+                # Half-created: judge by directory age
+                expires_at = entry.stat().st_mtime + cls.TTL
+            if expires_at < now:
+                cls.discard(entry.name)
+                removed += 1
+        if removed:
+            logger.info(f"Purged {removed} expired chunked uploads")
+        return removed
@@ -0,0 +1,132 @@
+# core/services/contact_name_search.py
+
+import hashlib
+import re
+import unicodedata
+
+from django.core.cache import cache
+from django.db import connection
+
+try:
+    from rapidfuzz import fuzz, process
+except ImportError:  # Optional: names are then ranked by trigram similarity only
+    fuzz = process = None
+
+
+# ========================
+# Normalization
+# ========================
+def _ethiopic_row_map(source_row: int, target_row: int) -> dict:
+    """Map a whole syllable row (7 vowel orders + labialized form) onto another."""
+    mapping = {}
+    for order in range(8):
+        source, target = chr(source_row + order), chr(target_row + order)
+        if unicodedata.name(source, None) and unicodedata.name(target, None):
+            mapping[ord(source)] = target
+    return mapping
+
+
+# Amharic homophones: the same sound is spelled with different letters
+# (ሐ/ኀ → ሀ, ሠ → ሰ, ዐ → አ, ፀ → ጸ), so "ሐብተ" and "ሀብተ" are the same name.
+_ETHIOPIC_FOLDING = {
+    **_ethiopic_row_map(0x1210, 0x1200),
+    **_ethiopic_row_map(0x1280, 0x1200),
+    **_ethiopic_row_map(0x1220, 0x1230),
+    **_ethiopic_row_map(0x12D0, 0x12A0),
+    **_ethiopic_row_map(0x1340, 0x1338),
+}
+_SEPARATORS_RE = re.compile(r"[\W_]+", re.UNICODE)  # Also Ethiopic ፡ ። ፣ ፤
+SEARCH_NAME_MAX_LENGTH = 200  # Contact.search_name
+
+
+def normalize_contact_name(name: str) -> str:
+    """
+    Search form of a contact name, for Latin and Ethiopic (Amharic) script:
+    'Abebe  & Sons P.L.C.' → 'abebe sons p l c', 'ሐበሻ፡ ቢራ' → 'ሀበሻ ቢራ'
+    NFKC and casefold can lengthen a name ('ß' → 'ss', 'ﬁ' → 'fi'), so the
+    result is cut to fit Contact.search_name.
+    """
+    name = unicodedata.normalize("NFKC", name or "").casefold()
+    name = name.translate(_ETHIOPIC_FOLDING)
+    return _SEPARATORS_RE.sub(" ", name).strip()[:SEARCH_NAME_MAX_LENGTH].rstrip()
+
+
+# ========================
+# Search
+# ========================
+CANDIDATE_LIMIT = 200  # Rows the trigram pre-filter hands to RapidFuzz
+MIN_SCORE = 60  # RapidFuzz WRatio, 0-100
+RESULT_CACHE_TIMEOUT = 60
+
+
+def _trigram_candidates(normalized_query: str):
+    """
+    At most CANDIDATE_LIMIT contacts whose search_name shares enough trigrams
+    with the query (pg_trgm `%>`, served by the GIN trigram index), so the
+    cost doesn't grow with the contact table.
+    """
+    from django.db.models import Q
+    from core.models.contact import Contact
+
+    contacts = Contact.objects.values("id", "name", "tin_number", "address", "search_name")
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return list(
+            contacts.filter(search_name__trigram_word_similar=normalized_query)
+            .annotate(similarity=TrigramWordSimilarity(normalized_query, "search_name"))
+            .order_by("-similarity", "id")[:CANDIDATE_LIMIT]
+        )
+
+    # Other databases (local development): any word in common
+    words = Q()
+    for word in normalized_query.split():
+        words |= Q(search_name__contains=word)
+    return list(contacts.filter(words).order_by("id")[:CANDIDATE_LIMIT])
+
+
+def search_contacts_by_name(query: str, limit: int = 10) -> list:
+    """
+    Top `limit` contacts for a (possibly misspelled) name, best first:
+    [{"id", "name", "tin_number", "address", "score"}, ...].
+    Trigram pre-filter in the database, then RapidFuzz scoring of the
+    candidates' normalized names. Results are cached briefly.
+    """
+    normalized_query = normalize_contact_name(query)
+    if len(normalized_query) < 2:
+        return []
+
+    digest = hashlib.blake2b(normalized_query.encode("utf-8"), digest_size=16).hexdigest()
+    key = f"contact_name_search:{digest}:{limit}"
+    results = cache.get(key)
+    if results is not None:
+        return results
+
+    candidates = {row["id"]: row for row in _trigram_candidates(normalized_query)}
+    if process is not None:
+        matches = process.extract(
+            normalized_query,
+            {contact_id: row["search_name"] for contact_id, row in candidates.items()},
+            scorer=fuzz.WRatio,
+            limit=limit,
+            score_cutoff=MIN_SCORE,
+        )
+        ranked = [(contact_id, round(score, 1)) for _, score, contact_id in matches]
+    else:
+        ranked = [
+            (contact_id, round(row.get("similarity", 0) * 100, 1))
+            for contact_id, row in list(candidates.items())[:limit]
+        ]
+
+    results = [
+        {
+            "id": contact_id,
+            "name": candidates[contact_id]["name"],
+            "tin_number": candidates[contact_id]["tin_number"],
+            "address": candidates[contact_id]["address"],
+            "score": score,
+        }
+        for contact_id, score in ranked
+    ]
+    cache.set(key, results, RESULT_CACHE_TIMEOUT)
+    return results
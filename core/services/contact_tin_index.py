@@ -0,0 +1,246 @@
+# core/services/contact_tin_index.py
+
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.core.cache import cache
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+TIN_LENGTH = 10
+
+
+def tin_prefix_range(prefix: str):
+    """
+    TINs are exactly 10 digits, so a prefix is a contiguous integer range:
+    '12' → [1200000000, 1300000000)
+    """
+    scale = 10 ** (TIN_LENGTH - len(prefix))
+    low = int(prefix) * scale
+    return low, low + scale
+
+
+class ContactTinIndex:
+    """
+    Per-worker, in-memory index of every contact's TIN for prefix typeahead.
+
+    Two parallel arrays sorted by TIN (8 bytes each per contact, ~16 MB at
+    1M contacts); a prefix is a bisect over an integer range, no DB hit.
+
+    Workers stay in sync through a change journal in the shared cache:
+    every committed Contact change gets a sequence number (see
+    note_change). On each lookup a worker reads the sequence counter and
+    replays the entries it hasn't seen. If the journal has a gap (evicted
+    entries, cache outage) or the index is older than MAX_AGE, the worker
+    reloads from the database instead.
+    """
+
+    CACHE_PREFIX = "contact_tin_index"
+    JOURNAL_TIMEOUT = 60 * 60  # 1 hour
+    MAX_REPLAY = 1000  # More pending changes than this → full reload
+    MAX_AGE = 60 * 60  # Full reload at least hourly
+    USAGE_TIMEOUT = 60 * 5  # Per-company usage ranking cache
+    LOAD_CHUNK_SIZE = 20000
+
+    _lock = threading.Lock()
+    _tins = array("q")
+    _ids = array("q")
+    _sequence = None  # Last journal entry applied; None → not loaded
+    _loaded_at = 0.0
+
+    # ========================
+    # Change journal (shared cache)
+    # ========================
+    @classmethod
+    def _sequence_key(cls) -> str:
+        return f"{cls.CACHE_PREFIX}:seq"
+
+    @classmethod
+    def _entry_key(cls, sequence: int) -> str:
+        return f"{cls.CACHE_PREFIX}:change:{sequence}"
+
+    @classmethod
+    def _current_sequence(cls):
+        return cache.get(cls._sequence_key())
+
+    @classmethod
+    def note_change(cls, contact_id: int, old_tin=None, new_tin=None):
+        """
+        Record a committed Contact change: insert (old_tin=None),
+        TIN change, or delete (new_tin=None).
+        Every worker (this one included) replays it, in order, on its next lookup.
+        """
+        cls.note_changes([(contact_id, old_tin, new_tin)])
+
+    @classmethod
+    def note_changes(cls, changes):
+        """
+        note_change() for many (contact_id, old_tin, new_tin) at once.
+        Batches larger than MAX_REPLAY only advance the counter (no entries),
+        so workers reload instead of replaying them one by one.
+        """
+        changes = list(changes)
+        if not changes:
+            return
+        try:
+            last = cache.incr(cls._sequence_key(), len(changes))
+        except ValueError:
+            # Counter missing (evicted): restart it; workers see it go
+            # backwards and reload
+            cache.add(cls._sequence_key(), 0, timeout=None)
+            return
+        if last is None:
+            # Cache unreachable: keep at least this worker current
+            with cls._lock:
+                if cls._sequence is not None:
+                    for change in changes:
+                        cls._apply(*change)
+            return
+        if len(changes) > cls.MAX_REPLAY:
+            return
+        first = last - len(changes) + 1
+        cache.set_many(
+            {cls._entry_key(first + i): change for i, change in enumerate(changes)},
+            cls.JOURNAL_TIMEOUT,
+        )
+
+    @classmethod
+    def _apply(cls, contact_id, old_tin, new_tin):
+        if old_tin:
+            cls._remove(int(old_tin), contact_id)
+        if new_tin:
+            cls._remove(int(new_tin), contact_id)  # Replays are idempotent
+            position = bisect_right(cls._tins, int(new_tin))
+            cls._tins.insert(position, int(new_tin))
+            cls._ids.insert(position, contact_id)
+
+    @classmethod
+    def _remove(cls, tin: int, contact_id: int):
+        position = bisect_left(cls._tins, tin)
+        while position < len(cls._tins) and cls._tins[position] == tin:
+            if cls._ids[position] == contact_id:
+                del cls._tins[position]
+                del cls._ids[position]
+                return
+            position += 1
+
+    # ========================
+    # Loading & syncing
+    # ========================
+    @classmethod
+    def _reload(cls):
+        from core.models.contact import Contact
+
+        # Read the counter first: changes committed during the load are replayed
+        cache.add(cls._sequence_key(), 0, timeout=None)
+        sequence = cls._current_sequence()
+        pairs = []
+        rows = Contact.objects.order_by().values_list("tin_number", "id")
+        for tin, contact_id in rows.iterator(chunk_size=cls.LOAD_CHUNK_SIZE):
+            if tin and tin.isascii() and tin.isdigit():
+                pairs.append((int(tin), contact_id))
+        pairs.sort()
+
+        cls._tins = array("q", (tin for tin, _ in pairs))
+        cls._ids = array("q", (contact_id for _, contact_id in pairs))
+        cls._sequence = sequence or 0
+        cls._loaded_at = time.monotonic()
+        logger.info(f"Contact TIN index loaded: {len(pairs)} contacts")
+
+    @classmethod
+    def _sync(cls):
+        """Bring this worker's index up to date. Caller holds the lock."""
+        stale = time.monotonic() - cls._loaded_at > cls.MAX_AGE
+        if cls._sequence is None or stale:
+            cls._reload()
+            return
+        current = cls._current_sequence()
+        if current is None or current == cls._sequence:
+            return  # Up to date, or cache unreachable (MAX_AGE still applies)
+        if current < cls._sequence:
+            cls._reload()  # Counter was reset
+            return
+        if current - cls._sequence > cls.MAX_REPLAY:
+            cls._reload()
+            return
+
+        wanted = [cls._entry_key(s) for s in range(cls._sequence + 1, current + 1)]
+        entries = cache.get_many(wanted)
+        if len(entries) != len(wanted):
+            cls._reload()  # Journal gap: can't replay safely
+            return
+        for key in wanted:
+            cls._apply(*entries[key])
+        cls._sequence = current
+
+    # ========================
+    # Usage ranking
+    # ========================
+    @classmethod
+    def company_usage(cls, company_tin: str) -> list:
+        """
+        Contacts the company has dealt with, most receipts first:
+        [(tin, contact_id, receipt_count), ...]. Cached in the shared cache.
+        """
+        from core.models.Receipt import Receipt
+
+        key = f"{cls.CACHE_PREFIX}:usage:{company_tin}"
+        usage = cache.get(key)
+        if usage is not None:
+            return usage
+
+        counts = {}
+        receipts = Receipt.objects.filter(recorded_by__tin_number=company_tin).order_by()
+        for party in ("issued_by", "issued_to"):
+            rows = receipts.values_list(f"{party}__tin_number", f"{party}_id").annotate(
+                receipt_count=Count("id")
+            )
+            for tin, contact_id, receipt_count in rows:
+                if tin == company_tin:
+                    continue  # The company itself is on every receipt
+                previous = counts.get(contact_id, (tin, 0))[1]
+                counts[contact_id] = (tin, previous + receipt_count)
+
+        usage = sorted(
+            ((tin, contact_id, n) for contact_id, (tin, n) in counts.items()),
+            key=lambda row: (-row[2], row[0]),
+        )
+        cache.set(key, usage, cls.USAGE_TIMEOUT)
+        return usage
+
+    @classmethod
+    def forget_company_usage(cls, company_tin: str):
+        cache.delete(f"{cls.CACHE_PREFIX}:usage:{company_tin}")
+
+    # ========================
+    # Public API
+    # ========================
+    @classmethod
+    def search(cls, prefix: str, limit: int, company_tin: str = None) -> list:
+        """
+        Up to `limit` contact ids whose TIN starts with `prefix` (digits only):
+        the company's most-used contacts first, then the rest in TIN order.
+        """
+        results = []
+        if company_tin:
+            for tin, contact_id, _ in cls.company_usage(company_tin):
+                if tin and tin.startswith(prefix):
+                    results.append(contact_id)
+                    if len(results) == limit:
+                        return results
+
+        low, high = tin_prefix_range(prefix)
+        seen = set(results)
+        with cls._lock:
+            cls._sync()
+            position = bisect_left(cls._tins, low)
+            while len(results) < limit and position < len(cls._tins) and cls._tins[position] < high:
+                contact_id = cls._ids[position]
+                if contact_id not in seen:
+                    results.append(contact_id)
+                position += 1
+        return results
@@ -0,0 +1,112 @@
+# core/services/db_warmup.py
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from core.models.contact import Contact
+from core.models.Documents import MainReceiptDocument, ReceiptDocument
+from core.models.DraftReceipt import DraftReceipt
+from core.models.Receipt import Receipt
+from core.services.RetrivingFromLookUpTables import RetrievingFromLookupTables
+
+logger = logging.getLogger(__name__)
+
+NO_TIN = "0000000000"
+
+
+def _get(queryset, **filters):
+    try:
+        return queryset.get(**filters)
+    except queryset.model.DoesNotExist:
+        return None
+
+
+# Statements on the request hot paths (company lookup by TIN, duplicate
+# checks on create / upload, draft autosave), written the way the views
+# and serializers issue them so the SQL text, and so any prepared
+# statement, is the same. The parameters match no rows.
+HOT_STATEMENTS = [
+    lambda using: _get(Contact.objects.using(using), tin_number=NO_TIN),
+    lambda using: Receipt.objects.using(using).filter(receipt_number__iexact="-", recorded_by_id=0).exists(),
+    lambda using: MainReceiptDocument.objects.using(using).filter(
+        receipt_number__iexact="-", company_tin__iexact=NO_TIN
+    ).exists(),
+    lambda using: MainReceiptDocument.objects.using(using).filter(main_receipt_hash="-").exists(),
+    lambda using: _get(
+        ReceiptDocument.objects.using(using),
+        main_receipt__receipt_number__iexact="-", for_company_id=0,
+        linked_receipt__isnull=True, status="uploaded",
+    ),
+    lambda using: _get(DraftReceipt.objects.using(using), company_id=0, uploaded_document_number="-"),
+]
+
+
+def _run_hot_statements(alias, repeat):
+    for _ in range(repeat):
+        for statement in HOT_STATEMENTS:
+            statement(alias)
+
+
+def _warm_pooled_connection(alias, repeat, barrier):
+    try:
+        _run_hot_statements(alias, repeat)
+        # Hold this connection until every thread has one, so each thread
+        # warms a different pooled connection
+        barrier.wait(timeout=30)
+    except threading.BrokenBarrierError:
+        pass
+    finally:
+        connections[alias].close()  # Back to the pool
+
+
+def warm_up(aliases=None):
+    """
+    Open each database's connections before the first request:
+
+    - pooled (DB_POOL): open the pool, wait for its min_size connections
+      and run HOT_STATEMENTS on each of them
+    - persistent (CONN_MAX_AGE): connect this thread and run them once
+
+    With server-side prepared statements on (DB_PREPARE_THRESHOLD=n) every
+    statement runs n times per connection, which makes psycopg prepare it
+    there. The lookup-table caches are filled as well. Failures are logged,
+    never raised: a cold worker is still a working worker.
+    """
+    started = time.perf_counter()
+    repeat = max(1, settings.DB_PREPARE_THRESHOLD or 1)
+    for alias in aliases or connections:
+        connection = connections[alias]
+        try:
+            pool = getattr(connection, "pool", None)
+            if pool is None:
+                connection.ensure_connection()
+                _run_hot_statements(alias, repeat)
+                continue
+
+            pool.open(wait=True, timeout=pool.timeout)
+            barrier = threading.Barrier(pool.min_size)
+            threads = [
+                threading.Thread(target=_warm_pooled_connection, args=(alias, repeat, barrier))
+                for _ in range(pool.min_size)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        except Exception as e:
+            logger.warning(f"Database warm-up of '{alias}' failed: {e}")
+            if getattr(connection, "pool", None) is not None:
+                # A pool that failed to open is closed for good: drop it so
+                # the first request creates a fresh one
+                connection.close_pool()
+            close_old_connections()
+
+    try:
+        RetrievingFromLookupTables.preload()
+    except Exception as e:
+        logger.warning(f"Lookup table preload failed: {e}")
+    logger.info(f"Database warm-up done in {(time.perf_counter() - started) * 1000:.0f} ms")
@@ -0,0 +1,237 @@
+# core/services/document_files.py
+
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from decouple import config
+from django.core.cache import cache
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.urls import reverse
+from django.utils.http import http_date
+
+logger = logging.getLogger(__name__)
+
+# kind (URL segment) → (relation on ReceiptDocument, file field, filename field,
+#                       content type field, stored content-hash field or None)
+DOCUMENT_FILES = {
+    "main": (
+        "main_receipt", "main_receipt", "main_receipt_filename",
+        "main_receipt_content_type", "main_receipt_hash",
+    ),
+    "main-attachment": (
+        "main_receipt", "attachment", "attachment_filename",
+        "attachment_content_type", None,
+    ),
+    "withholding": (
+        "withholding_receipt", "withholding_receipt", "withholding_receipt_filename",
+        "withholding_receipt_content_type", None,
+    ),
+    "withholding-attachment": (
+        "withholding_receipt", "withholding_attachment", "withholding_attachment_filename",
+        "withholding_attachment_content_type", None,
+    ),
+}
+
+
+class DocumentFileServer:
+    """
+    Serve a stored receipt file with HTTP caching and byte ranges.
+
+    - ETag: strong, the file's content hash (the stored main_receipt_hash,
+      or an md5 computed once and cached per name/size/mtime for the rest)
+    - If-None-Match → 304; Range / If-Range → 206 (single range) or 416
+    - Cache-Control: long-lived and immutable when the URL carries the
+      matching ?v=<etag> (see download_url), otherwise revalidate each time
+    - DOCUMENT_FILE_BACKEND=nginx → X-Accel-Redirect to
+      DOCUMENT_ACCEL_REDIRECT_PREFIX + <storage name>; =sendfile → X-Sendfile
+      with the absolute path. The front server then streams the bytes and
+      handles ranges itself; Django only checks access and sets headers.
+    """
+
+    BACKEND = config("DOCUMENT_FILE_BACKEND", default="django").lower()
+    ACCEL_REDIRECT_PREFIX = config("DOCUMENT_ACCEL_REDIRECT_PREFIX", default="/protected-media/")
+    MAX_AGE = config("DOCUMENT_CACHE_MAX_AGE", default=60 * 60 * 24 * 365, cast=int)
+    BLOCK_SIZE = 64 * 1024
+    HASH_CACHE_PREFIX = "document_file_hash"
+
+    _range_re = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+    # ========================
+    # Lookup
+    # ========================
+    @staticmethod
+    def resolve(document, kind):
+        """(FieldFile, filename, content_type, stored_hash) or None if there is no such file."""
+        relation, file_field, filename_field, type_field, hash_field = DOCUMENT_FILES[kind]
+        owner = getattr(document, relation)
+        if owner is None:
+            return None
+        field_file = getattr(owner, file_field)
+        if not field_file:
+            return None
+        filename = getattr(owner, filename_field) or os.path.basename(field_file.name)
+        content_type = (
+            getattr(owner, type_field)
+            or mimetypes.guess_type(filename)[0]
+            or "application/octet-stream"
+        )
+        stored_hash = getattr(owner, hash_field) if hash_field else None
+        return field_file, filename, content_type, stored_hash
+
+    @staticmethod
+    def download_url(request, document_id, kind, version=None):
+        url = reverse("document-file-download", kwargs={"id": document_id, "kind": kind})
+        if version:
+            url = f"{url}?v={version}"
+        return request.build_absolute_uri(url) if request is not None else url
+
+    # ========================
+    # Validators
+    # ========================
+    @classmethod
+    def content_hash(cls, field_file, size, modified, stored_hash=None) -> str:
+        if stored_hash:
+            return stored_hash
+        key = f"{cls.HASH_CACHE_PREFIX}:{hashlib.sha256(field_file.name.encode()).hexdigest()}:{size}:{modified}"
+        digest = cache.get(key)
+        if digest is None:
+            md5 = hashlib.md5()
+            with field_file.storage.open(field_file.name, "rb") as handle:
+                for block in iter(lambda: handle.read(cls.BLOCK_SIZE), b""):
+                    md5.update(block)
+            digest = md5.hexdigest()
+            cache.set(key, digest, None)
+        return digest
+
+    @staticmethod
+    def _etag_matches(header, etag) -> bool:
+        if not header:
+            return False
+        if header.strip() == "*":
+            return True
+        # Comparison for If-None-Match is weak: W/"x" matches "x"
+        tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+        return etag in tags
+
+    @classmethod
+    def parse_range(cls, header, size):
+        """
+        (start, end) inclusive for a single 'bytes=' range, 'invalid' if it
+        cannot be satisfied, None to ignore the header and send everything
+        (malformed, multiple ranges, other units).
+        """
+        match = cls._range_re.match((header or "").strip())
+        if not match:
+            return None
+        first, last = match.groups()
+        if not first and not last:
+            return None
+        if not first:  # suffix: last N bytes
+            length = int(last)
+            if length == 0:
+                return "invalid"
+            return max(size - length, 0), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if last and int(last) < start:
+            return None
+        if start >= size:
+            return "invalid"
+        return start, end
+
+    # ========================
+    # Response
+    # ========================
+    @classmethod
+    def serve(cls, request, field_file, filename, content_type, stored_hash=None, as_attachment=False):
+        storage = field_file.storage
+        try:
+            size = storage.size(field_file.name)
+            modified = storage.get_modified_time(field_file.name)
+        except (FileNotFoundError, OSError):
+            logger.warning(f"Document file missing from storage: {field_file.name}")
+            return None
+
+        etag = f'"{cls.content_hash(field_file, size, modified.timestamp(), stored_hash)}"'
+        versioned = request.GET.get("v") == etag.strip('"')
+        headers = {
+            "ETag": etag,
+            "Last-Modified": http_date(modified.timestamp()),
+            "Cache-Control": (
+                f"private, max-age={cls.MAX_AGE}, immutable" if versioned else "private, no-cache"
+            ),
+            "Accept-Ranges": "bytes",
+        }
+
+        if cls._etag_matches(request.headers.get("If-None-Match"), etag):
+            response = HttpResponseNotModified()
+            for name, value in headers.items():
+                response.headers[name] = value
+            return response
+
+        disposition = "attachment" if as_attachment or request.GET.get("download") else "inline"
+        headers["Content-Disposition"] = (
+            f"{disposition}; filename*=UTF-8''{quote(filename)}"
+        )
+
+        if cls.BACKEND in ("nginx", "sendfile"):
+            response = HttpResponse(content_type=content_type)
+            if cls.BACKEND == "nginx":
+                response.headers["X-Accel-Redirect"] = cls.ACCEL_REDIRECT_PREFIX + quote(field_file.name)
+            else:
+                response.headers["X-Sendfile"] = storage.path(field_file.name)
+            for name, value in headers.items():
+                response.headers[name] = value
+            return response
+
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if request.headers.get("Range") and (not if_range or if_range.strip() == etag):
+            byte_range = cls.parse_range(request.headers["Range"], size)
+
+        if byte_range == "invalid":
+            response = HttpResponse(status=416)
+            response.headers["Content-Range"] = f"bytes */{size}"
+            return response
+
+        handle = storage.open(field_file.name, "rb")
+        if byte_range is None:
+            response = FileResponse(handle, content_type=content_type)
+            response.block_size = cls.BLOCK_SIZE
+            response.headers["Content-Length"] = str(size)
+        else:
+            start, end = byte_range
+            handle.seek(start)
+            response = FileResponse(
+                _BoundedFile(handle, end - start + 1), status=206, content_type=content_type
+            )
+            response.block_size = cls.BLOCK_SIZE
+            response.headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response.headers["Content-Length"] = str(end - start + 1)
+        for name, value in headers.items():
+            response.headers[name] = value
+        return response
+
+
+class _BoundedFile:
+    """Read at most `length` bytes from an open file (the body of a 206)."""
+
+    def __init__(self, handle, length):
+        self._handle = handle
+        self._remaining = length
+
+    def read(self, size=-1):
+        if self._remaining <= 0:
+            return b""
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._handle.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._handle.close()
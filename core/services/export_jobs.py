@@ -0,0 +1,138 @@
+# core/services/export_jobs.py
+
+import logging
+import os
+import socket
+import tempfile
+from datetime import timedelta
+
+from decouple import config
+from django.core.files import File
+from django.utils import timezone
+
+from core.models.ExportJob import ExportJob
+from core.services.receipt_export import ReceiptExport, write_csv, write_pdf, write_xlsx
+from core.services.receipt_filters import RECEIPT_FILTER_PARAMS
+from core.services.task_queue import TaskQueue
+from global_config.routers import read_replica
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+
+class ExportQueue:
+    """
+    Receipt exports requested through POST /api/exports. Each ExportJob
+    row is produced by a `run_export_job` task (core/tasks.py), so export
+    jobs share TaskQueue's claiming, stale-worker retry and `runworker`
+    processes. They never run eagerly: a large export must not hold the
+    request that queued it.
+
+    - progress (rows_done) doubles as the job's heartbeat
+    - a job whose task was abandoned MAX_ATTEMPTS times is marked FAILED,
+      and files and rows older than RETENTION_DAYS are deleted, by
+      purge_expired() (a TaskQueue cleanup, run by the workers)
+    """
+
+    MAX_ATTEMPTS = 3
+    RETENTION_DAYS = config("EXPORT_RETENTION_DAYS", default=7, cast=int)
+
+    # ========================
+    # Producer side
+    # ========================
+    @staticmethod
+    def enqueue(company_tin, format, mode, filters) -> ExportJob:
+        filters = {key: str(value) for key, value in (filters or {}).items() if key in RECEIPT_FILTER_PARAMS}
+        job = ExportJob.objects.create(
+            company_tin=company_tin, format=format, mode=mode, filters=filters
+        )
+        TaskQueue.enqueue("run_export_job", {"job_id": job.pk})
+        return job
+
+    # ========================
+    # Worker side
+    # ========================
+    @classmethod
+    def run_job(cls, job_id):
+        """Mark the job RUNNING and produce it (again, if a worker died on it)."""
+        job = ExportJob.objects.get(pk=job_id)
+        if job.status in (ExportJob.SUCCEEDED, ExportJob.FAILED):
+            return job
+        now = timezone.now()
+        job.status = ExportJob.RUNNING
+        job.worker = f"{socket.gethostname()}:{os.getpid()}"
+        job.attempts += 1
+        job.started_at = now
+        job.heartbeat_at = now
+        job.rows_done = 0
+        job.save(update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at", "rows_done"])
+        return cls.run(job)
+
+    @classmethod
+    def run(cls, job):
+        """Produce the job's file; the job ends SUCCEEDED or FAILED."""
+        export = ReceiptExport(job.company_tin, job.filters, job.mode)
+
+        def progress(done):
+            ExportJob.objects.filter(pk=job.pk).update(rows_done=done, heartbeat_at=timezone.now())
+
+        try:
+            # Reads from a replica unless the company wrote moments ago
+            with read_replica(job.company_tin):
+                job.rows_total = export.count()
+                ExportJob.objects.filter(pk=job.pk).update(rows_total=job.rows_total)
+
+                fd, path = tempfile.mkstemp(suffix=f".{job.format}")
+                try:
+                    if job.format == "csv":
+                        with os.fdopen(fd, "w", newline="", encoding="utf-8") as handle:
+                            job.rows_done = write_csv(export, handle, progress)
+                    else:
+                        os.close(fd)
+                        if job.format == "xlsx":
+                            job.rows_done = write_xlsx(export, path, progress)
+                        else:
+                            filters = "&".join(f"{key}={value}" for key, value in job.filters.items())
+                            job.rows_done = write_pdf(export, path, progress, filters)
+                    with open(path, "rb") as handle:
+                        job.file.save(f"export.{job.format}", File(handle), save=False)
+                finally:
+                    os.remove(path)
+        except Exception as e:
+            logger.error(f"Export {job.pk} failed: {e}", exc_info=True)
+            job.status = ExportJob.FAILED
+            job.error = str(e)
+        else:
+            job.status = ExportJob.SUCCEEDED
+            job.error = ""
+            if job.rows_done < job.rows_total:
+                # PDF cap; the POST refuses larger exports, but receipts may have been added since
+                job.error = f"Truncated: {job.rows_done} of {job.rows_total} rows (PDF limit)."
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "file", "rows_total", "rows_done", "finished_at"])
+        logger.info(f"Export {job.pk} {job.status}: {job.rows_done} rows")
+        return job
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Fail jobs abandoned MAX_ATTEMPTS times; delete old jobs and their files."""
+        now = timezone.now()
+        ExportJob.objects.filter(
+            status=ExportJob.RUNNING,
+            heartbeat_at__lt=now - TaskQueue.STALE_AFTER,
+            attempts__gte=cls.MAX_ATTEMPTS,
+        ).update(status=ExportJob.FAILED, error="Worker stopped responding.", finished_at=now)
+
+        cutoff = now - timedelta(days=cls.RETENTION_DAYS)
+        removed = 0
+        for job in ExportJob.objects.filter(created_at__lt=cutoff).exclude(status=ExportJob.RUNNING):
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
+            removed += 1
+        return removed
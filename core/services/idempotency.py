@@ -0,0 +1,173 @@
+# core/services/idempotency.py
+
+import hashlib
+import json
+import logging
+import time
+
+from decouple import config
+from django.core.cache import cache
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework import status
+from rest_framework.response import Response
+
+logger = logging.getLogger(__name__)
+
+
+class IdempotencyStore:
+    """
+    First response per (company, Idempotency-Key), kept in the shared cache.
+
+    - claim()   → take the in-flight lock for a key (False if someone has it,
+                  None if the cache is unreachable: django-redis with
+                  IGNORE_EXCEPTIONS answers None instead of raising)
+    - save()    → store the final response and release the lock
+    - release() → drop the lock without storing (e.g. a 5xx worth retrying)
+    """
+
+    CACHE_PREFIX = "idempotency"
+    TTL = config("IDEMPOTENCY_TTL", default=60 * 60 * 24, cast=int)
+    LOCK_TIMEOUT = 120  # seconds; longer than any upload we accept
+
+    @classmethod
+    def _key(cls, company_tin: str, idempotency_key: str) -> str:
+        digest = hashlib.sha256(idempotency_key.encode("utf-8")).hexdigest()
+        return f"{cls.CACHE_PREFIX}:{company_tin}:{digest}"
+
+    @classmethod
+    def get(cls, company_tin, idempotency_key):
+        return cache.get(cls._key(company_tin, idempotency_key))
+
+    @classmethod
+    def claim(cls, company_tin, idempotency_key):
+        return cache.add(f"{cls._key(company_tin, idempotency_key)}:lock", 1, cls.LOCK_TIMEOUT)
+
+    @classmethod
+    def save(cls, company_tin, idempotency_key, record: dict):
+        cache.set(cls._key(company_tin, idempotency_key), record, cls.TTL)
+        cls.release(company_tin, idempotency_key)
+
+    @classmethod
+    def release(cls, company_tin, idempotency_key):
+        cache.delete(f"{cls._key(company_tin, idempotency_key)}:lock")
+
+
+class IdempotencyKeyMixin:
+    """
+    View mixin: honour an `Idempotency-Key` header on POST.
+
+    The first request with a key runs normally and its response is stored
+    for the company (IdempotencyStore.TTL). Retries with the same key get
+    that response back (header `Idempotent-Replayed: true`) without running
+    the view again. A duplicate that arrives while the first is still
+    running waits for it, up to WAIT_TIMEOUT, then gets 409.
+    Reusing a key on a different endpoint or with a different body is a 422.
+    While the cache is unreachable, requests run without replay protection.
+    """
+
+    IDEMPOTENCY_HEADER = "Idempotency-Key"
+    MAX_KEY_LENGTH = 255
+    WAIT_TIMEOUT = 30  # seconds
+    POLL_INTERVAL = 0.1
+    CACHE_UNAVAILABLE = object()  # _stored_or_claim(): the cache did not answer
+    # Transient outcomes: not stored, so a retry runs the request again
+    NOT_STORED_STATUSES = {
+        status.HTTP_401_UNAUTHORIZED,
+        status.HTTP_409_CONFLICT,
+        status.HTTP_429_TOO_MANY_REQUESTS,
+    }
+
+    def post(self, request, *args, **kwargs):
+        idempotency_key = request.headers.get(self.IDEMPOTENCY_HEADER, "").strip()
+        company_tin = getattr(request, "company_tin", None)
+        if not idempotency_key or not company_tin:
+            return super().post(request, *args, **kwargs)
+
+        if len(idempotency_key) > self.MAX_KEY_LENGTH or not idempotency_key.isprintable():
+            return Response(
+                {"error": f"{self.IDEMPOTENCY_HEADER} must be at most {self.MAX_KEY_LENGTH} printable characters."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = self.fingerprint(request)
+        record = self._stored_or_claim(company_tin, idempotency_key)
+        if record is self.CACHE_UNAVAILABLE:
+            logger.warning(f"Cache unavailable: {request.path} runs without Idempotency-Key protection")
+            return super().post(request, *args, **kwargs)
+        if record is None:
+            return Response(
+                {"error": "A request with this Idempotency-Key is still being processed. Retry later."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if record is not True:
+            return self._replay(request, record, fingerprint)
+
+        try:
+            response = super().post(request, *args, **kwargs)
+        except Exception:
+            IdempotencyStore.release(company_tin, idempotency_key)
+            raise
+
+        if response.status_code >= 500 or response.status_code in self.NOT_STORED_STATUSES:
+            IdempotencyStore.release(company_tin, idempotency_key)
+            return response
+
+        IdempotencyStore.save(company_tin, idempotency_key, {
+            "path": request.path,
+            "fingerprint": fingerprint,
+            "status": response.status_code,
+            "data": response.data,
+        })
+        return response
+
+    def _stored_or_claim(self, company_tin, idempotency_key):
+        """
+        Stored record, True if we now own the key, None if still busy after
+        waiting, CACHE_UNAVAILABLE if the cache is down (don't wait for it).
+        """
+        deadline = time.monotonic() + self.WAIT_TIMEOUT
+        while True:
+            record = IdempotencyStore.get(company_tin, idempotency_key)
+            if record is not None:
+                return record
+            claimed = IdempotencyStore.claim(company_tin, idempotency_key)
+            if claimed is None:
+                return self.CACHE_UNAVAILABLE
+            if claimed:
+                # The first request may have finished between get() and claim()
+                record = IdempotencyStore.get(company_tin, idempotency_key)
+                if record is not None:
+                    IdempotencyStore.release(company_tin, idempotency_key)
+                    return record
+                return True
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(self.POLL_INTERVAL)
+
+    @staticmethod
+    def fingerprint(request) -> str:
+        """
+        sha256 of the parsed body. Uploaded files count by name, size and
+        content type only: reading them would cost every retry a full pass.
+        """
+
+        def encode(value):
+            if isinstance(value, UploadedFile):
+                return {"file": value.name, "size": value.size, "content_type": value.content_type}
+            return value
+
+        data = request.data
+        if hasattr(data, "lists"):  # Form / multipart QueryDict
+            data = {key: [encode(value) for value in values] for key, values in data.lists()}
+        body = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def _replay(self, request, record, fingerprint):
+        # Records stored before fingerprints were kept have none
+        if record["path"] != request.path or record.get("fingerprint", fingerprint) != fingerprint:
+            return Response(
+                {"error": "This Idempotency-Key was already used for a different request."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        logger.info(f"Replaying stored response for {request.path} (Idempotency-Key)")
+        return Response(record["data"], status=record["status"], headers={"Idempotent-Replayed": "true"})
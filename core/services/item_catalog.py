@@ -0,0 +1,134 @@
+# core/services/item_catalog.py
+
+import hashlib
+import logging
+import unicodedata
+
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+AUTO_CODE_PREFIX = "AUTO-"
+TEMP_CODE_PREFIX = "TEMP-"  # Legacy per-receipt codes, merged by merge_temp_items()
+
+# Line fields copied onto each ReceiptLine (what the receipt said), and used
+# as catalog defaults when the Item is first created.
+SNAPSHOT_FIELDS = [
+    "item_description",
+    "unit_of_measurement",
+    "gl_account",
+    "nature",
+    "hs_code",
+    "declaration_number",
+    "item_type",
+    "has_import_export",
+]
+
+
+def _normalize(value) -> str:
+    return " ".join(unicodedata.normalize("NFKC", str(value or "")).casefold().split())
+
+
+def item_fingerprint(item_description, unit_of_measurement, tax_type, gl_account) -> str:
+    """
+    Identity of an item that has no item_code:
+    sha256 of the normalized (description, unit, tax_type, gl_account).
+    """
+    key = "\x1f".join(
+        _normalize(part)
+        for part in (item_description, unit_of_measurement, tax_type, gl_account)
+    )
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def auto_item_code(fingerprint: str) -> str:
+    """Stable item_code for a fingerprinted item: 'AUTO-' + 15 hex digits (20 chars)."""
+    return f"{AUTO_CODE_PREFIX}{fingerprint[:15].upper()}"
+
+
+def resolve_items(lines) -> list:
+    """
+    Item for each line spec (dicts with item_code or fingerprint, plus
+    `defaults` for a new Item), in order. Existing items are never modified.
+    Fixed number of queries regardless of line count: lookup, insert the
+    missing ones (ignoring concurrent inserts), re-read those.
+    """
+    from core.models.item import Item
+
+    def lookup():
+        codes = [line["item_code"] for line in lines if line["item_code"]]
+        fingerprints = [line["fingerprint"] for line in lines if not line["item_code"]]
+        by_code = Item.objects.in_bulk(codes, field_name="item_code") if codes else {}
+        by_fingerprint = (
+            Item.objects.in_bulk(fingerprints, field_name="fingerprint") if fingerprints else {}
+        )
+        return [
+            by_code.get(line["item_code"]) if line["item_code"]
+            else by_fingerprint.get(line["fingerprint"])
+            for line in lines
+        ]
+
+    items = lookup()
+    missing, seen = [], set()
+    for line, item in zip(lines, items):
+        key = line["item_code"] or line["fingerprint"]
+        if item is None and key not in seen:
+            seen.add(key)
+            missing.append(
+                Item(
+                    item_code=line["item_code"] or auto_item_code(line["fingerprint"]),
+                    fingerprint=None if line["item_code"] else line["fingerprint"],
+                    **line["defaults"],
+                )
+            )
+    if missing:
+        Item.objects.bulk_create(missing, ignore_conflicts=True)
+        items = lookup()
+    return items
+
+
+def merge_temp_items(batch_size=500) -> dict:
+    """
+    Fold legacy TEMP-<receipt>-<index> items into canonical fingerprinted ones:
+    lines are re-pointed to the canonical item and the TEMP rows deleted.
+    Lines keep their own snapshot fields, so nothing shown on a receipt changes.
+    Safe to re-run; processes `batch_size` TEMP items per transaction.
+    """
+    from core.models.item import Item
+    from core.models.Receipt import ReceiptLine
+
+    stats = {"merged": 0, "promoted": 0}
+    while True:
+        with transaction.atomic():
+            temp_items = list(
+                Item.objects.select_for_update(skip_locked=True)
+                .filter(item_code__startswith=TEMP_CODE_PREFIX)
+                .order_by("id")[:batch_size]
+            )
+            if not temp_items:
+                return stats
+
+            groups = {}
+            for item in temp_items:
+                fingerprint = item_fingerprint(
+                    item.item_description, item.unit_of_measurement, item.tax_type, item.gl_account
+                )
+                groups.setdefault(fingerprint, []).append(item)
+
+            canonical = Item.objects.in_bulk(list(groups), field_name="fingerprint")
+            for fingerprint, duplicates in groups.items():
+                target = canonical.get(fingerprint)
+                if target is None:
+                    # First of its kind: the oldest TEMP item becomes canonical
+                    target, duplicates = duplicates[0], duplicates[1:]
+                    target.fingerprint = fingerprint
+                    target.item_code = auto_item_code(fingerprint)
+                    target.save(update_fields=["fingerprint", "item_code"])
+                    stats["promoted"] += 1
+                if duplicates:
+                    duplicate_ids = [item.id for item in duplicates]
+                    ReceiptLine.objects.filter(item_id__in=duplicate_ids).update(item=target)
+                    Item.objects.filter(id__in=duplicate_ids).delete()
+                    stats["merged"] += len(duplicate_ids)
+
+        logger.info(f"Merged TEMP items so far: {stats}")
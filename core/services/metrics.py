@@ -0,0 +1,119 @@
+# core/services/metrics.py
+"""
+Prometheus metrics, served at /metrics (core/views/MetricsView.py).
+
+Multi-worker (gunicorn): set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory before the workers start (and wipe it on each deploy). Every
+worker then writes its samples to mmap'd files there and /metrics sums
+them, whichever worker answers. Without it, each worker reports only its
+own counts.
+
+Only counters and histograms are used: a sample is a lock plus an in-memory
+(or mmap) add, so the hot paths pay microseconds. Rates such as draft
+autosaves per minute come from PromQL, e.g.
+    rate(receipt_draft_autosaves_total[5m]) * 60
+"""
+
+import functools
+import os
+import time
+
+try:
+    import prometheus_client
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except ImportError:  # Optional: metrics disabled, /metrics answers 503
+    prometheus_client = None
+
+
+class _NullMetric:
+    """Stand-in when prometheus_client is not installed: records nothing."""
+
+    def labels(self, *args, **kwargs):
+        return self
+
+    def inc(self, amount=1):
+        pass
+
+    def observe(self, amount):
+        pass
+
+
+def _counter(name, documentation, labelnames=()):
+    if prometheus_client is None:
+        return _NullMetric()
+    return Counter(name, documentation, labelnames)
+
+
+def _histogram(name, documentation, buckets, labelnames=()):
+    if prometheus_client is None:
+        return _NullMetric()
+    return Histogram(name, documentation, labelnames, buckets=buckets)
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# ========================
+# Receipts
+# ========================
+RECEIPTS_CREATED = _counter("receipts_created_total", "Receipts created by ReceiptService.create_receipt.")
+RECEIPT_CREATE_SECONDS = _histogram(
+    "receipt_create_seconds", "ReceiptService.create_receipt latency, commit included.", SECONDS_BUCKETS
+)
+RECEIPT_LINES = _histogram(
+    "receipt_lines", "Lines per created receipt.", (1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+)
+
+# ========================
+# Uploads
+# ========================
+UPLOAD_BYTES = _histogram(
+    "receipt_upload_bytes", "Size of files received by UploadReceiptSerializer.",
+    (16 * 1024, 64 * 1024, 256 * 1024, 1024 ** 2, 4 * 1024 ** 2, 16 * 1024 ** 2, 64 * 1024 ** 2),
+    ["field"],
+)
+UPLOAD_HASH_SECONDS = _histogram(
+    "receipt_upload_hash_seconds", "Time to md5 an uploaded main receipt for the duplicate check.",
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+# ========================
+# Drafts, caches, search
+# ========================
+DRAFT_AUTOSAVES = _counter("receipt_draft_autosaves_total", "Drafts saved through PATCH /api/drafts.")
+CACHE_REQUESTS = _counter(
+    "cache_requests_total", "In-process cache lookups by cache and result (hit / miss).", ["cache", "result"]
+)
+SEARCH_SECONDS = _histogram(
+    "receipt_search_seconds", "ReceiptSearchView latency by group_by ('none' when ungrouped).",
+    SECONDS_BUCKETS, ["group_by"],
+)
+
+
+def cache_result(cache_name, hit):
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+def track_receipt_creation(func):
+    """Decorator for create_receipt(validated_data): latency, count and line count of successes."""
+
+    @functools.wraps(func)
+    def wrapper(validated_data, *args, **kwargs):
+        lines = len(validated_data.get("items") or [])  # create_receipt pops "items"
+        started = time.perf_counter()
+        receipt = func(validated_data, *args, **kwargs)
+        RECEIPT_CREATE_SECONDS.observe(time.perf_counter() - started)
+        RECEIPTS_CREATED.inc()
+        RECEIPT_LINES.observe(lines)
+        return receipt
+
+    return wrapper
+
+
+def render():
+    """(body, content type) of the current samples, summed across workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,346 @@
+# core/services/receipt_archive.py
+"""
+Cold archive of closed fiscal years: their receipts, lines, CRV items and
+document links move out of the hot tables into gzipped JSON Lines files in
+default_storage (archive/receipts/fy2016/<first id>-<last id>.jsonl.gz),
+leaving an ArchivedReceipt stub per receipt.
+
+- Each receipt is its own gzip member (the file still gunzips as a whole),
+  and its stub keeps the member's offset and length: fetching one archived
+  receipt reads a few KB, not the file.
+- A member holds the raw rows (what restore() puts back, same ids) and the
+  detail view's output at archive time (what ReceiptDetailView serves).
+- Stubs carry the columns ReceiptSearchView filters on; search lists them
+  with ?include_archived=true (see filter_archived_receipts).
+- archive_chunk() / restore_chunk() each move up to CHUNK_SIZE receipts in
+  one transaction (the file is written first and deleted on rollback), so
+  a stopped job resumes where it stopped. Rows are claimed with SKIP
+  LOCKED: two jobs on the same year share the work.
+- The `archive_receipts` task (core/tasks.py) runs chunks for TIME_BUDGET
+  seconds, then queues itself again; `manage.py archive_receipts` starts it.
+
+Archived receipts are not in exports, grouped search results or the
+company's receipt list until restored.
+"""
+
+import gzip
+import json
+import logging
+import time
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from decouple import config
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Min
+
+from core.models.ArchivedReceipt import ArchivedReceipt
+from core.models.CRVITEM import CRVItem
+from core.models.Documents import ReceiptDocument, Withholding
+from core.models.PurchaseVoucher import PurchaseVoucher
+from core.models.Receipt import Receipt, ReceiptLine
+from core.serializers.ReceiptDisplaySerializer import ReceiptListSerializer
+from core.services.receipt_partitions import ReceiptPartitions
+from global_config.renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value):
+    if isinstance(value, date):  # Dates and datetimes
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot archive {type(value).__name__} values")
+
+
+def _load_row(model, row):
+    """A `model` instance from an archived .values() row (columns added since get their defaults)."""
+    fields = {field.attname: field for field in model._meta.concrete_fields}
+    return model(**{name: fields[name].to_python(value) for name, value in row.items() if name in fields})
+
+
+def _bulk_restore(model, objects):
+    """bulk_create `objects` keeping their auto_now / auto_now_add timestamps."""
+    stamped = [
+        field.attname
+        for field in model._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    stamps = [[getattr(obj, name) for name in stamped] for obj in objects]
+    model.objects.bulk_create(objects)
+    if stamped and objects:
+        # bulk_create stamped them with now: put the archived values back
+        for obj, values in zip(objects, stamps):
+            for name, value in zip(stamped, values):
+                setattr(obj, name, value)
+        model.objects.bulk_update(objects, stamped)
+
+
+class ReceiptArchive:
+    CHUNK_SIZE = config("RECEIPT_ARCHIVE_CHUNK_SIZE", default=500, cast=int)
+    TIME_BUDGET = config("RECEIPT_ARCHIVE_TIME_BUDGET", default=60, cast=int)  # Seconds per task run
+    CACHE_TIMEOUT = 3600  # Archived detail payloads
+    PREFIX = "archive/receipts"
+
+    # ========================
+    # Which years
+    # ========================
+    @staticmethod
+    def is_closed(year, today=None) -> bool:
+        return year < ReceiptPartitions.fiscal_year(today or date.today())
+
+    @staticmethod
+    def cutoff_year(today=None) -> int:
+        """Oldest fiscal year kept hot: the current one and RECEIPT_ARCHIVE_KEEP_YEARS closed ones."""
+        return ReceiptPartitions.fiscal_year(today or date.today()) - settings.RECEIPT_ARCHIVE_KEEP_YEARS
+
+    @classmethod
+    def archivable_years(cls, today=None) -> list:
+        """Fiscal years before the cutoff that still have receipts in the hot tables."""
+        cutoff = cls.cutoff_year(today)
+        start, _ = ReceiptPartitions.bounds(cutoff)
+        oldest = Receipt.objects.filter(receipt_date__lt=start).aggregate(oldest=Min("receipt_date"))["oldest"]
+        if oldest is None:
+            return []
+        return list(range(ReceiptPartitions.fiscal_year(oldest), cutoff))
+
+    @staticmethod
+    def archived_years() -> list:
+        return list(
+            ArchivedReceipt.objects.order_by("fiscal_year").values_list("fiscal_year", flat=True).distinct()
+        )
+
+    # ========================
+    # Jobs
+    # ========================
+    @classmethod
+    def run(cls, year, restore=False, time_budget=None, log=logger.info):
+        """
+        Archive (or restore) `year` chunk by chunk until it is done or
+        `time_budget` seconds (default TIME_BUDGET) have passed.
+        Returns (receipts moved, finished).
+        """
+        if not restore and not cls.is_closed(year):
+            raise RuntimeError(f"Fiscal year {year} is not closed yet.")
+        step = cls.restore_chunk if restore else cls.archive_chunk
+        deadline = time.monotonic() + (cls.TIME_BUDGET if time_budget is None else time_budget)
+        moved = 0
+        while True:
+            count = step(year)
+            moved += count
+            if count:
+                log(f"FY{year}: {'restored' if restore else 'archived'} {moved} receipts")
+            if count < cls.CHUNK_SIZE:
+                return moved, True
+            if time.monotonic() >= deadline:
+                return moved, False
+
+    @classmethod
+    def archive_chunk(cls, year) -> int:
+        """Move the next CHUNK_SIZE receipts of `year` to the archive. Returns how many."""
+        start, end = ReceiptPartitions.bounds(year)
+        name = None
+        try:
+            with transaction.atomic():
+                ids = list(
+                    Receipt.objects.select_for_update(skip_locked=True)
+                    .filter(receipt_date__gte=start, receipt_date__lt=end)
+                    .order_by("id")
+                    .values_list("id", flat=True)[: cls.CHUNK_SIZE]
+                )
+                if not ids:
+                    return 0
+                records = cls._records(ids, start, end)
+                name, members = cls._write(year, ids, records)
+                ArchivedReceipt.objects.bulk_create(
+                    cls._stub(record, year, name, offset, length)
+                    for record, (offset, length) in zip(records, members)
+                )
+                # Lines and CRV items cascade; document links are set to NULL
+                Receipt.objects.filter(id__in=ids).delete()
+        except Exception:
+            if name:
+                default_storage.delete(name)  # Rolled back: nothing points at it
+            raise
+        return len(ids)
+
+    @classmethod
+    def restore_chunk(cls, year) -> int:
+        """Put the next CHUNK_SIZE archived receipts of `year` back. Returns how many."""
+        with transaction.atomic():
+            stubs = list(
+                ArchivedReceipt.objects.select_for_update(skip_locked=True)
+                .filter(fiscal_year=year)
+                .order_by("archive_name", "offset")
+                .only("id", "archive_name", "offset", "length")[: cls.CHUNK_SIZE]
+            )
+            if not stubs:
+                return 0
+            records = cls._read(stubs)
+
+            receipts = [_load_row(Receipt, record["receipt"]) for record in records]
+            cls._drop_missing_links(receipts)
+            _bulk_restore(Receipt, receipts)
+            _bulk_restore(ReceiptLine, [_load_row(ReceiptLine, row) for r in records for row in r["lines"]])
+            _bulk_restore(CRVItem, [_load_row(CRVItem, row) for r in records for row in r["crv_items"]])
+
+            # Documents not linked to another receipt in the meantime
+            links = {record["document"]: record["id"] for record in records if record["document"]}
+            documents = list(
+                ReceiptDocument.objects.filter(id__in=links, linked_receipt__isnull=True).only("id")
+            )
+            for document in documents:
+                document.linked_receipt_id = links[document.id]
+            ReceiptDocument.objects.bulk_update(documents, ["linked_receipt"])
+
+            ids = [stub.id for stub in stubs]
+            ArchivedReceipt.objects.filter(id__in=ids).delete()
+            names = {stub.archive_name for stub in stubs}
+            transaction.on_commit(lambda: cls._delete_unreferenced(names))
+            transaction.on_commit(lambda: cache.delete_many([cls._cache_key(pk) for pk in ids]))
+        return len(stubs)
+
+    # ========================
+    # On-demand reads
+    # ========================
+    @classmethod
+    def display(cls, receipt_id):
+        """ReceiptDetailView's data for an archived receipt (all fields), or None if it isn't archived."""
+        key = cls._cache_key(receipt_id)
+        data = cache.get(key)
+        if data is None:
+            stub = ArchivedReceipt.objects.filter(id=receipt_id).only("archive_name", "offset", "length").first()
+            if stub is None:
+                return None
+            data = cls._read([stub])[0]["display"]
+            cache.set(key, data, cls.CACHE_TIMEOUT)
+        return data
+
+    @staticmethod
+    def _cache_key(receipt_id):
+        return f"receipt_archive:{receipt_id}"
+
+    # ========================
+    # Store
+    # ========================
+    @staticmethod
+    def _records(ids, start, end):
+        """One dict per receipt (in `ids` order): raw rows, document link and display data."""
+        lines, crv_items = defaultdict(list), defaultdict(list)
+        # The date range prunes the line partitions (see ReceiptLine.receipt_date)
+        for row in ReceiptLine.objects.filter(
+            receipt_id__in=ids, receipt_date__gte=start, receipt_date__lt=end
+        ).order_by("id").values():
+            lines[row["receipt_id"]].append(row)
+        for row in CRVItem.objects.filter(receipt_id__in=ids).order_by("id").values():
+            crv_items[row["receipt_id"]].append(row)
+        documents = dict(
+            ReceiptDocument.objects.filter(linked_receipt_id__in=ids).values_list("linked_receipt_id", "id")
+        )
+        receipts = {row["id"]: row for row in Receipt.objects.filter(id__in=ids).values()}
+        # As the API renders it (Decimals become numbers, dates strings)
+        display = {
+            data["id"]: data
+            for data in json.loads(FastJSONRenderer().render(ReceiptListSerializer(
+                Receipt.objects.for_fields(ReceiptListSerializer.Meta.fields).filter(id__in=ids), many=True
+            ).data))
+        }
+        return [
+            {
+                "id": pk,
+                "receipt": receipts[pk],
+                "lines": lines[pk],
+                "crv_items": crv_items[pk],
+                "document": documents.get(pk),
+                "display": display[pk],
+            }
+            for pk in ids
+        ]
+
+    @classmethod
+    def _write(cls, year, ids, records):
+        """Save the records as one file; returns its storage name and each member's (offset, length)."""
+        content, members = bytearray(), []
+        for record in records:
+            line = json.dumps(record, default=_json_default, separators=(",", ":")) + "\n"
+            member = gzip.compress(line.encode(), mtime=0)
+            members.append((len(content), len(member)))
+            content += member
+
+        name = f"{cls.PREFIX}/fy{year}/{ids[0]}-{ids[-1]}.jsonl.gz"
+        if default_storage.exists(name) and not ArchivedReceipt.objects.filter(archive_name=name).exists():
+            default_storage.delete(name)  # Left by an attempt that did not commit
+        return default_storage.save(name, ContentFile(bytes(content))), members
+
+    @staticmethod
+    def _read(stubs):
+        """The archived records of `stubs`, in order (each file opened once)."""
+        by_file = defaultdict(list)
+        for stub in stubs:
+            by_file[stub.archive_name].append(stub)
+        records = {}
+        for name, file_stubs in by_file.items():
+            with default_storage.open(name, "rb") as handle:
+                for stub in file_stubs:
+                    handle.seek(stub.offset)
+                    records[stub.id] = json.loads(gzip.decompress(handle.read(stub.length)))
+        return [records[stub.id] for stub in stubs]
+
+    @staticmethod
+    def _delete_unreferenced(names):
+        referenced = set(
+            ArchivedReceipt.objects.filter(archive_name__in=names).values_list("archive_name", flat=True)
+        )
+        for name in set(names) - referenced:
+            default_storage.delete(name)
+
+    @staticmethod
+    def _stub(record, year, name, offset, length):
+        receipt, display = record["receipt"], record["display"]
+        tax_types = sorted({line["tax_type"].upper() for line in record["lines"] if line["tax_type"]})
+        return ArchivedReceipt(
+            id=receipt["id"],
+            fiscal_year=year,
+            recorded_by_id=receipt["recorded_by_id"],
+            issued_by_id=receipt["issued_by_id"],
+            issued_to_id=receipt["issued_to_id"],
+            receipt_number=receipt["receipt_number"],
+            receipt_date=receipt["receipt_date"],
+            calendar_type=receipt["calendar_type"],
+            receipt_category_id=receipt["receipt_category_id"],
+            receipt_kind_id=receipt["receipt_kind_id"],
+            receipt_type_id=receipt["receipt_type_id"],
+            receipt_name_id=receipt["receipt_name_id"],
+            reason_of_receiving=receipt["reason_of_receiving"],
+            expired_vat=receipt["expired_vat"],
+            created_at=receipt["created_at"],
+            subtotal=Decimal(display["subtotal"]),
+            tax=Decimal(display["tax"]),
+            tax_types=f",{','.join(tax_types)}," if tax_types else "",
+            archive_name=name,
+            offset=offset,
+            length=length,
+        )
+
+    @staticmethod
+    def _drop_missing_links(receipts):
+        """Vouchers / withholdings deleted or re-linked while archived: NULL, as on_delete=SET_NULL would have."""
+        voucher_ids = {r.purchase_recipt_number_id for r in receipts} - {None}
+        free_vouchers = set(
+            PurchaseVoucher.objects.filter(id__in=voucher_ids, linked_receipt__isnull=True).values_list("id", flat=True)
+        ) if voucher_ids else set()
+        withholding_ids = {r.withholding_receipt_number_id for r in receipts} - {None}
+        withholdings = set(
+            Withholding.objects.filter(id__in=withholding_ids).values_list("id", flat=True)
+        ) if withholding_ids else set()
+        for receipt in receipts:
+            if receipt.purchase_recipt_number_id not in free_vouchers:
+                receipt.purchase_recipt_number_id = None
+            if receipt.withholding_receipt_number_id not in withholdings:
+                receipt.withholding_receipt_number_id = None
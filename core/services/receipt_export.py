@@ -0,0 +1,268 @@
+# core/services/receipt_export.py
+
+import csv
+import io
+from datetime import date, datetime
+from decimal import Decimal
+
+from decouple import config
+from django.db import transaction
+from django.db.models import ExpressionWrapper, F
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from core.managers.receipt_managers import MONEY_FIELD
+from core.services.receipt_filters import filter_receipts, line_date_filter
+
+try:
+    import openpyxl
+except ImportError:  # Optional: XLSX exports disabled
+    openpyxl = None
+
+try:
+    from weasyprint import HTML
+except ImportError:  # Optional: PDF exports disabled
+    HTML = None
+
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=2000, cast=int)
+PDF_MAX_ROWS = config("EXPORT_PDF_MAX_ROWS", default=5000, cast=int)
+
+CENT = Decimal("0.01")
+
+EXPORT_MODES = ("receipts", "lines")
+EXPORT_FORMATS = ("csv", "xlsx", "pdf")
+
+# ========================
+# Columns
+# ========================
+# (header, values_list lookup); rows come out in this order
+RECEIPT_COLUMNS = [
+    ("receipt_number", "receipt_number"),
+    ("receipt_date", "receipt_date"),
+    ("calendar_type", "calendar_type"),
+    ("issued_by", "issued_by__name"),
+    ("issued_by_tin", "issued_by__tin_number"),
+    ("issued_to", "issued_to__name"),
+    ("issued_to_tin", "issued_to__tin_number"),
+    ("category", "receipt_category__name"),
+    ("kind", "receipt_kind__name"),
+    ("name", "receipt_name__name"),
+    ("type", "receipt_type__name"),
+    ("subtotal", "line_subtotal"),
+    ("tax", "line_tax"),
+    ("total", "line_total"),
+    ("claimable_vat", "claimable_vat"),
+    ("non_claimable_vat", "non_claimable_vat"),
+    ("is_vat_expired", "is_vat_expired"),
+    ("reason", "reason_of_receiving"),
+    ("created_at", "created_at"),
+]
+
+LINE_COLUMNS = [
+    ("receipt_number", "receipt__receipt_number"),
+    ("receipt_date", "receipt__receipt_date"),
+    ("issued_by", "receipt__issued_by__name"),
+    ("issued_by_tin", "receipt__issued_by__tin_number"),
+    ("issued_to", "receipt__issued_to__name"),
+    ("category", "receipt__receipt_category__name"),
+    ("item_code", "item__item_code"),
+    ("item_description", "item_description"),
+    ("unit_of_measurement", "unit_of_measurement"),
+    ("quantity", "quantity"),
+    ("unit_cost", "unit_cost"),
+    ("discount_amount", "discount_amount"),
+    ("subtotal", "line_subtotal"),
+    ("tax_type", "tax_type"),
+    ("tax_amount", "tax_amount"),
+    ("total", "line_total"),
+    ("gl_account", "gl_account"),
+    ("hs_code", "hs_code"),
+    ("declaration_number", "declaration_number"),
+]
+
+
+def _cell(value):
+    """Spreadsheet-friendly scalar: ISO dates, plain decimals, '' for NULL."""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, Decimal):
+        return value.quantize(CENT)  # Every money/quantity column has 2 places
+    return value
+
+
+class ReceiptExport:
+    """
+    Rows of the company's receipts (mode="receipts", one row per receipt) or
+    of their lines (mode="lines"), filtered like ReceiptSearchView.
+    Rows are read with values_list() + iterator(chunk_size=...): a
+    server-side cursor on Postgres, so memory stays flat however many rows
+    there are. Iterate inside a transaction (rows() does) so the cursor
+    survives a transaction-pooling proxy.
+    """
+
+    def __init__(self, company_tin, params, mode="receipts"):
+        if mode not in EXPORT_MODES:
+            raise ValueError(f"mode must be one of {', '.join(EXPORT_MODES)}")
+        self.company_tin = company_tin
+        self.params = params
+        self.mode = mode
+        self.columns = RECEIPT_COLUMNS if mode == "receipts" else LINE_COLUMNS
+        self.headers = [header for header, _ in self.columns]
+
+    def receipts(self):
+        from core.models.Receipt import Receipt
+
+        receipts = Receipt.objects.filter(recorded_by__tin_number=self.company_tin)
+        return filter_receipts(receipts, self.params)
+
+    def queryset(self):
+        from core.models.Receipt import Receipt, ReceiptLine, is_date_expired
+
+        tax_type = self.params.get("tax_type")
+        if self.mode == "receipts":
+            # subtotal/tax/total count lines of the requested tax_type,
+            # claimable / non-claimable VAT the whole receipt (as in search)
+            queryset = (
+                self.receipts()
+                .with_totals(tax_type=tax_type, prefix="line")
+                .annotate(line_total=ExpressionWrapper(F("line_subtotal") + F("line_tax"), output_field=MONEY_FIELD))
+                .order_by("receipt_date", "id")
+            )
+            if tax_type:  # Otherwise line_tax already is the whole receipt's tax
+                queryset = queryset.with_totals()
+            self._calendar_labels = dict(Receipt._meta.get_field("calendar_type").choices)
+            self._is_expired = is_date_expired
+        else:
+            queryset = ReceiptLine.objects.filter(
+                line_date_filter(self.params), receipt__in=self.receipts().values("id")
+            )
+            if tax_type:
+                queryset = queryset.filter(tax_type__iexact=tax_type)
+            subtotal = F("quantity") * F("unit_cost") - F("discount_amount")
+            queryset = queryset.annotate(
+                line_subtotal=ExpressionWrapper(subtotal, output_field=MONEY_FIELD),
+                line_total=ExpressionWrapper(subtotal + F("tax_amount"), output_field=MONEY_FIELD),
+            ).order_by("receipt__receipt_date", "receipt_id", "id")
+        return queryset
+
+    def count(self) -> int:
+        return self.queryset().order_by().count()
+
+    def _lookups(self):
+        lookups = [lookup for _, lookup in self.columns]
+        if self.mode == "receipts":
+            # Computed in Python from these
+            for computed in ("claimable_vat", "non_claimable_vat", "is_vat_expired"):
+                lookups.remove(computed)
+            lookups.append("annotated_tax" if self.params.get("tax_type") else "line_tax")
+        return lookups
+
+    def rows(self, chunk_size=EXPORT_CHUNK_SIZE):
+        """Yield one list of cell values per row, in `headers` order."""
+        queryset = self.queryset()
+        lookups = self._lookups()
+        with transaction.atomic(using=queryset.db):  # The replica's, when routed to one
+            for values in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+                if self.mode == "receipts":
+                    yield self._receipt_row(dict(zip(lookups, values)))
+                else:
+                    yield [_cell(value) for value in values]
+
+    def _receipt_row(self, record):
+        expired = self._is_expired(record["receipt_date"])
+        tax = record.get("annotated_tax", record["line_tax"])
+        record["calendar_type"] = self._calendar_labels.get(record["calendar_type"], record["calendar_type"])
+        record["claimable_vat"] = Decimal("0.00") if expired else tax
+        record["non_claimable_vat"] = tax if expired else Decimal("0.00")
+        record["is_vat_expired"] = expired
+        return [_cell(record[lookup]) for _, lookup in self.columns]
+
+
+# ========================
+# File writers
+# ========================
+def _report(progress, done, every=EXPORT_CHUNK_SIZE):
+    if progress and done % every == 0:
+        progress(done)
+
+
+def write_csv(export, handle, progress=None) -> int:
+    """Write the export as UTF-8 CSV (with BOM, for Excel) to a text handle."""
+    handle.write("\ufeff")
+    writer = csv.writer(handle)
+    writer.writerow(export.headers)
+    done = 0
+    for row in export.rows():
+        writer.writerow(row)
+        done += 1
+        _report(progress, done)
+    return done
+
+
+def iter_csv(export, batch_rows=500):
+    """
+    The export as CSV text chunks, for StreamingHttpResponse. The header is
+    yielded before the query runs (first byte right away); rows then go
+    through one csv.writer over a reused buffer, `batch_rows` per chunk.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export.headers)
+    yield "\ufeff" + buffer.getvalue()
+
+    pending = 0
+    buffer.seek(0)
+    buffer.truncate()
+    for row in export.rows():
+        writer.writerow(row)
+        pending += 1
+        if pending == batch_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def write_xlsx(export, path, progress=None) -> int:
+    if openpyxl is None:
+        raise RuntimeError("XLSX export requires openpyxl.")
+    workbook = openpyxl.Workbook(write_only=True)  # Rows streamed to disk
+    sheet = workbook.create_sheet(export.mode)
+    sheet.append(export.headers)
+    done = 0
+    for row in export.rows():
+        sheet.append([float(value) if isinstance(value, Decimal) else value for value in row])
+        done += 1
+        _report(progress, done)
+    workbook.save(path)
+    return done
+
+
+def write_pdf(export, path, progress=None, filters="") -> int:
+    """Receipts report (templetes/pdf/receipt_report.html), at most PDF_MAX_ROWS rows."""
+    if HTML is None:
+        raise RuntimeError("PDF export requires weasyprint.")
+    data = []
+    for row in export.rows():
+        record = dict(zip(export.headers, row))
+        record["is_vat_expired"] = record["is_vat_expired"] == "true"
+        data.append(record)
+        _report(progress, len(data))
+        if len(data) >= PDF_MAX_ROWS:
+            break
+    html_string = render_to_string("pdf/receipt_report.html", {
+        "title": "Receipts Report",
+        "generated_at": timezone.now(),
+        "data": {"count": len(data), "data": data},
+        "query_params": filters,
+    })
+    HTML(string=html_string).write_pdf(target=path)
+    return len(data)
@@ -0,0 +1,134 @@
+# core/services/receipt_filters.py
+
+import operator
+from decimal import Decimal
+from functools import reduce
+
+from django.db.models import Q
+
+# Query parameters understood by filter_receipts (ReceiptSearchView, exports)
+RECEIPT_FILTER_PARAMS = (
+    "query",
+    "receipt_number",
+    "category",
+    "kind",
+    "name",
+    "type",
+    "issued_to",
+    "issued_by",
+    "calendar_type",
+    "is_vat_expired",
+    "from_date",
+    "to_date",
+    "tax_type",
+)
+
+
+def filter_receipts(receipts, params):
+    """
+    Apply the ReceiptSearchView filters in `params` (a QueryDict or plain
+    dict of strings) to a Receipt queryset.
+    """
+    query = (params.get("query") or "").strip()
+    receipt_number = params.get("receipt_number")
+    category = params.get("category")
+    kind = params.get("kind")
+    name = params.get("name")
+    receipt_type = params.get("type")
+    issued_to = params.get("issued_to")
+    issued_by = params.get("issued_by")
+    calendar_type = params.get("calendar_type")
+    is_vat_expired = params.get("is_vat_expired")
+    from_date = params.get("from_date")
+    to_date = params.get("to_date")
+    tax_type = params.get("tax_type")
+
+    if receipt_number:
+        receipts = receipts.filter(receipt_number__iexact=receipt_number)
+
+    if category:
+        categories = [cat.strip() for cat in category.split(",") if cat.strip()]
+        if categories:
+            q_objects = reduce(
+                operator.or_,
+                (Q(receipt_category__name__iexact=cat) for cat in categories),
+            )
+            receipts = receipts.filter(q_objects)
+
+    if kind:
+        receipts = receipts.filter(receipt_kind__name__iexact=kind)
+
+    if name:
+        receipts = receipts.filter(receipt_name__name__iexact=name)
+
+    if receipt_type:
+        receipts = receipts.filter(receipt_type__name__iexact=receipt_type)
+
+    if issued_to:
+        receipts = receipts.filter(issued_to__name__icontains=issued_to)
+
+    if issued_by:
+        receipts = receipts.filter(issued_by__name__icontains=issued_by)
+
+    if calendar_type:
+        receipts = receipts.filter(calendar_type=calendar_type)
+
+    if from_date:
+        receipts = receipts.filter(receipt_date__gte=from_date)
+
+    if to_date:
+        receipts = receipts.filter(receipt_date__lte=to_date)
+
+    if is_vat_expired == "true":
+        receipts = receipts.filter(expired_vat__gt=Decimal("0.00"))
+    elif is_vat_expired == "false":
+        receipts = receipts.filter(expired_vat=Decimal("0.00"))
+
+    # Filter by tax_type on related items if requested
+    if tax_type:
+        receipts = receipts.filter(
+            line_date_filter(params, prefix="items__"), items__tax_type__iexact=tax_type
+        ).distinct()
+
+    # Global search (unless receipt_number was used specifically)
+    if query and not receipt_number:
+        receipts = receipts.filter(
+            Q(receipt_number__icontains=query)
+            | Q(receipt_category__name__icontains=query)
+            | Q(receipt_kind__name__icontains=query)
+            | Q(receipt_name__name__icontains=query)
+            | Q(issued_to__name__icontains=query)
+            | Q(issued_by__name__icontains=query)
+            | Q(reason_of_receiving__icontains=query)
+        )
+
+    return receipts
+
+
+def filter_archived_receipts(stubs, params):
+    """
+    The same filters on an ArchivedReceipt queryset: the stubs keep the
+    header columns and relations filter_receipts uses, and the lines' tax
+    types (`tax_type` matches receipts having a line of that type).
+    """
+    tax_type = params.get("tax_type")
+    stubs = filter_receipts(
+        stubs, {key: params.get(key) for key in RECEIPT_FILTER_PARAMS if key != "tax_type"}
+    )
+    if tax_type:
+        stubs = stubs.filter(tax_types__contains=f",{tax_type.strip().upper()},")
+    return stubs
+
+
+def line_date_filter(params, prefix=""):
+    """
+    from_date / to_date on ReceiptLine.receipt_date (`prefix` from a Receipt
+    queryset): redundant with the receipt's date, but prunes the line
+    partitions when the tables are partitioned.
+    """
+    condition = Q()
+    if params.get("from_date"):
+        condition &= Q(**{f"{prefix}receipt_date__gte": params.get("from_date")})
+    if params.get("to_date"):
+        condition &= Q(**{f"{prefix}receipt_date__lte": params.get("to_date")})
+    return condition
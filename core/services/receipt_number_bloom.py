@@ -0,0 +1,240 @@
+# core/services/receipt_number_bloom.py
+
+import hashlib
+import logging
+import math
+import time
+
+from django.core.cache import cache
+from django.db.models.functions import Upper
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_receipt_number(receipt_number: str) -> str:
+    """Receipt numbers are compared case-insensitively: ' inv-001 ' → 'INV-001'"""
+    return (receipt_number or "").strip().upper()
+
+
+class ReceiptNumberBloomFilter:
+    """
+    Per-company Bloom filter of receipt numbers, kept in the shared cache.
+
+    - might_contain() == False → the receipt number is definitely NOT recorded
+    - might_contain() == True  → maybe recorded, confirm with the database
+
+    Each company has a generation counter. A filter is stored under its
+    generation, so bumping the counter atomically retires the cached filter
+    and any rebuild that was in flight. Deletes bump the generation, and so
+    does any insert that can't be applied safely — a stale filter can only
+    cause an extra DB check, never hide a recorded receipt.
+    """
+
+    CACHE_PREFIX = "receipt_number_bloom"
+    CACHE_TIMEOUT = 60 * 60 * 24  # 1 day
+    LOCK_TIMEOUT = 5  # seconds
+    LOCK_RETRIES = 5
+    FALSE_POSITIVE_RATE = 0.01
+    MIN_CAPACITY = 1024
+    GROWTH_FACTOR = 2
+
+    def __init__(self, capacity: int, bits: bytearray = None, count: int = 0):
+        self.capacity = max(int(capacity), self.MIN_CAPACITY)
+        # m = -n·ln(p) / ln(2)²,  k = m/n · ln(2)
+        self.size = int(
+            math.ceil(-self.capacity * math.log(self.FALSE_POSITIVE_RATE) / (math.log(2) ** 2))
+        )
+        self.hash_count = max(1, int(round(self.size / self.capacity * math.log(2))))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    # ========================
+    # Bit operations
+    # ========================
+    def _positions(self, receipt_number: str):
+        digest = hashlib.blake2b(
+            normalize_receipt_number(receipt_number).encode("utf-8"), digest_size=16
+        ).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, receipt_number: str):
+        for pos in self._positions(receipt_number):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def might_contain(self, receipt_number: str) -> bool:
+        return all(
+            self.bits[pos >> 3] & (1 << (pos & 7))
+            for pos in self._positions(receipt_number)
+        )
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def to_cache(self) -> dict:
+        return {"capacity": self.capacity, "count": self.count, "bits": bytes(self.bits)}
+
+    @classmethod
+    def from_cache(cls, payload):
+        try:
+            return cls(
+                capacity=payload["capacity"],
+                bits=bytearray(payload["bits"]),
+                count=payload["count"],
+            )
+        except (KeyError, TypeError):
+            return None
+
+    # ========================
+    # Cache keys & generations
+    # ========================
+    @classmethod
+    def _generation_key(cls, company_tin: str) -> str:
+        return f"{cls.CACHE_PREFIX}:{company_tin}:gen"
+
+    @classmethod
+    def _filter_key(cls, company_tin: str, generation: int) -> str:
+        return f"{cls.CACHE_PREFIX}:{company_tin}:{generation}"
+
+    @classmethod
+    def _generation(cls, company_tin: str):
+        """The company's generation, or None while the cache is unreachable."""
+        key = cls._generation_key(company_tin)
+        generation = cache.get(key)
+        if generation is None:
+            # Fresh (time-based) generation, so filters cached before the
+            # counter was evicted are never picked up again
+            cache.add(key, time.time_ns(), timeout=None)
+            generation = cache.get(key)
+        return generation
+
+    @classmethod
+    def invalidate(cls, company_tin: str):
+        """Retire the cached filter (and any rebuild in flight) for a company."""
+        key = cls._generation_key(company_tin)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+    # ========================
+    # Public API
+    # ========================
+    @classmethod
+    def build_for_company(cls, company_tin: str, generation):
+        """One query: every receipt number the company has recorded (archived years included)."""
+        from core.models.ArchivedReceipt import ArchivedReceipt
+        from core.models.Receipt import Receipt
+
+        numbers = list(
+            Receipt.objects.filter(recorded_by__tin_number=company_tin)
+            .annotate(receipt_number_upper=Upper("receipt_number"))
+            .order_by()
+            .values_list("receipt_number_upper", flat=True)
+            .union(
+                ArchivedReceipt.objects.filter(recorded_by__tin_number=company_tin)
+                .annotate(receipt_number_upper=Upper("receipt_number"))
+                .order_by()
+                .values_list("receipt_number_upper", flat=True),
+                all=True,
+            )
+        )
+        bloom = cls(capacity=len(numbers) * cls.GROWTH_FACTOR)
+        for number in numbers:
+            bloom.add(number)
+
+        # add(), not set(): never overwrite a filter that already has newer inserts
+        cache.add(
+            cls._filter_key(company_tin, generation), bloom.to_cache(), cls.CACHE_TIMEOUT
+        )
+        return bloom
+
+    @classmethod
+    def for_company(cls, company_tin: str):
+        """
+        Load the company's filter from cache, rebuilding it on a miss.
+        None while the cache is unreachable: a filter rebuilt on every check
+        would cost more than the query it saves.
+        """
+        generation = cls._generation(company_tin)
+        if generation is None:
+            return None
+        payload = cache.get(cls._filter_key(company_tin, generation))
+        bloom = cls.from_cache(payload) if payload else None
+        if bloom is None:
+            bloom = cls.build_for_company(company_tin, generation)
+        return bloom
+
+    @classmethod
+    def add_receipt_number(cls, company_tin: str, receipt_number: str):
+        """
+        Set the bits for a newly recorded number. Call after the receipt commits.
+        Whenever the insert can't be applied to the current filter, the
+        generation is bumped instead so the next check rebuilds from the DB.
+        """
+        generation = cls._generation(company_tin)
+        if generation is None:
+            logger.warning(f"Cache unavailable; receipt number filter of company {company_tin} not updated")
+            return
+        key = cls._filter_key(company_tin, generation)
+        lock_key = f"{key}:lock"
+
+        for _ in range(cls.LOCK_RETRIES):
+            if not cache.add(lock_key, 1, cls.LOCK_TIMEOUT):
+                time.sleep(0.01)
+                continue
+            try:
+                bloom = cls.from_cache(cache.get(key))
+                if bloom is None:
+                    # A rebuild may be in flight without this number
+                    cls.invalidate(company_tin)
+                    return
+                bloom.add(receipt_number)
+                if bloom.is_saturated:
+                    cls.invalidate(company_tin)  # Rebuilt larger on next check
+                else:
+                    cache.set(key, bloom.to_cache(), cls.CACHE_TIMEOUT)
+                return
+            finally:
+                cache.delete(lock_key)
+
+        logger.warning(f"Receipt number filter busy for company {company_tin}; invalidating")
+        cls.invalidate(company_tin)
+
+
+def find_existing_receipt_numbers(company_tin: str, receipt_numbers) -> set:
+    """
+    Return the normalized receipt numbers (out of `receipt_numbers`) that the
+    company has already recorded.
+    Bloom filter first; only the "maybe" numbers reach the database, in one
+    query served by the (recorded_by, UPPER(receipt_number)) index (and
+    ArchivedReceipt's, for archived fiscal years). Without the cache, every
+    number goes to that query.
+    """
+    from core.models.ArchivedReceipt import ArchivedReceipt
+    from core.models.Receipt import Receipt
+
+    wanted = {normalize_receipt_number(n) for n in receipt_numbers if n and n.strip()}
+    if not wanted:
+        return set()
+
+    bloom = ReceiptNumberBloomFilter.for_company(company_tin)
+    maybe = [n for n in wanted if bloom is None or bloom.might_contain(n)]
+    if not maybe:
+        return set()
+
+    return set(
+        Receipt.objects.annotate(receipt_number_upper=Upper("receipt_number"))
+        .filter(recorded_by__tin_number=company_tin, receipt_number_upper__in=maybe)
+        .order_by()
+        .values_list("receipt_number_upper", flat=True)
+        .union(
+            ArchivedReceipt.objects.annotate(receipt_number_upper=Upper("receipt_number"))
+            .filter(recorded_by__tin_number=company_tin, receipt_number_upper__in=maybe)
+            .order_by()
+            .values_list("receipt_number_upper", flat=True)
+        )
+    )
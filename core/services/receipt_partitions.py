@@ -0,0 +1,337 @@
+# core/services/receipt_partitions.py
+"""
+Postgres declarative range partitioning of core_receipt and
+core_receiptline by fiscal year (opt-in, settings.RECEIPT_PARTITIONING).
+
+- convert(): rebuilds both tables as partitioned tables, one partition per
+  fiscal year with data (`core_receipt_fy2024`: RECEIPT_FISCAL_YEAR_START
+  2024 up to the same day in 2025) plus a DEFAULT partition, and copies
+  the rows. It holds an exclusive lock on both tables throughout (run it
+  in a maintenance window). The old tables are kept as
+  <table>_unpartitioned until drop_unpartitioned().
+- ensure(): creates the partitions for the current and the next
+  RECEIPT_PARTITION_YEARS_AHEAD years, and for any year that reached the
+  DEFAULT partition (its rows move over). It runs after every `migrate`
+  while RECEIPT_PARTITIONING is on; schedule `partition_receipts` too if
+  deploys are rare. Rows never fail to insert: out-of-range dates go to DEFAULT.
+- explain(): the plans of the common per-company date-range queries, and
+  the partitions they scan, to verify pruning.
+
+Constraints on partitioned tables must include the partition key, so:
+- the primary keys become (id, receipt_date); Django keeps using id
+- other unique constraints without receipt_date (the purchase voucher
+  one-to-one) become plain indexes
+- lines reference receipts by (receipt_id, receipt_date), ON UPDATE CASCADE
+- foreign keys from other tables to core_receipt (CRV items, document
+  links) are dropped; Django's on_delete still applies. Later migrations
+  adding a ForeignKey to Receipt need db_constraint=False.
+"""
+
+import logging
+import re
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.models.Receipt import Receipt, ReceiptLine
+
+logger = logging.getLogger(__name__)
+
+PARTITION_KEY = "receipt_date"
+OLD_SUFFIX = "_unpartitioned"
+
+
+class ReceiptPartitions:
+    # Receipts first: lines reference them
+    TABLES = [Receipt._meta.db_table, ReceiptLine._meta.db_table]
+    LINE_FOREIGN_KEY = f"{ReceiptLine._meta.db_table}_receipt_fk"
+
+    # ========================
+    # Fiscal years
+    # ========================
+    @staticmethod
+    def year_start():
+        month, day = (int(part) for part in settings.RECEIPT_FISCAL_YEAR_START.split("-"))
+        return month, day
+
+    @classmethod
+    def fiscal_year(cls, day: date) -> int:
+        """Calendar year in which `day`'s fiscal year starts."""
+        return day.year if (day.month, day.day) >= cls.year_start() else day.year - 1
+
+    @classmethod
+    def bounds(cls, year):
+        """[start, end) of fiscal year `year`."""
+        month, day = cls.year_start()
+        return date(year, month, day), date(year + 1, month, day)
+
+    @staticmethod
+    def partition_name(table, year):
+        return f"{table}_fy{year}"
+
+    @staticmethod
+    def default_name(table):
+        return f"{table}_default"
+
+    @classmethod
+    def fiscal_year_sql(cls):
+        """SQL for the fiscal year of receipt_date (parameter: 'MM-DD' of the year start)."""
+        return (
+            f"EXTRACT(YEAR FROM {PARTITION_KEY})::int "
+            f"- CASE WHEN to_char({PARTITION_KEY}, 'MM-DD') < %s THEN 1 ELSE 0 END"
+        )
+
+    # ========================
+    # Catalog
+    # ========================
+    @staticmethod
+    def supported(using=DEFAULT_DB_ALIAS):
+        return connections[using].vendor == "postgresql"
+
+    @classmethod
+    def is_partitioned(cls, table, using=DEFAULT_DB_ALIAS) -> bool:
+        if not cls.supported(using):
+            return False
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [table]
+            )
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def partitions(cls, table, using=DEFAULT_DB_ALIAS):
+        """{fiscal year: partition name} of a partitioned table."""
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = to_regclass(%s)",
+                [table],
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        pattern = re.compile(rf"^{re.escape(table)}_fy(\d{{4}})$")
+        return {int(match.group(1)): name for name in names if (match := pattern.match(name))}
+
+    # ========================
+    # Conversion
+    # ========================
+    @classmethod
+    def convert(cls, using=DEFAULT_DB_ALIAS, log=logger.info):
+        """Rebuild both tables partitioned (see module docstring). Returns the dropped foreign keys."""
+        if not cls.supported(using):
+            raise RuntimeError("Receipt partitioning needs PostgreSQL.")
+        if any(cls.is_partitioned(table, using) for table in cls.TABLES):
+            raise RuntimeError("Receipts are already partitioned.")
+
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        receipts, lines = cls.TABLES
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {quote(receipts)}, {quote(lines)} IN ACCESS EXCLUSIVE MODE")
+
+            # Referencing core_receipt(id) alone is impossible once id is not unique by itself
+            cursor.execute(
+                "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+                "WHERE contype = 'f' AND confrelid = ANY(ARRAY[to_regclass(%s), to_regclass(%s)])",
+                [receipts, lines],
+            )
+            dropped = cursor.fetchall()
+            for table, name in dropped:
+                cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {quote(name)}")
+                log(f"Dropped foreign key {name} on {table}")
+
+            years = set()
+            for table in cls.TABLES:
+                years |= cls._rebuild(cursor, table, quote, log)
+
+            cls._add_line_foreign_key(cursor, quote)
+            for table in cls.TABLES:
+                cursor.execute(f"ANALYZE {quote(table)}")
+        log(f"Partitioned {', '.join(cls.TABLES)} into fiscal years {min(years)}-{max(years)} + default")
+        return dropped
+
+    @classmethod
+    def _add_line_foreign_key(cls, cursor, quote):
+        receipts, lines = cls.TABLES
+        # Check the moved rows' deferred foreign keys now: ALTER TABLE refuses pending ones
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            f"ALTER TABLE {quote(lines)} ADD CONSTRAINT {quote(cls.LINE_FOREIGN_KEY)} "
+            f"FOREIGN KEY (receipt_id, {PARTITION_KEY}) "
+            f"REFERENCES {quote(receipts)} (id, {PARTITION_KEY}) "
+            "ON UPDATE CASCADE DEFERRABLE INITIALLY DEFERRED"
+        )
+
+    @classmethod
+    def _rebuild(cls, cursor, table, quote, log):
+        old = table + OLD_SUFFIX
+        # Definitions first, while they still name `table`
+        cursor.execute(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i "
+            "WHERE i.indrelid = to_regclass(%s) "
+            "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)",
+            [table],
+        )
+        index_definitions = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = to_regclass(%s) AND contype IN ('u', 'f')",
+            [table],
+        )
+        # Without the foreign keys to receipts / lines, dropped already
+        constraints = cursor.fetchall()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        old_sequence = cursor.fetchone()[0]
+
+        # Free the names: index names are schema-wide, the sequence is recreated
+        cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+        cursor.execute(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE i.indrelid = to_regclass(%s)",
+            [old],
+        )
+        for (index,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {quote(index)} RENAME TO {quote(index[:48] + OLD_SUFFIX)}")
+        if old_sequence:
+            cursor.execute(f"ALTER SEQUENCE {old_sequence} RENAME TO {quote(old + '_id_seq')}")
+
+        cursor.execute(
+            f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({PARTITION_KEY})"
+        )
+        sequence = quote(table + "_id_seq")
+        cursor.execute(f"CREATE SEQUENCE {sequence} OWNED BY {quote(table)}.id")
+        cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+        cursor.execute(f"SELECT setval('{sequence}', COALESCE(MAX(id), 0) + 1, false) FROM {quote(old)}")
+        cursor.execute(f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, {PARTITION_KEY})")
+        for name, definition in constraints:
+            if definition.startswith("UNIQUE") and PARTITION_KEY not in definition:
+                # e.g. the one-to-one purchase voucher: checked by Django validation only from now on
+                cursor.execute(f"CREATE INDEX {quote(name)} ON {quote(table)} {definition[len('UNIQUE'):]}")
+                log(f"{table}: unique constraint {name} lacks {PARTITION_KEY}, kept as a plain index")
+                continue
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+        for definition in index_definitions:
+            cursor.execute(definition)
+
+        # One partition per fiscal year with rows, up to the years ahead
+        cursor.execute(
+            f"SELECT DISTINCT {cls.fiscal_year_sql()} FROM {quote(old)}", [settings.RECEIPT_FISCAL_YEAR_START]
+        )
+        years = {row[0] for row in cursor.fetchall()} | cls.upcoming_years()
+        for year in sorted(years):
+            start, end = cls.bounds(year)
+            cursor.execute(
+                f"CREATE TABLE {quote(cls.partition_name(table, year))} PARTITION OF {quote(table)} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [start, end],
+            )
+        cursor.execute(f"CREATE TABLE {quote(cls.default_name(table))} PARTITION OF {quote(table)} DEFAULT")
+
+        cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+        log(f"{table}: copied {cursor.rowcount} rows into {len(years)} fiscal-year partitions")
+        return years
+
+    @classmethod
+    def drop_unpartitioned(cls, using=DEFAULT_DB_ALIAS):
+        """Drop the pre-conversion copies (lines first)."""
+        quote = connections[using].ops.quote_name
+        with connections[using].cursor() as cursor:
+            for table in reversed(cls.TABLES):
+                cursor.execute(f"DROP TABLE IF EXISTS {quote(table + OLD_SUFFIX)}")
+
+    # ========================
+    # Upkeep
+    # ========================
+    @classmethod
+    def upcoming_years(cls, today=None):
+        current = cls.fiscal_year(today or date.today())
+        return set(range(current, current + settings.RECEIPT_PARTITION_YEARS_AHEAD + 1))
+
+    @classmethod
+    def ensure(cls, using=DEFAULT_DB_ALIAS, today=None, log=logger.info):
+        """Create missing partitions (upcoming years, years found in DEFAULT). Returns their names."""
+        if not cls.is_partitioned(cls.TABLES[0], using):
+            return []
+        connection = connections[using]
+        quote = connection.ops.quote_name
+        created = []
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            stranded, missing = {}, {}
+            for table in cls.TABLES:
+                cursor.execute(
+                    f"SELECT DISTINCT {cls.fiscal_year_sql()} FROM {quote(cls.default_name(table))}",
+                    [settings.RECEIPT_FISCAL_YEAR_START],
+                )
+                stranded[table] = {row[0] for row in cursor.fetchall()}
+                missing[table] = (stranded[table] | cls.upcoming_years(today)) - set(cls.partitions(table, using))
+            # Postgres checks the lines' foreign key per referenced partition,
+            # so receipts can't leave DEFAULT under it: re-added after the move
+            moving = any(stranded[table] & missing[table] for table in cls.TABLES)
+            if moving:
+                cursor.execute(f"ALTER TABLE {quote(cls.TABLES[1])} DROP CONSTRAINT {quote(cls.LINE_FOREIGN_KEY)}")
+
+            for table in cls.TABLES:
+                default = cls.default_name(table)
+                for year in sorted(missing[table]):
+                    name = cls.partition_name(table, year)
+                    start, end = cls.bounds(year)
+                    # Rows of that year already in DEFAULT move over before the attach
+                    cursor.execute(
+                        f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+                    )
+                    cursor.execute(
+                        f"WITH moved AS (DELETE FROM {quote(default)} "
+                        f"WHERE {PARTITION_KEY} >= %s AND {PARTITION_KEY} < %s RETURNING *) "
+                        f"INSERT INTO {quote(name)} SELECT * FROM moved",
+                        [start, end],
+                    )
+                    moved = cursor.rowcount
+                    cursor.execute(
+                        f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)",
+                        [start, end],
+                    )
+                    created.append(name)
+                    log(f"Created partition {name} ({start} to {end}, {moved} rows moved from {default})")
+
+            if moving:
+                cls._add_line_foreign_key(cursor, quote)
+        return created
+
+    # ========================
+    # Verification
+    # ========================
+    @classmethod
+    def explain(cls, company_tin, from_date, to_date, using=DEFAULT_DB_ALIAS):
+        """
+        [(query name, plan, partitions scanned)] for the per-company
+        date-range filters of search and the line export.
+        """
+        from core.services.receipt_filters import filter_receipts, line_date_filter
+
+        params = {"from_date": from_date.isoformat(), "to_date": to_date.isoformat()}
+        company_receipts = Receipt.objects.using(using).filter(recorded_by__tin_number=company_tin)
+        receipts = filter_receipts(company_receipts, params)
+        queries = [
+            ("receipts", receipts),
+            ("receipts_tax_type", filter_receipts(company_receipts, {**params, "tax_type": "VAT"})),
+            ("lines", ReceiptLine.objects.using(using).filter(
+                line_date_filter(params), receipt__in=receipts.values("id")
+            )),
+        ]
+        scanned = re.compile(rf"\b((?:{'|'.join(map(re.escape, cls.TABLES))})_(?:fy\d{{4}}|default))\b")
+        results = []
+        for name, queryset in queries:
+            plan = queryset.explain()
+            results.append((name, plan, sorted(set(scanned.findall(plan)))))
+        return results
+
+    @classmethod
+    def expected_partitions(cls, from_date, to_date, using=DEFAULT_DB_ALIAS):
+        """Partitions a [from_date, to_date] query may scan once pruned."""
+        expected = set()
+        for table in cls.TABLES:
+            existing = cls.partitions(table, using)
+            for year in range(cls.fiscal_year(from_date), cls.fiscal_year(to_date) + 1):
+                expected.add(existing.get(year, cls.default_name(table)))
+        return expected
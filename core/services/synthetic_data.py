@@ -0,0 +1,271 @@
+# core/services/synthetic_data.py
+
+import hashlib
+import random
+from datetime import date, datetime, timedelta, timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+import jwt
+from django.db import transaction
+
+from core.models.contact import Contact
+from core.models.Documents import MainReceiptDocument, ReceiptDocument
+from core.models.DraftReceipt import DraftReceipt
+from core.models.item import Item
+from core.models.look_up_tables import ReceiptCatagory, ReceiptKind, ReceiptName, ReceiptType
+from core.models.Receipt import Receipt, ReceiptLine, is_date_expired
+from core.services.ReceiptService import ReceiptService
+from core.services.contact_name_search import normalize_contact_name
+
+CENT = Decimal("0.01")
+
+# Tax rates as applied by ReceiptService.create_receipt
+TAX_RATES = {"VAT": Decimal("15.0"), "TOT": Decimal("2.0"), "EXEMPTED": Decimal("0.0")}
+
+LOOKUPS = {
+    ReceiptCatagory: ["Revenue", "Expense"],
+    ReceiptKind: ["Manual", "Digital", "Electronic"],
+    ReceiptName: ["CASH VAT", "CASH TOT", "CREDIT VAT", "CREDIT EXEMPTED"],
+    ReceiptType: ["Local", "Import", "Export"],
+}
+
+UNITS = ["pcs", "kg", "ltr", "box", "hr"]
+WORDS = [
+    "Cement", "Steel", "Paper", "Toner", "Diesel", "Laptop", "Chair", "Cable",
+    "Consulting", "Transport", "Coffee", "Sugar", "Paint", "Tyre", "Printer",
+]
+
+
+class SyntheticDataGenerator:
+    """
+    Realistic, reproducible tenants for benchmarks and query-count checks.
+
+    Each company (TIN 9xxxxxxxxx, see company_tin) records `receipts`
+    receipts of `lines` lines from a shared pool of supplier/customer
+    contacts and catalog items, spread over the last three years (so both
+    claimable and expired VAT show up). Documents are uploaded-but-unlinked
+    ReceiptDocuments with metadata only (no bytes in storage); each draft
+    belongs to one of them, as after an autosave.
+
+    Everything goes in with bulk_create, `batch_size` rows per INSERT;
+    model save() hooks are replicated (Contact.search_name,
+    Receipt.expired_vat). Data already generated with the same seed is
+    left alone and the run fails on the first duplicate, so pass a new
+    --seed to add more.
+    """
+
+    def __init__(self, seed=42, batch_size=1000, today=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.batch_size = batch_size
+        self.today = today or date.today()
+
+    @staticmethod
+    def company_tin(index, seed=42) -> str:
+        return f"9{seed % 100:02d}{index:07d}"
+
+    @staticmethod
+    def token(tin) -> str:
+        """A JWT that JwtAuthMiddleware accepts for `tin` (signed like the auth service's)."""
+        payload = {
+            "tin_number": tin,
+            "user_id": 1,
+            "first_name": "Synthetic",
+            "company_name": "Synthetic",
+            "roles": ["ADMIN"],
+            "exp": datetime.now(timezone.utc) + timedelta(hours=6),
+        }
+        return jwt.encode(payload, ReceiptService._get_secret_bytes(), algorithm="HS256")
+
+    # ========================
+    # Shared rows
+    # ========================
+    def lookups(self):
+        """{model: [instances]}, created on first use (names are unique)."""
+        return {
+            model: [model.objects.get_or_create(name=name)[0] for name in names]
+            for model, names in LOOKUPS.items()
+        }
+
+    def contacts(self, count):
+        rows = []
+        for i in range(count):
+            name = f"{self.rng.choice(WORDS)} {self.rng.choice(['Trading', 'PLC', 'Enterprise', 'Import Export'])} {i}"
+            rows.append(Contact(
+                name=name,
+                tin_number=f"8{self.seed % 100:02d}{i:07d}",
+                address=self.rng.choice(["Addis Ababa", "Adama", "Bahir Dar", "Hawassa", "Mekelle"]),
+                search_name=normalize_contact_name(name),
+            ))
+        return Contact.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def companies(self, count):
+        rows = []
+        for i in range(count):
+            name = f"Synthetic Company {self.seed}-{i}"
+            rows.append(Contact(
+                name=name,
+                tin_number=self.company_tin(i, self.seed),
+                address="Addis Ababa",
+                search_name=normalize_contact_name(name),
+            ))
+        return Contact.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    def items(self, count):
+        rows = []
+        for i in range(count):
+            tax_type = self.rng.choice(["VAT", "VAT", "VAT", "TOT", "EXEMPTED"])
+            item_type = self.rng.choice(["goods", "goods", "service"])
+            rows.append(Item(
+                item_code=f"SYN{self.seed % 100:02d}-{i:06d}",
+                item_description=f"{self.rng.choice(WORDS)} {self.rng.choice(WORDS).lower()} #{i}",
+                unit_of_measurement=self.rng.choice(UNITS),
+                gl_account=self.rng.choice(["4000", "5100", "5200", "6100"]),
+                nature=item_type,
+                item_type=item_type,
+                tax_type=tax_type,
+                hs_code=f"{self.rng.randint(1000, 9999)}.{self.rng.randint(10, 99)}" if i % 10 == 0 else None,
+                has_import_export=i % 10 == 0,
+                unit_cost=Decimal(self.rng.randint(100, 500_000)) / 100,
+            ))
+        return Item.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    # ========================
+    # Per-company rows
+    # ========================
+    def line_values(self, item):
+        quantity = Decimal(self.rng.randint(1, 40))
+        unit_cost = (item.unit_cost * Decimal(self.rng.uniform(0.9, 1.1))).quantize(CENT)
+        discount = (unit_cost * quantity * Decimal("0.05")).quantize(CENT) if self.rng.random() < 0.1 else Decimal("0.00")
+        rate = TAX_RATES[item.tax_type]
+        if item.tax_type == "TOT" and item.item_type != "goods":
+            rate = Decimal("10.0")
+        tax = ((unit_cost * quantity - discount) * rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+        return {
+            "item": item,
+            "quantity": quantity,
+            "unit_cost": unit_cost,
+            "discount_amount": discount,
+            "tax_type": item.tax_type,
+            "tax_amount": tax,
+            "item_description": item.item_description,
+            "unit_of_measurement": item.unit_of_measurement,
+            "gl_account": item.gl_account,
+            "nature": item.nature,
+            "item_type": item.item_type,
+            "hs_code": item.hs_code,
+            "has_import_export": item.has_import_export,
+            "declaration_number": f"DCL-{self.rng.randint(10000, 99999)}" if item.has_import_export else None,
+        }
+
+    def receipts(self, company, count, lines, contacts, items, lookups):
+        """`count` receipts of 1..2*`lines` lines (mean `lines`) recorded by `company`."""
+        receipts, receipt_lines = [], []
+        for i in range(count):
+            receipt_date = self.today - timedelta(days=self.rng.randint(0, 3 * 365))
+            revenue = self.rng.random() < 0.4
+            counterparty = self.rng.choice(contacts)
+            values = [
+                self.line_values(self.rng.choice(items))
+                for _ in range(self.rng.randint(1, max(1, 2 * lines - 1)))
+            ]
+            tax = sum((value["tax_amount"] for value in values), Decimal("0.00"))
+            receipts.append(Receipt(
+                recorded_by=company,
+                issued_by=company if revenue else counterparty,
+                issued_to=counterparty if revenue else company,
+                receipt_number=f"FS{self.seed % 100:02d}{i:07d}",
+                receipt_date=receipt_date,
+                calendar_type=self.rng.choice(["gregorian", "gregorian", "ethiopian"]),
+                receipt_category=lookups[ReceiptCatagory][0 if revenue else 1],
+                receipt_kind=self.rng.choice(lookups[ReceiptKind]),
+                receipt_name=self.rng.choice(lookups[ReceiptName]),
+                receipt_type=self.rng.choice(lookups[ReceiptType]),
+                payment_method_type=self.rng.choice(["cash", "bank", "credit"]),
+                reason_of_receiving=self.rng.choice([None, "Office supplies", "Resale", "Project costs"]),
+                expired_vat=tax if is_date_expired(receipt_date) else Decimal("0.00"),
+            ))
+            receipt_lines.append(values)
+
+        receipts = Receipt.objects.bulk_create(receipts, batch_size=self.batch_size)
+        rows = [
+            ReceiptLine(receipt=receipt, receipt_date=receipt.receipt_date, **value)
+            for receipt, values in zip(receipts, receipt_lines)
+            for value in values
+        ]
+        ReceiptLine.objects.bulk_create(rows, batch_size=self.batch_size)
+        return receipts, len(rows)
+
+    def documents(self, company, count):
+        """Uploaded, not yet recorded documents ("UP<n>"); returns their receipt numbers."""
+        numbers = [f"UP{self.seed % 100:02d}{i:07d}" for i in range(count)]
+        mains = MainReceiptDocument.objects.bulk_create([
+            MainReceiptDocument(
+                receipt_number=number,
+                company_tin=company.tin_number,
+                main_receipt=f"main_receipts/{number}_{company.tin_number}.pdf",
+                main_receipt_filename=f"{number}.pdf",
+                main_receipt_content_type="application/pdf",
+                main_receipt_hash=hashlib.md5(f"{company.tin_number}:{number}".encode()).hexdigest(),
+            )
+            for number in numbers
+        ], batch_size=self.batch_size)
+        ReceiptDocument.objects.bulk_create([
+            ReceiptDocument(main_receipt=main, for_company=company, uploaded_by_contact=company)
+            for main in mains
+        ], batch_size=self.batch_size)
+        return numbers
+
+    def drafts(self, company, document_numbers, items):
+        rows = []
+        for number in document_numbers:
+            lines = [self.line_values(self.rng.choice(items)) for _ in range(self.rng.randint(1, 5))]
+            rows.append(DraftReceipt(
+                company=company,
+                uploaded_document_number=number,
+                receipt_number=number,
+                data={
+                    "receipt_number": number,
+                    "receipt_date": (self.today - timedelta(days=self.rng.randint(0, 30))).isoformat(),
+                    "calendar_type": "gregorian",
+                    "items": [
+                        {
+                            "item_code": line["item"].item_code,
+                            "item_description": line["item_description"],
+                            "quantity": str(line["quantity"]),
+                            "unit_cost": str(line["unit_cost"]),
+                            "tax_type": line["tax_type"],
+                        }
+                        for line in lines
+                    ],
+                },
+            ))
+        return DraftReceipt.objects.bulk_create(rows, batch_size=self.batch_size)
+
+    # ========================
+    # Entry point
+    # ========================
+    def generate(self, companies=1, contacts=200, items=500, receipts=1000, lines=3, documents=50, drafts=20, log=None):
+        """Create the dataset; returns row counts by model."""
+        counts = {"companies": companies, "contacts": contacts, "items": items}
+        with transaction.atomic():
+            lookups = self.lookups()
+            contact_rows = self.contacts(contacts)
+            item_rows = self.items(items)
+            company_rows = self.companies(companies)
+        counts.update(receipts=0, lines=0, documents=0, drafts=0)
+
+        for company in company_rows:
+            # One transaction per company: bounded lock/WAL time on big runs
+            with transaction.atomic():
+                created, line_count = self.receipts(company, receipts, lines, contact_rows, item_rows, lookups)
+                numbers = self.documents(company, documents)
+                draft_rows = self.drafts(company, numbers[:drafts], item_rows)
+            counts["receipts"] += len(created)
+            counts["lines"] += line_count
+            counts["documents"] += len(numbers)
+            counts["drafts"] += len(draft_rows)
+            if log:
+                log(f"{company.tin_number}: {len(created)} receipts, {line_count} lines, "
+                    f"{len(numbers)} documents, {len(draft_rows)} drafts")
+        return counts
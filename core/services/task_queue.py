@@ -0,0 +1,259 @@
+# core/services/task_queue.py
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from contextvars import ContextVar
+from datetime import timedelta
+
+from decouple import config
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.models.Task import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskQueue:
+    """
+    Deferred work queued in the database (Task rows), run by
+    `manage.py runworker` processes (export jobs included, see ExportQueue):
+
+    - register(): names a function in core/tasks.py; it gets the task's
+      JSON kwargs and should be safe to run twice (a worker can die after
+      the work but before marking the task done)
+    - enqueue(): inserts the row from transaction.on_commit, so a task
+      never runs against data its request rolled back, nor before the
+      worker can see it
+    - claim(): SELECT ... FOR UPDATE SKIP LOCKED on the oldest due task
+    - a failure is retried after BACKOFF_BASE * 2^(attempt-1) seconds
+      (capped at BACKOFF_MAX, with jitter) until max_attempts; a RUNNING
+      task whose worker died (heartbeat older than STALE_AFTER) is claimed
+      again. A thread refreshes the heartbeat every HEARTBEAT_EVERY while
+      the task runs, so a long task is never taken for a dead one.
+    - finished rows older than RETENTION_DAYS are purged by the workers,
+      which also run the functions registered with cleanup()
+
+    TASKS_EAGER (on by default) makes enqueue() run the task in-process
+    after the commit, so a deployment without `runworker` keeps working
+    (documents still get linked to their receipts). Inside a request it
+    runs once the response has been sent (request_finished), so the client
+    doesn't wait for it; the web worker does, so turn TASKS_EAGER off once
+    workers run. A task that fails eagerly is left queued for a worker to
+    retry. Tasks registered with eager=False (long ones, like exports and
+    archiving) and tasks queued by a running task always wait for a worker.
+    """
+
+    POLL_INTERVAL = config("TASK_POLL_INTERVAL", default=1.0, cast=float)
+    STALE_AFTER = timedelta(minutes=config("TASK_STALE_MINUTES", default=10, cast=int))
+    MAX_ATTEMPTS = config("TASK_MAX_ATTEMPTS", default=5, cast=int)
+    BACKOFF_BASE = config("TASK_BACKOFF_SECONDS", default=10, cast=int)
+    BACKOFF_MAX = 3600
+    HEARTBEAT_EVERY = STALE_AFTER / 4
+    RETENTION_DAYS = config("TASK_RETENTION_DAYS", default=7, cast=int)
+    PURGE_EVERY = 600  # seconds between purges per worker
+    EAGER = config("TASKS_EAGER", default=True, cast=bool)
+
+    registry = {}  # name → (function, max_attempts, eager)
+    cleanups = []  # Run with every purge
+
+    _running = ContextVar("task_queue_running", default=False)  # Inside run()
+    _deferred = ContextVar("task_queue_deferred", default=None)  # Eager tasks waiting for the response
+
+    @classmethod
+    def register(cls, name, max_attempts=None, eager=True):
+        """Decorator: make `function(**kwargs)` runnable as task `name`."""
+        def decorator(function):
+            cls.registry[name] = (function, max_attempts or cls.MAX_ATTEMPTS, eager)
+            return function
+        return decorator
+
+    @classmethod
+    def cleanup(cls, function):
+        """Register `function()` to run with the workers' purges (e.g. expired files)."""
+        cls.cleanups.append(function)
+        return function
+
+    # ========================
+    # Producer side
+    # ========================
+    @classmethod
+    def enqueue(cls, name, kwargs=None, delay=None, using=DEFAULT_DB_ALIAS):
+        """Queue task `name` once the current transaction on `using` commits (now, outside one)."""
+        if name not in cls.registry:
+            raise KeyError(f"Unknown task {name!r}")
+        kwargs = kwargs or {}
+        eager = cls.EAGER and cls.registry[name][2] and not delay and not cls._running.get()
+
+        def insert():
+            task = Task.objects.using(using).create(
+                name=name,
+                kwargs=kwargs,
+                max_attempts=cls.registry[name][1],
+                run_after=timezone.now() + (delay or timedelta(0)),
+            )
+            if eager:
+                deferred = cls._deferred.get()
+                if deferred is not None:
+                    deferred.append(task)
+                else:
+                    cls.run_now(task)
+
+        transaction.on_commit(insert, using=using, robust=True)  # Never fail the committed request
+
+    @classmethod
+    def run_now(cls, task):
+        now = timezone.now()
+        task.status = Task.RUNNING
+        task.worker = f"eager:{os.getpid()}"
+        task.attempts = 1
+        task.started_at = now
+        task.heartbeat_at = now
+        task.save(update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at"])
+        return cls.run(task)
+
+    @classmethod
+    def request_started(cls, **kwargs):
+        cls._deferred.set([])
+
+    @classmethod
+    def request_finished(cls, **kwargs):
+        """Run the eager tasks the request queued, now that its response is out."""
+        deferred = cls._deferred.get()
+        cls._deferred.set(None)
+        for task in deferred or []:
+            cls.run_now(task)
+
+    # ========================
+    # Worker side
+    # ========================
+    @classmethod
+    def claim(cls, worker_name):
+        """Next due task for this worker (now RUNNING), or None if none is due."""
+        now = timezone.now()
+        with transaction.atomic():
+            task = (
+                Task.objects.select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=Task.QUEUED, run_after__lte=now)
+                    | Q(
+                        status=Task.RUNNING,
+                        heartbeat_at__lt=now - cls.STALE_AFTER,
+                        attempts__lt=F("max_attempts"),
+                    )
+                )
+                .order_by("run_after")
+                .first()
+            )
+            if task is None:
+                return None
+            task.status = Task.RUNNING
+            task.worker = worker_name
+            task.attempts += 1
+            task.started_at = now
+            task.heartbeat_at = now
+            task.save(update_fields=["status", "worker", "attempts", "started_at", "heartbeat_at"])
+            return task
+
+    @classmethod
+    def backoff(cls, attempts) -> timedelta:
+        seconds = min(cls.BACKOFF_MAX, cls.BACKOFF_BASE * 2 ** (attempts - 1))
+        return timedelta(seconds=seconds * random.uniform(1, 1.5))  # Jitter: retries don't stampede
+
+    @classmethod
+    def run(cls, task):
+        """Run a claimed task; it ends SUCCEEDED, FAILED, or QUEUED again for a retry."""
+        entry = cls.registry.get(task.name)
+        running = cls._running.set(True)
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=cls._heartbeat, args=(task.pk, stop), daemon=True)
+        heartbeat.start()
+        try:
+            if entry is None:
+                raise KeyError(f"Unknown task {task.name!r}")
+            entry[0](**task.kwargs)
+        except Exception as e:
+            task.error = f"{type(e).__name__}: {e}"
+            if entry is not None and task.attempts < task.max_attempts:
+                task.status = Task.QUEUED
+                task.run_after = timezone.now() + cls.backoff(task.attempts)
+                logger.warning(f"Task {task.pk} {task.name} failed (attempt {task.attempts}), retrying: {e}")
+            else:
+                task.status = Task.FAILED
+                logger.error(f"Task {task.pk} {task.name} failed: {e}", exc_info=True)
+        else:
+            task.status = Task.SUCCEEDED
+            task.error = ""
+        finally:
+            stop.set()
+            heartbeat.join()
+            cls._running.reset(running)
+        task.finished_at = timezone.now() if task.status != Task.QUEUED else None
+        task.save(update_fields=["status", "error", "run_after", "finished_at"])
+        return task
+
+    @classmethod
+    def _heartbeat(cls, task_pk, stop):
+        """Thread: keep a running task's heartbeat fresh until `stop` is set."""
+        try:
+            while not stop.wait(cls.HEARTBEAT_EVERY.total_seconds()):
+                try:
+                    Task.objects.filter(pk=task_pk, status=Task.RUNNING).update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    logger.warning(f"Task {task_pk} heartbeat failed: {e}")
+        finally:
+            connections.close_all()  # This thread's own connections
+
+    @classmethod
+    def purge_expired(cls) -> int:
+        """Fail tasks abandoned max_attempts times; delete old finished tasks; run the cleanups."""
+        now = timezone.now()
+        Task.objects.filter(
+            status=Task.RUNNING,
+            heartbeat_at__lt=now - cls.STALE_AFTER,
+            attempts__gte=F("max_attempts"),
+        ).update(status=Task.FAILED, error="Worker stopped responding.", finished_at=now)
+
+        removed, _ = Task.objects.filter(
+            status__in=[Task.SUCCEEDED, Task.FAILED],
+            finished_at__lt=now - timedelta(days=cls.RETENTION_DAYS),
+        ).delete()
+
+        for cleanup in cls.cleanups:
+            try:
+                cleanup()
+            except Exception as e:
+                logger.error(f"Cleanup {cleanup.__qualname__} failed: {e}", exc_info=True)
+        return removed
+
+    @classmethod
+    def work(cls, worker_name=None, once=False):
+        """
+        Worker loop: claim and run tasks, sleeping POLL_INTERVAL when idle.
+        once=True returns as soon as no task is due.
+        """
+        worker_name = worker_name or f"{socket.gethostname()}:{os.getpid()}"
+        last_purge = 0.0
+        while True:
+            close_old_connections()
+            if time.monotonic() - last_purge > cls.PURGE_EVERY:
+                last_purge = time.monotonic()
+                cls.purge_expired()
+
+            task = cls.claim(worker_name)
+            if task is not None:
+                cls.run(task)
+                continue
+            if once:
+                return
+            time.sleep(cls.POLL_INTERVAL)
+
+
+request_started.connect(TaskQueue.request_started, dispatch_uid="task_queue_request_started")
+request_finished.connect(TaskQueue.request_finished, dispatch_uid="task_queue_request_finished")
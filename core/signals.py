@@ -38,3 +38,85 @@ def create_default_receipt_data(sender, **kwargs):
     if sender.name == "core":
         print("Creating default receipt data...")
         # your code here
+
+
+# ========================
+# Receipt number Bloom filter upkeep
+# ========================
+from django.db import transaction
+from django.db.models.signals import post_delete
+from core.models.Receipt import Receipt
+from core.services.receipt_number_bloom import ReceiptNumberBloomFilter
+
+
+@receiver(post_save, sender=Receipt)
+def add_receipt_number_to_bloom(sender, instance, **kwargs):
+    if not instance.recorded_by_id:
+        return
+    company_tin = instance.recorded_by.tin_number
+    receipt_number = instance.receipt_number
+    # After commit, so a concurrent rebuild can't miss it (see ReceiptNumberBloomFilter)
+    transaction.on_commit(
+        lambda: ReceiptNumberBloomFilter.add_receipt_number(company_tin, receipt_number)
+    )
+
+
+@receiver(post_delete, sender=Receipt)
+def invalidate_receipt_number_bloom(sender, instance, **kwargs):
+    if not instance.recorded_by_id:
+        return
+    company_tin = instance.recorded_by.tin_number
+    transaction.on_commit(lambda: ReceiptNumberBloomFilter.invalidate(company_tin))
+
+
+# ========================
+# Contact TIN typeahead index upkeep
+# ========================
+from django.db.models.signals import post_init
+from core.models.contact import Contact
+from core.services.contact_tin_index import ContactTinIndex
+
+
+@receiver(post_init, sender=Contact)
+def remember_contact_tin(sender, instance, **kwargs):
+    # __dict__, so deferred TINs aren't fetched just to remember them
+    instance._indexed_tin_number = instance.__dict__.get("tin_number")
+
+
+@receiver(post_save, sender=Contact)
+def index_contact_tin(sender, instance, created, **kwargs):
+    old_tin = None if created else instance._indexed_tin_number
+    new_tin = instance.tin_number
+    instance._indexed_tin_number = new_tin
+    if not created and old_tin == new_tin:
+        return
+    contact_id = instance.pk
+    transaction.on_commit(lambda: ContactTinIndex.note_change(contact_id, old_tin, new_tin))
+
+
+@receiver(post_delete, sender=Contact)
+def unindex_contact_tin(sender, instance, **kwargs):
+    contact_id, old_tin = instance.pk, instance.tin_number
+    transaction.on_commit(lambda: ContactTinIndex.note_change(contact_id, old_tin, None))
+
+
+@receiver(post_save, sender=Receipt)
+def refresh_contact_usage(sender, instance, created, **kwargs):
+    if not created or not instance.recorded_by_id:
+        return
+    company_tin = instance.recorded_by.tin_number
+    transaction.on_commit(lambda: ContactTinIndex.forget_company_usage(company_tin))
+
+
+# ========================
+# Receipt partitions for the coming fiscal years
+# ========================
+from django.conf import settings
+
+
+@receiver(post_migrate)
+def ensure_receipt_partitions(sender, using, **kwargs):
+    if sender.name == "core" and settings.RECEIPT_PARTITIONING:
+        from core.services.receipt_partitions import ReceiptPartitions
+
+        ReceiptPartitions.ensure(using)  # No-op until partition_receipts --convert
@@ -0,0 +1,33 @@
+# core/tasks.py
+"""
+Tasks run by `manage.py runworker` (see core/services/task_queue.py).
+Queue one with TaskQueue.enqueue("<name>", {...kwargs}); kwargs must be JSON.
+"""
+
+from core.services.ReceiptService import ReceiptService
+from core.services.export_jobs import ExportQueue
+from core.services.receipt_archive import ReceiptArchive
+from core.services.task_queue import TaskQueue
+
+
+@TaskQueue.register("link_receipt_document")
+def link_receipt_document(receipt_id):
+    """Queued by ReceiptService.create_receipt."""
+    ReceiptService.link_uploaded_document(receipt_id)
+
+
+@TaskQueue.register("run_export_job", max_attempts=ExportQueue.MAX_ATTEMPTS, eager=False)
+def run_export_job(job_id):
+    """Queued by ExportQueue.enqueue (POST /api/exports)."""
+    ExportQueue.run_job(job_id)
+
+
+TaskQueue.cleanup(ExportQueue.purge_expired)
+
+
+@TaskQueue.register("archive_receipts", eager=False)
+def archive_receipts(fiscal_year, restore=False):
+    """Queued by `manage.py archive_receipts`; queues itself again until the year is done."""
+    _, finished = ReceiptArchive.run(fiscal_year, restore=restore)
+    if not finished:
+        TaskQueue.enqueue("archive_receipts", {"fiscal_year": fiscal_year, "restore": restore})
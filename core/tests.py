@@ -1,3 +1,1320 @@
-from django.test import TestCase
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+import unittest
+import uuid
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import InMemoryUploadedFile, SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import (
+    AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, resolve
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from core import api_urls, query_counts
+from core.models.ArchivedReceipt import ArchivedReceipt
+from core.models.contact import Contact
+from core.models.Documents import ReceiptDocument
+from core.models.ExportJob import ExportJob
+from core.models.item import Item
+from core.models.PurchaseVoucher import PurchaseVoucher
+from core.models.look_up_tables import ReceiptCatagory, ReceiptKind, ReceiptName, ReceiptType
+from core.models.Receipt import Receipt, ReceiptLine, is_date_expired
+from core.models.Task import Task
+from core.serializers.ReceiptSerializer import ReceiptUpdateSerializer
+from core.services import metrics, receipt_export
+from core.services.chunked_upload import ChunkedUploadStore
+from core.services.contact_name_search import normalize_contact_name
+from core.services.contact_tin_index import ContactTinIndex
+from core.services.export_jobs import ExportQueue
+from core.services.idempotency import IdempotencyKeyMixin, IdempotencyStore
+from core.services.receipt_archive import ReceiptArchive
+from core.services.receipt_number_bloom import ReceiptNumberBloomFilter, find_existing_receipt_numbers
+from core.services.receipt_partitions import ReceiptPartitions
+from core.services.synthetic_data import TAX_RATES, SyntheticDataGenerator
+from core.services.task_queue import TaskQueue
+from core.views.AsyncReadViews import AsyncReceiptListView, with_async_views
+from global_config import renderers
+from global_config.middleware import CompressionMiddleware
+from global_config.routers import read_replica
+
+# The API as served under ASGI (AsyncReadViewTests)
+urlpatterns = [path("api/", include(with_async_views(api_urls.sync_urlpatterns)))]
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class QueryCountRegressionTests(TestCase):
+    """
+    Read endpoints make the same number of queries with SMALL and LARGE
+    datasets, and no more than core/query_budgets.json allows.
+    """
+
+    def measure(self, receipts):
+        with transaction.atomic():
+            context = query_counts.build_dataset(receipts)
+            client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(context['tin'])}")
+            results = query_counts.endpoint_queries(client, context)
+            transaction.set_rollback(True)
+        return results
+
+    def test_query_counts_are_flat_and_within_budget(self):
+        small = self.measure(query_counts.SMALL)
+        large = self.measure(query_counts.LARGE)
+        if os.environ.get("UPDATE_QUERY_BUDGETS"):
+            query_counts.save_budgets(large)
+        failures = query_counts.check(small, large, query_counts.load_budgets())
+        self.assertFalse(failures, "\n\n" + "\n\n".join(failures))
+
+
+class WriteToReplicaRouter:
+    """Seeds the replica stand-in: what replication would have copied."""
+
+    def db_for_read(self, model, **hints):
+        return settings.DATABASE_REPLICAS[0]
+
+    db_for_write = db_for_read
+
+
+@unittest.skipUnless(
+    settings.DATABASE_REPLICAS,
+    "needs a replica, e.g. DB_ENGINE=sqlite SQLITE_REPLICA_PATHS=replica.sqlite3",
+)
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReadReplicaRoutingTests(TransactionTestCase):
+    """
+    The replica stand-in is a separate database that is never replicated
+    to, so it plays a replica lagging behind everything written after
+    setUp: marked views must not see those rows unless the company just
+    wrote, unmarked views and transactions always do.
+    """
+
+    databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        for routers in ([], ["core.tests.WriteToReplicaRouter"]):
+            with override_settings(DATABASE_ROUTERS=routers):
+                SyntheticDataGenerator(seed=7).generate(
+                    contacts=5, items=5, receipts=3, documents=0, drafts=0
+                )
+        self.tin = SyntheticDataGenerator.company_tin(0, 7)
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+
+        # Renamed on the primary only: "not replicated yet"
+        self.lagging = Receipt.objects.filter(recorded_by__tin_number=self.tin).order_by("id").first()
+        Receipt.objects.filter(pk=self.lagging.pk).update(receipt_number="LAGGING1")
+
+    def search(self, receipt_number):
+        response = self.client.get(f"/api/receipts/search/?receipt_number={receipt_number}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["count"]
+
+    def test_marked_views_read_from_the_replica(self):
+        self.assertEqual(self.search("LAGGING1"), 0)
+        csv = b"".join(self.client.get("/api/receipts/export.csv").streaming_content)
+        self.assertIn(b"FS07", csv)
+        self.assertNotIn(b"LAGGING1", csv)
+
+    def test_unmarked_views_read_from_the_primary(self):
+        response = self.client.get(f"/api/receipts/{self.lagging.pk}")
+        self.assertEqual(response.json()["data"]["receipt_number"], "LAGGING1")
+
+    def test_company_reads_its_own_writes(self):
+        supplier = Contact.objects.exclude(tin_number=self.tin).order_by("id").first()
+        item = Item.objects.order_by("id").first()
+        response = self.client.post("/api/create-receipt", {
+            "issued_by_details": {"tin_number": supplier.tin_number, "name": supplier.name},
+            "issued_to_details": {"tin_number": self.tin, "name": "Synthetic"},
+            "receipt_number": "WRITTEN1",
+            "receipt_date": date.today().isoformat(),
+            "calendar_type": "gregorian",
+            "receipt_category_id": ReceiptCatagory.objects.first().pk,
+            "receipt_kind_id": ReceiptKind.objects.first().pk,
+            "receipt_type_id": ReceiptType.objects.first().pk,
+            "receipt_name_id": ReceiptName.objects.first().pk,
+            "payment_method_type": "cash",
+            "items": [{
+                "item_code": item.item_code,
+                "item_description": item.item_description,
+                "unit_cost": str(item.unit_cost),
+                "quantity": "1",
+                "tax_type": item.tax_type,
+            }],
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+
+        self.assertEqual(self.search("WRITTEN1"), 1)  # Pinned to the primary
+        cache.clear()  # Pin expired
+        self.assertEqual(self.search("WRITTEN1"), 0)
+
+    def test_read_replica_block(self):
+        with read_replica(self.tin):
+            self.assertFalse(Receipt.objects.filter(receipt_number="LAGGING1").exists())
+            with transaction.atomic():
+                self.assertTrue(Receipt.objects.filter(receipt_number="LAGGING1").exists())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class AsyncReadViewTests(TestCase):
+    """The async variants (core/views/AsyncReadViews.py) answer exactly like the sync views."""
+
+    PATHS = [
+        "/api/receipts",
+        "/api/receipts?page=2",
+        "/api/receipts?page=last",
+        "/api/receipts?page=99",
+        "/api/receipts?page=abc",
+        "/api/receipts?fields=receipt_number,total&expand=items",
+        "/api/receipts?fields=nope",
+        "/api/receipts/search/",
+        "/api/receipts/search/?query=trading&expand=items",
+        "/api/receipts/search/?fields=receipt_number,tax&tax_type=VAT",
+        "/api/receipts/search/?exclude=nope",
+        *[f"/api/receipts/search/?group_by={group}" for group in query_counts.GROUP_BYS],
+        "/api/receipts/search/?group_by=nope",
+        "/api/get-documents",
+        "/api/get-documents?page_size=4&page=3",
+        "/api/get-documents?page=last&search=UP",
+        "/api/get-documents?status=processed",
+        "/api/get-documents?start_date=yesterday",
+        "/api/get-documents?page=9",
+        "/api/contacts/lookup/?tin_prefix=8",
+        "/api/contacts/lookup/?tin_prefix=8&limit=3",
+        "/api/contacts/lookup/?tin_prefix=1",
+        "/api/contacts/lookup/?tin_prefix=8x",
+        "/api/contacts/lookup/?tin_number={tin}",
+        "/api/contacts/lookup/?tin_number=1111111111",
+        "/api/contacts/lookup/",
+        "/api/lookups",
+        "/api/receipt-kinds",
+        "/api/receipt-names/",
+        "/api/receipt-categories/",
+        "/api/receipt-types/",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            cls.context = query_counts.build_dataset(90)
+
+    def test_async_views_match_sync_views(self):
+        token = SyntheticDataGenerator.token(self.context["tin"])
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {token}")
+        async_client = AsyncClient()
+        self.assertIs(resolve("/api/receipts", urlconf=__name__).func.view_class, AsyncReceiptListView)
+
+        for template in self.PATHS:
+            path = template.format(**self.context)
+            with self.subTest(path=path), redirect_stdout(StringIO()):
+                expected = client.get(path)
+                with override_settings(ROOT_URLCONF=__name__):
+                    # Per request: AsyncClient(headers=...) does not reach the ASGI scope in 5.2
+                    actual = async_to_sync(async_client.get)(path, headers={"Authorization": f"Bearer {token}"})
+                self.assertEqual(actual.status_code, expected.status_code)
+                self.assertEqual(actual.json(), expected.json())
+
+
+FLAKY_CALLS = []
+
+
+@TaskQueue.register("tests_flaky", max_attempts=2)
+def flaky_task(calls):
+    """Fails until its `calls`-th run."""
+    FLAKY_CALLS.append(calls)
+    if len(FLAKY_CALLS) < calls:
+        raise RuntimeError("not yet")
+
+
+CHAIN_CALLS = []
+
+
+@TaskQueue.register("tests_chain")
+def chain_task(remaining):
+    """Queues itself again until `remaining` reaches 0."""
+    CHAIN_CALLS.append(remaining)
+    if remaining:
+        TaskQueue.enqueue("tests_chain", {"remaining": remaining - 1})
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TaskQueueTests(TestCase):
+    """Tasks are queued at commit and run (and retried) by the worker."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            generator = SyntheticDataGenerator(seed=7)
+            generator.generate(contacts=5, items=5, receipts=1, documents=2, drafts=0)
+        cls.tin = generator.company_tin(0, 7)
+
+    def setUp(self):
+        FLAKY_CALLS.clear()
+        CHAIN_CALLS.clear()
+        self.enterContext(mock.patch.object(TaskQueue, "EAGER", False))  # As with runworker processes
+
+    def work(self):
+        # close_old_connections() would close the test transaction's connection
+        with redirect_stdout(StringIO()), mock.patch("core.services.task_queue.close_old_connections"):
+            TaskQueue.work(once=True)
+
+    def work_failing(self):
+        with self.assertLogs("core.services.task_queue", "WARNING"):
+            self.work()
+
+    def test_receipt_document_linked_by_worker(self):
+        document = ReceiptDocument.objects.filter(for_company__tin_number=self.tin).order_by("id").first()
+        supplier = Contact.objects.exclude(tin_number=self.tin).order_by("id").first()
+        item = Item.objects.order_by("id").first()
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+        with self.captureOnCommitCallbacks(execute=True), redirect_stdout(StringIO()):
+            response = client.post("/api/create-receipt", {
+                "issued_by_details": {"tin_number": supplier.tin_number, "name": supplier.name},
+                "issued_to_details": {"tin_number": self.tin, "name": "Synthetic"},
+                "receipt_number": document.main_receipt.receipt_number,
+                "receipt_date": date.today().isoformat(),
+                "calendar_type": "gregorian",
+                "receipt_category_id": ReceiptCatagory.objects.first().pk,
+                "receipt_kind_id": ReceiptKind.objects.first().pk,
+                "receipt_type_id": ReceiptType.objects.first().pk,
+                "receipt_name_id": ReceiptName.objects.first().pk,
+                "payment_method_type": "cash",
+                "items": [{
+                    "item_code": item.item_code,
+                    "item_description": item.item_description,
+                    "unit_cost": str(item.unit_cost),
+                    "quantity": "1",
+                    "tax_type": item.tax_type,
+                }],
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 201, response.content)
+        task = Task.objects.get(name="link_receipt_document")
+        self.assertEqual(task.status, Task.QUEUED)
+        document.refresh_from_db()
+        self.assertIsNone(document.linked_receipt_id)
+
+        self.work()
+        document.refresh_from_db()
+        self.assertEqual(document.linked_receipt_id, response.json()["receipt_id"])
+        self.assertEqual(document.status, "processed")
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.SUCCEEDED, 1))
+
+    def test_export_job_runs_on_the_task_worker(self):
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name), mock.patch.object(TaskQueue, "EAGER", True), \
+                redirect_stdout(StringIO()):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post("/api/exports", {"format": "csv"}, content_type="application/json")
+            self.assertEqual(response.status_code, 202, response.content)
+            job = ExportJob.objects.get()
+            self.assertEqual(job.status, ExportJob.QUEUED)  # Never eager
+
+            self.work()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (ExportJob.SUCCEEDED, 1))
+        self.assertEqual(Task.objects.get(name="run_export_job").status, Task.SUCCEEDED)
+
+    def test_failure_is_retried_after_backoff(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskQueue.enqueue("tests_flaky", {"calls": 2})
+        self.work_failing()
+        task = Task.objects.get(name="tests_flaky")
+        self.assertEqual((task.status, task.attempts), (Task.QUEUED, 1))
+        self.assertIn("not yet", task.error)
+        self.assertGreater(task.run_after, timezone.now() + timedelta(seconds=TaskQueue.BACKOFF_BASE - 1))
+
+        self.work()  # Not due yet
+        self.assertEqual(len(FLAKY_CALLS), 1)
+        Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+        self.work()
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.error), (Task.SUCCEEDED, 2, ""))
+
+    def test_fails_after_max_attempts(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskQueue.enqueue("tests_flaky", {"calls": 3})
+        self.work_failing()
+        Task.objects.update(run_after=timezone.now())
+        self.work_failing()
+        task = Task.objects.get(name="tests_flaky")
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+
+    def test_eager_task_runs_once_the_response_is_sent(self):
+        with mock.patch.object(TaskQueue, "EAGER", True):
+            TaskQueue.request_started()
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskQueue.enqueue("tests_flaky", {"calls": 1})
+            self.assertEqual(Task.objects.get().status, Task.QUEUED)
+            TaskQueue.request_finished()
+        self.assertEqual(Task.objects.get().status, Task.SUCCEEDED)
+
+    def test_task_queued_by_a_task_waits_for_the_worker(self):
+        with mock.patch.object(TaskQueue, "EAGER", True):
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskQueue.enqueue("tests_chain", {"remaining": 2})
+            self.assertEqual(CHAIN_CALLS, [2])
+            self.assertEqual(Task.objects.filter(status=Task.QUEUED).count(), 1)
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.work()
+        self.assertEqual(CHAIN_CALLS, [2, 1, 0])
+        self.assertEqual(Task.objects.filter(status=Task.SUCCEEDED).count(), 3)
+
+    def test_not_queued_when_the_transaction_rolls_back(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                TaskQueue.enqueue("tests_flaky", {"calls": 1})
+                transaction.set_rollback(True)
+        self.assertFalse(Task.objects.exists())
+
+
+@override_settings(RECEIPT_FISCAL_YEAR_START="07-08")
+class ReceiptLineDateTests(TestCase):
+    """Lines carry their receipt's date (the partition key of core_receiptline)."""
+
+    def test_line_dates_follow_the_receipt(self):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=2, documents=0, drafts=0)
+        receipt = Receipt.objects.order_by("id").first()
+        self.assertFalse(ReceiptLine.objects.exclude(receipt_date=F("receipt__receipt_date")).exists())
+
+        receipt.receipt_date = date(2024, 7, 7)
+        receipt.save()
+        self.assertEqual(set(receipt.items.values_list("receipt_date", flat=True)), {date(2024, 7, 7)})
+
+    def test_fiscal_years(self):
+        self.assertEqual(ReceiptPartitions.fiscal_year(date(2024, 7, 7)), 2023)
+        self.assertEqual(ReceiptPartitions.fiscal_year(date(2024, 7, 8)), 2024)
+        self.assertEqual(ReceiptPartitions.bounds(2024), (date(2024, 7, 8), date(2025, 7, 8)))
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "declarative partitioning is Postgres-only")
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    RECEIPT_FISCAL_YEAR_START="07-08",
+    RECEIPT_PARTITION_YEARS_AHEAD=1,
+)
+class ReceiptPartitioningTests(TransactionTestCase):
+    """convert() keeps every row and the API working; date-range queries scan only their years."""
+
+    def tearDown(self):
+        ReceiptPartitions.drop_unpartitioned()
+
+    def test_convert_prune_and_ensure(self):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=60, documents=0, drafts=0)
+        tin = SyntheticDataGenerator.company_tin(0, 7)
+        counts = (Receipt.objects.count(), ReceiptLine.objects.count())
+        ReceiptPartitions.convert(log=lambda message: None)
+
+        self.assertTrue(all(ReceiptPartitions.is_partitioned(table) for table in ReceiptPartitions.TABLES))
+        self.assertEqual((Receipt.objects.count(), ReceiptLine.objects.count()), counts)
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(tin)}")
+        with redirect_stdout(StringIO()):
+            self.assertEqual(client.get("/api/receipts/search/?tax_type=VAT").status_code, 200)
+
+        today = date.today()
+        from_date = ReceiptPartitions.bounds(ReceiptPartitions.fiscal_year(today))[0]
+        expected = ReceiptPartitions.expected_partitions(from_date, today)
+        for name, plan, scanned in ReceiptPartitions.explain(tin, from_date, today):
+            self.assertTrue(scanned, plan)
+            self.assertLessEqual(set(scanned), expected, plan)
+
+        # A receipt far ahead lands in DEFAULT until its year gets a partition
+        receipt = Receipt.objects.order_by("id").first()
+        receipt.receipt_date = date(today.year + 10, 1, 1)
+        receipt.save()
+        created = ReceiptPartitions.ensure(today=receipt.receipt_date, log=lambda message: None)
+        self.assertIn(ReceiptPartitions.partition_name("core_receipt", today.year + 9), created)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT tableoid::regclass::text FROM core_receiptline WHERE receipt_id = %s", [receipt.pk])
+            self.assertEqual({row[0] for row in cursor.fetchall()}, {f"core_receiptline_fy{today.year + 9}"})
+
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    RECEIPT_FISCAL_YEAR_START="07-08",
+)
+class ReceiptArchiveTests(TestCase):
+    """A closed year moves to the archive and back unchanged; detail and search still find it."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=12, documents=4, drafts=0)
+        cls.tin = SyntheticDataGenerator.company_tin(0, 7)
+        # Seven receipts (one with its uploaded document) in FY2015
+        cls.old_ids = list(Receipt.objects.order_by("id").values_list("id", flat=True)[:7])
+        Receipt.objects.filter(id__in=cls.old_ids).update(receipt_date=date(2015, 9, 1))
+        ReceiptLine.objects.filter(receipt_id__in=cls.old_ids).update(receipt_date=date(2015, 9, 1))
+        ReceiptDocument.objects.filter(id=ReceiptDocument.objects.order_by("id").first().id).update(
+            linked_receipt_id=cls.old_ids[0]
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.enterContext(mock.patch.object(ReceiptArchive, "CHUNK_SIZE", 3))
+        self.enterContext(mock.patch.object(TaskQueue, "EAGER", False))
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+
+    def get(self, path):
+        with redirect_stdout(StringIO()):
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def snapshot(self):
+        return (
+            list(Receipt.objects.order_by("id").values()),
+            list(ReceiptLine.objects.order_by("id").values()),
+            list(ReceiptDocument.objects.order_by("id").values("id", "linked_receipt_id")),
+        )
+
+    def test_archive_and_restore(self):
+        before = self.snapshot()
+        detail = self.get(f"/api/receipts/{self.old_ids[0]}")["data"]
+        hot = self.get("/api/receipts/search/?from_date=2015-07-08&to_date=2016-07-07")["data"]
+        self.assertEqual(len(hot), 7)
+
+        self.assertEqual(ReceiptArchive.archivable_years(), list(range(2015, ReceiptArchive.cutoff_year())))
+        with self.assertRaises(RuntimeError):
+            ReceiptArchive.run(ReceiptPartitions.fiscal_year(date.today()))
+        self.assertEqual(ReceiptArchive.run(2015, time_budget=0), (3, False))  # Stops, resumable
+        self.assertEqual(ReceiptArchive.run(2015), (4, True))
+
+        self.assertFalse(Receipt.objects.filter(id__in=self.old_ids).exists())
+        self.assertFalse(ReceiptLine.objects.filter(receipt_id__in=self.old_ids).exists())
+        self.assertEqual(ArchivedReceipt.objects.filter(fiscal_year=2015).count(), 7)
+        self.assertEqual(len({stub.archive_name for stub in ArchivedReceipt.objects.all()}), 3)
+
+        # Served from the archive, as they were
+        archived = self.get(f"/api/receipts/{self.old_ids[0]}")
+        self.assertTrue(archived["archived"])
+        self.assertEqual(archived["data"], detail)
+        sparse = self.get(f"/api/receipts/{self.old_ids[0]}?fields=receipt_number,total")["data"]
+        self.assertEqual(sparse, {"receipt_number": detail["receipt_number"], "total": detail["total"]})
+        search = self.get("/api/receipts/search/?from_date=2015-07-08&to_date=2016-07-07&include_archived=true")
+        self.assertEqual(search["count"], 0)
+        rows = {row.pop("id"): row for row in search["archived"]}
+        self.assertEqual(set(rows), set(self.old_ids))
+        self.assertCountEqual(rows.values(), [{k: v for k, v in row.items() if k != "items"} for row in hot])
+        self.assertEqual(
+            find_existing_receipt_numbers(self.tin, [detail["receipt_number"]]),
+            {detail["receipt_number"].upper()},
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ReceiptArchive.run(2015, restore=True), (7, True))
+        self.assertEqual(self.snapshot(), before)
+        self.assertFalse(ArchivedReceipt.objects.exists())
+        self.assertEqual(self.get(f"/api/receipts/{self.old_ids[0]}"), {"success": True, "data": detail})
+        self.assertFalse(default_storage.listdir(f"{ReceiptArchive.PREFIX}/fy2015")[1])
+
+    def test_receipt_number_check_without_the_cache(self):
+        number = Receipt.objects.get(id=self.old_ids[0]).receipt_number
+        with mock.patch.object(ReceiptNumberBloomFilter, "_generation", return_value=None), \
+                mock.patch.object(ReceiptNumberBloomFilter, "build_for_company") as build:
+            self.assertEqual(find_existing_receipt_numbers(self.tin, [number, "NOT-RECORDED"]), {number.upper()})
+        build.assert_not_called()
+
+    def test_command_queues_the_job_with_eager_tasks_on(self):
+        with mock.patch.object(TaskQueue, "EAGER", True), mock.patch.object(ReceiptArchive, "TIME_BUDGET", 0), \
+                mock.patch("core.services.task_queue.close_old_connections"):
+            with self.captureOnCommitCallbacks(execute=True), redirect_stdout(StringIO()):
+                call_command("archive_receipts", "--year", "2015")
+            self.assertFalse(ArchivedReceipt.objects.exists())
+            self.assertEqual(Task.objects.get().status, Task.QUEUED)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskQueue.run(TaskQueue.claim("tests"))
+            self.assertEqual(ArchivedReceipt.objects.count(), 3)  # One chunk; the next one is queued
+            self.assertEqual(Task.objects.filter(status=Task.QUEUED).count(), 1)
+
+    def test_queued_job_runs_to_the_end(self):
+        with self.captureOnCommitCallbacks(execute=True), redirect_stdout(StringIO()):
+            call_command("archive_receipts", "--year", "2015")
+        with mock.patch.object(ReceiptArchive, "TIME_BUDGET", 0):
+            for _ in range(3):
+                # Each run archives a chunk and queues the next
+                with self.captureOnCommitCallbacks(execute=True), redirect_stdout(StringIO()), \
+                        mock.patch("core.services.task_queue.close_old_connections"):
+                    TaskQueue.work(once=True)
+        self.assertEqual(ArchivedReceipt.objects.count(), 7)
+        self.assertFalse(Task.objects.exclude(status=Task.SUCCEEDED).exists())
+
+
+class EchoView(APIView):
+    authentication_classes = []
+    permission_classes = []
+    calls = []
+
+    def post(self, request):
+        self.calls.append(request.data)
+        return Response({"echo": request.data}, status=201)
+
+
+class IdempotentEchoView(IdempotencyKeyMixin, EchoView):
+    pass
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class IdempotencyKeyTests(TestCase):
+    """Retries replay the stored response; a different body or a down cache does not."""
+
+    def setUp(self):
+        cache.clear()
+        EchoView.calls.clear()
+
+    def post(self, body, key="key-1"):
+        request = APIRequestFactory().post("/echo", body, format="json", HTTP_IDEMPOTENCY_KEY=key)
+        request.company_tin = "0000000001"
+        return IdempotentEchoView.as_view()(request)
+
+    def test_replay_and_conflicting_body(self):
+        self.assertEqual(self.post({"a": 1}).status_code, 201)
+        replayed = self.post({"a": 1})
+        self.assertEqual((replayed.status_code, replayed["Idempotent-Replayed"]), (201, "true"))
+        self.assertEqual(self.post({"a": 2}).status_code, 422)
+        self.assertEqual(len(EchoView.calls), 1)
+
+    def test_uploads_fingerprinted_without_reading_them(self):
+        def fingerprint(content):
+            request = APIView().initialize_request(APIRequestFactory().post(
+                "/echo", {"receipt_number": "R-1", "file": SimpleUploadedFile("scan.pdf", content)},
+                format="multipart",
+            ))
+            request.data  # Parse the body first
+            with mock.patch.object(InMemoryUploadedFile, "read", side_effect=AssertionError("read")), \
+                    mock.patch.object(InMemoryUploadedFile, "chunks", side_effect=AssertionError("read")):
+                return IdempotencyKeyMixin.fingerprint(request)
+
+        self.assertEqual(fingerprint(b"%PDF-1"), fingerprint(b"%PDF-1"))
+        self.assertNotEqual(fingerprint(b"%PDF-1"), fingerprint(b"%PDF-12"))
+
+    def test_runs_unprotected_while_the_cache_is_down(self):
+        with mock.patch.object(IdempotencyStore, "claim", return_value=None), \
+                self.assertLogs("core.services.idempotency", "WARNING"):
+            started = time.monotonic()
+            self.assertEqual(self.post({"a": 1}).status_code, 201)
+        self.assertLess(time.monotonic() - started, IdempotencyKeyMixin.POLL_INTERVAL * 5)
+        self.assertEqual(len(EchoView.calls), 1)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class DeclarationLineSearchTests(TestCase):
+    """One row per item and declaration number, on any database."""
+
+    def test_declarations_of_one_item_are_all_listed(self):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=6, documents=0, drafts=0)
+        tin = SyntheticDataGenerator.company_tin(0, 7)
+        ReceiptLine.objects.update(declaration_number="")
+        item_id = ReceiptLine.objects.filter(receipt__recorded_by__tin_number=tin).values_list("item_id", flat=True)[0]
+        lines = list(ReceiptLine.objects.filter(receipt__recorded_by__tin_number=tin).order_by("id")[:3])
+        ReceiptLine.objects.filter(id__in=[line.id for line in lines]).update(item_id=item_id)
+        for line, declaration in zip(lines, ["DEC-1", "DEC-2", "DEC-2"]):
+            ReceiptLine.objects.filter(id=line.id).update(declaration_number=declaration)
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(tin)}")
+        with redirect_stdout(StringIO()):
+            response = client.get("/api/RetriveImportExportRelatedReceipts/")
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            sorted(row["declaration_number"] for row in response.json()["data"]), ["DEC-1", "DEC-2"]
+        )
+
+    def test_company_only_prefix_filter_and_pages(self):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(companies=2, contacts=5, items=5, receipts=6, documents=0, drafts=0)
+        tin = SyntheticDataGenerator.company_tin(0, 7)
+        ReceiptLine.objects.update(declaration_number="")
+        lines = ReceiptLine.objects.filter(receipt__recorded_by__tin_number=tin).order_by("id")
+        for line, declaration in zip(lines, ["DEC-A1", "DEC-A2", "DEC-B1"]):
+            ReceiptLine.objects.filter(id=line.id).update(declaration_number=declaration)
+        other_company_line = ReceiptLine.objects.exclude(receipt__recorded_by__tin_number=tin).first()
+        ReceiptLine.objects.filter(id=other_company_line.id).update(declaration_number="DEC-A9")
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(tin)}")
+
+        def get(**params):
+            with redirect_stdout(StringIO()):
+                return client.get("/api/RetriveImportExportRelatedReceipts/", params)
+
+        first, second = get(page_size=2).json(), get(page_size=2, page=2).json()
+        self.assertEqual((first["count"], len(first["data"]), len(second["data"])), (3, 2, 1))
+        self.assertIsNotNone(first["next"])
+        self.assertEqual(
+            sorted(row["declaration_number"] for row in first["data"] + second["data"]),
+            ["DEC-A1", "DEC-A2", "DEC-B1"],
+        )
+        self.assertEqual(
+            sorted(row["declaration_number"] for row in get(declaration_number="DEC-A").json()["data"]),
+            ["DEC-A1", "DEC-A2"],
+        )
+        self.assertEqual(get(declaration_number="DEC-Z").status_code, 404)
+
+    def test_updated_lines_keep_their_snapshot(self):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=6, documents=0, drafts=0)
+        tin = SyntheticDataGenerator.company_tin(0, 7)
+        receipt = Receipt.objects.filter(recorded_by__tin_number=tin).exclude(
+            receipt_category__name__iexact="crv"
+        ).order_by("id").first()
+        item = Item.objects.order_by("id").first()
+
+        # What ReceiptUpdateByNumberView does with a PATCH body
+        serializer = ReceiptUpdateSerializer(instance=receipt, partial=True, data={"items": [
+            {"item_code": item.item_code, "item_description": "Imported pump", "unit_cost": "10.00",
+             "quantity": "2", "has_import_export": True, "declaration_number": "DEC-9"},
+        ]})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(tin)}")
+        with redirect_stdout(StringIO()):
+            search = client.get("/api/RetriveImportExportRelatedReceipts/")
+        line = ReceiptLine.objects.get(receipt=receipt)
+        self.assertEqual(line.item_id, item.id)
+        self.assertEqual(
+            (line.item_description, line.declaration_number, line.gl_account, line.unit_of_measurement),
+            ("Imported pump", "DEC-9", item.gl_account, item.unit_of_measurement),
+        )
+        self.assertIn("DEC-9", [row["declaration_number"] for row in search.json()["data"]])
+
+
+class FailingStream:
+    """Request body whose connection drops after `good` bytes."""
+
+    def __init__(self, data, good):
+        self.data, self.good = BytesIO(data), good
+
+    def read(self, size):
+        if self.data.tell() >= self.good:
+            raise OSError("connection reset")
+        return self.data.read(min(size, self.good - self.data.tell()))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ChunkedUploadTests(TestCase):
+    """Chunks arrive in order, resume after a failure, and expire."""
+
+    TIN = "0000000001"
+    DATA = bytes(range(256)) * 40  # 10240 bytes
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.enterContext(mock.patch.object(ChunkedUploadStore, "ROOT", Path(root.name)))
+        self.enterContext(mock.patch.object(ChunkedUploadStore, "BLOCK_SIZE", 1024))
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.TIN)}")
+        response = self.client.post(
+            "/api/uploads", {"filename": "scan.pdf", "size": len(self.DATA)}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        self.upload_id = response.json()["upload_id"]
+
+    def put(self, start, end):
+        return self.client.put(
+            f"/api/uploads/{self.upload_id}", self.DATA[start:end + 1],
+            content_type="application/octet-stream", HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{len(self.DATA)}",
+        )
+
+    def assert_assembled(self):
+        upload, digest = ChunkedUploadStore.assemble(self.upload_id, self.TIN)
+        with upload:
+            self.assertEqual(upload.read(), self.DATA)
+        self.assertEqual(digest, hashlib.md5(self.DATA).hexdigest())
+
+    def test_resume_on_another_worker(self):
+        self.assertEqual(self.put(0, 4095).status_code, 200)
+        ChunkedUploadStore._hashers.clear()  # The next chunk lands on a worker that saw none
+        self.assertEqual(self.client.get(f"/api/uploads/{self.upload_id}").json()["offset"], 4096)
+        response = self.put(4096, len(self.DATA) - 1)
+        self.assertEqual((response.status_code, response.json()["complete"]), (200, True))
+        self.assert_assembled()
+
+    def test_chunk_out_of_order_is_rejected(self):
+        response = self.put(4096, 8191)
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 0))
+        response = self.put(0, len(self.DATA))
+        self.assertEqual(response.status_code, 416)
+
+    def test_chunk_resent_after_a_dropped_connection(self):
+        self.assertEqual(self.put(0, 4095).status_code, 200)
+        with self.assertRaises(OSError):
+            ChunkedUploadStore.write_chunk(
+                self.upload_id, self.TIN, f"bytes 4096-8191/{len(self.DATA)}", FailingStream(self.DATA[4096:8192], 2048)
+            )
+        self.assertEqual(self.put(4096, len(self.DATA) - 1).status_code, 200)
+        self.assert_assembled()
+
+    def test_expired_upload_is_gone(self):
+        self.assertEqual(self.put(0, 4095).status_code, 200)
+        with mock.patch("core.services.chunked_upload.time.time", return_value=time.time() + ChunkedUploadStore.TTL + 1):
+            self.assertEqual(self.client.get(f"/api/uploads/{self.upload_id}").status_code, 404)
+            self.assertEqual(ChunkedUploadStore.purge_expired(), 1)
+        self.assertFalse((ChunkedUploadStore.ROOT / self.upload_id).exists())
+
+
+class ContactBulkUpsertTests(TestCase):
+    """bulk_upsert validates every row up front and writes each batch in one statement."""
+
+    def test_insert_update_and_id_map(self):
+        existing = Contact.objects.create(tin_number="1000000001", name="Old name")
+        rows = [
+            {"tin_number": "1000000001", "name": "New name", "address": "Addis Ababa"},
+            {"tin_number": " 1000000002 ", "name": "Second"},
+            {"tin_number": "1000000002", "name": "Second, last row wins"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            ids = Contact.objects.bulk_upsert(rows)
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertEqual(len(queries), 1)
+        self.assertEqual(ids["1000000001"], existing.pk)
+        self.assertEqual(
+            dict(Contact.objects.filter(pk__in=ids.values()).values_list("tin_number", "name")),
+            {"1000000001": "New name", "1000000002": "Second, last row wins"},
+        )
+        self.assertEqual(Contact.objects.get(pk=ids["1000000002"]).search_name, "second last row wins")
+
+    def test_invalid_rows_are_all_reported(self):
+        rows = [
+            {"tin_number": "123", "name": "Short TIN"},
+            {"tin_number": "1000000003", "name": "Fine"},
+            {"tin_number": "1000000004", "name": "  "},
+            {"tin_number": "1000000005", "name": "x" * 201},
+        ]
+        with self.assertRaises(ValidationError) as raised:
+            Contact.objects.bulk_upsert(rows)
+        self.assertEqual(
+            [message.split(":")[0] for message in raised.exception.message_dict["tin_number"]],
+            ["Row 0", "Row 2", "Row 3"],
+        )
+        self.assertFalse(Contact.objects.exists())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ContactTinLookupTests(TestCase):
+    """TIN-prefix typeahead from the in-memory index, kept current by the change journal."""
+
+    def setUp(self):
+        cache.clear()
+        self.enterContext(mock.patch.object(ContactTinIndex, "_sequence", None))  # Load afresh
+        for tin in ("1100000003", "1100000001", "1100000002", "1200000001"):
+            Contact.objects.create(tin_number=tin, name=f"Contact {tin}")
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token('1200000001')}")
+
+    def lookup(self, **params):
+        with redirect_stdout(StringIO()):
+            return self.client.get("/api/contacts/lookup/", params)
+
+    def tins(self, **params):
+        response = self.lookup(**params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return [contact["tin_number"] for contact in response.json()]
+
+    def test_prefix_in_tin_order_up_to_limit(self):
+        self.assertEqual(self.tins(tin_prefix="11", limit=2), ["1100000001", "1100000002"])
+        self.assertEqual(self.lookup(tin_prefix="13").status_code, 404)
+
+    def test_changes_reach_a_loaded_index_through_the_journal(self):
+        self.assertEqual(self.tins(tin_prefix="11"), ["1100000001", "1100000002", "1100000003"])
+        with self.captureOnCommitCallbacks(execute=True):
+            Contact.objects.create(tin_number="1100000000", name="New")
+            Contact.objects.filter(tin_number="1100000002").get().delete()
+        with mock.patch.object(ContactTinIndex, "_reload") as reload:
+            self.assertEqual(self.tins(tin_prefix="11"), ["1100000000", "1100000001", "1100000003"])
+        reload.assert_not_called()
+
+    def test_non_ascii_digits_are_rejected(self):
+        for params in ({"tin_prefix": "1²"}, {"tin_prefix": "١١"}, {"tin_number": "١١٠٠٠٠٠٠٠١"}):
+            self.assertEqual(self.lookup(**params).status_code, 400, params)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ContactNameSearchTests(TestCase):
+    """Fuzzy name search tolerates typos, punctuation and Amharic homophones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for tin, name in (
+            ("1300000001", "Abebe & Sons P.L.C."),
+            ("1300000002", "ሐበሻ ቢራ"),
+            ("1300000003", "Kebede Trading"),
+        ):
+            Contact.objects.create(tin_number=tin, name=name)
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, name):
+        with redirect_stdout(StringIO()):
+            response = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token('1300000003')}").get(
+                "/api/contacts/search/", {"name": name}
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        return [contact["tin_number"] for contact in response.json()]
+
+    def test_typos_punctuation_and_homophones(self):
+        self.assertEqual(self.search("abebe sonz plc")[0], "1300000001")
+        self.assertEqual(self.search("ሀበሻ ቢራ")[0], "1300000002")
+        self.assertNotIn("1300000003", self.search("abebe sons"))
+
+    def test_search_name_fits_its_column(self):
+        name = "Straße " * 28  # 195 characters; 223 once casefolded
+        max_length = Contact._meta.get_field("search_name").max_length
+        self.assertLessEqual(len(name.strip()), max_length)
+        self.assertLessEqual(len(normalize_contact_name(name)), max_length)
+        contact = Contact.objects.create(tin_number="1300000004", name=name)
+        self.assertTrue(contact.search_name.startswith("strasse strasse"))
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReceiptExportTests(TestCase):
+    """Export jobs and the CSV stream cover the company's receipts, and say so when they can't."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=6, documents=0, drafts=0)
+        cls.tin = SyntheticDataGenerator.company_tin(0, 7)
+        cls.receipts = Receipt.objects.filter(recorded_by__tin_number=cls.tin).count()
+
+    def setUp(self):
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+
+    def test_pdf_over_the_row_limit_is_refused(self):
+        with mock.patch.object(receipt_export, "HTML", object()), redirect_stdout(StringIO()):
+            with mock.patch.object(receipt_export, "PDF_MAX_ROWS", self.receipts - 1):
+                refused = self.client.post("/api/exports", {"format": "pdf"}, content_type="application/json")
+            with mock.patch.object(receipt_export, "PDF_MAX_ROWS", self.receipts):
+                accepted = self.client.post("/api/exports", {"format": "pdf"}, content_type="application/json")
+        self.assertEqual(refused.status_code, 400, refused.content)
+        self.assertIn("limited", refused.json()["error"])
+        self.assertEqual(accepted.status_code, 202, accepted.content)
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+    def test_cut_short_job_says_so(self):
+        job = ExportJob.objects.create(company_tin=self.tin, format="pdf", mode="receipts", filters={})
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        with override_settings(MEDIA_ROOT=media.name), \
+                mock.patch("core.services.export_jobs.write_pdf", return_value=self.receipts - 1):
+            ExportQueue.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.SUCCEEDED)
+        self.assertIn(f"{self.receipts - 1} of {self.receipts}", job.error)
+
+    def test_csv_stream(self):
+        with redirect_stdout(StringIO()):
+            response = self.client.get("/api/receipts/export.csv")
+            chunks = list(response.streaming_content)
+            lines = self.client.get("/api/receipts/export.csv", {"mode": "lines"})
+            line_rows = list(csv.reader(b"".join(lines.streaming_content).decode("utf-8-sig").splitlines()))
+            bad_mode = self.client.get("/api/receipts/export.csv", {"mode": "pdf"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Buffering"], "no")
+        self.assertEqual(chunks[0].decode(), "\ufeff" + ",".join(receipt_export.ReceiptExport(self.tin, {}).headers) + "\r\n")
+        rows = list(csv.reader(b"".join(chunks).decode("utf-8-sig").splitlines()))
+        self.assertEqual(
+            sorted(row[0] for row in rows[1:]),
+            sorted(Receipt.objects.filter(recorded_by__tin_number=self.tin).values_list("receipt_number", flat=True)),
+        )
+        self.assertEqual(
+            len(line_rows) - 1, ReceiptLine.objects.filter(receipt__recorded_by__tin_number=self.tin).count()
+        )
+        self.assertEqual(bad_mode.status_code, 400)
+
+    def test_csv_rows_batched_per_chunk(self):
+        chunks = list(receipt_export.iter_csv(receipt_export.ReceiptExport(self.tin, {}), batch_rows=4))
+        self.assertEqual([chunk.count("\r\n") for chunk in chunks], [1, 4, self.receipts - 4])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ReceiptNumberCheckTests(TestCase):
+    """Existence checks answer from the Bloom filter when it rules a number out."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(contacts=5, items=5, receipts=6, documents=0, drafts=0)
+        cls.tin = SyntheticDataGenerator.company_tin(0, 7)
+        cls.receipt = Receipt.objects.filter(recorded_by__tin_number=cls.tin).order_by("id").first()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_batch_check_is_case_insensitive(self):
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+        number = self.receipt.receipt_number
+        with redirect_stdout(StringIO()):
+            response = client.post(
+                "/api/check-receipts-exist/", {"receipt_numbers": [f" {number.lower()} ", "NOT-RECORDED"]},
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["results"], {f" {number.lower()} ": True, "NOT-RECORDED": False})
+
+    def test_unknown_numbers_skip_the_database(self):
+        find_existing_receipt_numbers(self.tin, ["WARM-UP"])  # Builds the filter
+        with self.assertNumQueries(0):
+            self.assertEqual(find_existing_receipt_numbers(self.tin, ["NOT-RECORDED-1", "NOT-RECORDED-2"]), set())
+
+    def test_new_number_is_added_without_a_rebuild(self):
+        find_existing_receipt_numbers(self.tin, ["WARM-UP"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.receipt.receipt_number = "INV-NEW-1"
+            self.receipt.save()
+        with mock.patch.object(ReceiptNumberBloomFilter, "build_for_company") as build:
+            self.assertEqual(find_existing_receipt_numbers(self.tin, ["inv-new-1"]), {"INV-NEW-1"})
+        build.assert_not_called()
+
+    def test_delete_retires_the_filter(self):
+        find_existing_receipt_numbers(self.tin, ["WARM-UP"])
+        number = self.receipt.receipt_number.upper()
+        with self.captureOnCommitCallbacks(execute=True):
+            Receipt.objects.get(pk=self.receipt.pk).delete()
+        with mock.patch.object(
+            ReceiptNumberBloomFilter, "build_for_company", wraps=ReceiptNumberBloomFilter.build_for_company
+        ) as build:
+            self.assertEqual(find_existing_receipt_numbers(self.tin, [number]), set())
+        build.assert_called_once()
+
+
+class JsonRenderingAndCompressionTests(SimpleTestCase):
+    """FastJSONRenderer writes what DRF would; CompressionMiddleware follows Accept-Encoding."""
+
+    @unittest.skipIf(renderers.orjson is None, "orjson not installed")
+    def test_renderer_matches_drf(self):
+        data = {
+            "amount": Decimal("12.50"),
+            "at": timezone.make_aware(datetime(2024, 1, 2, 3, 4, 5, 678901)),
+            "day": date(2024, 1, 2),
+            "id": uuid.UUID(int=1),
+            "label": gettext_lazy("Receipt"),
+            "note": "ሀበሻ line\u2028separator\u2029",
+            "rows": [1, None, True],
+            3: "int key",
+        }
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def respond(self, accept_encoding, body=b"[" + b"1," * 2000 + b"1]", **headers):
+        middleware = CompressionMiddleware(lambda request: None)
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept_encoding)
+        response = HttpResponse(body, content_type="application/json", headers=headers)
+        return middleware.process_response(request, response)
+
+    def test_encoding_follows_q_values(self):
+        fake_brotli = mock.Mock(compress=lambda content, quality: b"br:" + content[:10])
+        with mock.patch("global_config.middleware.brotli", fake_brotli):
+            self.assertEqual(self.respond("gzip, br")["Content-Encoding"], "br")  # Tie: brotli
+            self.assertEqual(self.respond("br;q=0.5, gzip")["Content-Encoding"], "gzip")
+            self.assertFalse(self.respond("identity").has_header("Content-Encoding"))
+        with mock.patch("global_config.middleware.brotli", None):
+            response = self.respond("br, *;q=0.1")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), b"[" + b"1," * 2000 + b"1]")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_left_as_is(self):
+        self.assertFalse(self.respond("gzip", body=b"[1]").has_header("Content-Encoding"))  # Too small
+        self.assertFalse(self.respond("gzip", **{"Accept-Ranges": "bytes"}).has_header("Content-Encoding"))
+        self.assertEqual(self.respond("gzip", ETag='"abc"')["ETag"], 'W/"abc"')
+
+
+class PurchaseVoucherStorageTests(TestCase):
+    """Voucher files go to media storage under a safe name; the legacy blobs are never loaded."""
+
+    def test_files_stored_in_media(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token('1400000001')}")
+        with override_settings(MEDIA_ROOT=media.name), redirect_stdout(StringIO()):
+            response = client.post("/api/create-purchase-voucher", {
+                "supplier_name": "Supplier",
+                "supplier_address": "Addis Ababa",
+                "date": "2024-01-02",
+                "amount_paid": "100.00",
+                "purchase_recipt_number": "../PV/001",
+                "document": SimpleUploadedFile("scan.PDF", b"%PDF-1.4", content_type="application/pdf"),
+            })
+            self.assertEqual(response.status_code, 201, response.content)
+            voucher = PurchaseVoucher.objects.get()
+            self.assertEqual(voucher.get_deferred_fields(), {"document", "attachment"})
+            self.assertRegex(voucher.document_file.name, r"^purchase_vouchers/[^/]*PV001_[0-9a-f]{8}\.pdf$")
+            with voucher.document_file.open("rb") as stored:
+                self.assertEqual(stored.read(), b"%PDF-1.4")
+        self.assertEqual((voucher.document_filename, voucher.document_content_type), ("scan.PDF", "application/pdf"))
+        self.assertTrue(response.json()["document_url"].endswith(voucher.document_file.url))
+        self.assertIsNone(response.json()["attachment_url"])
+        self.assertIsNone(PurchaseVoucher.objects.values_list("document", flat=True).get())
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class DocumentFileDownloadTests(TestCase):
+    """Byte ranges and validators on the receipt document download view."""
+
+    BODY = b"%PDF-1.4 " + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(
+                companies=1, contacts=2, items=0, receipts=0, documents=1, drafts=0
+            )
+        cls.tin = SyntheticDataGenerator.company_tin(0, 7)
+        cls.document = ReceiptDocument.objects.select_related("main_receipt").get()
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.enterContext(redirect_stdout(StringIO()))  # The auth middleware prints
+        path = Path(media.name, self.document.main_receipt.main_receipt.name)
+        path.parent.mkdir(parents=True)
+        path.write_bytes(self.BODY)
+        self.client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(self.tin)}")
+        self.url = f"/api/get-documents/{self.document.id}/files/main"
+        self.etag = f'"{self.document.main_receipt.main_receipt_hash}"'
+
+    def test_full_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.BODY)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "private, no-cache")
+        versioned = self.client.get(self.url, {"v": self.etag.strip('"')})
+        self.assertIn("immutable", versioned["Cache-Control"])
+        versioned.close()
+
+    def test_if_none_match_returns_304(self):
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=f"W/{self.etag}")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], self.etag)
+
+    def test_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=9-18")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 9-18/{len(self.BODY)}")
+        self.assertEqual(b"".join(response.streaming_content), self.BODY[9:19])
+
+        suffix = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(suffix.streaming_content), self.BODY[-4:])
+
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=0-0", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        stale.close()
+
+        unsatisfiable = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.BODY)}-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(self.BODY)}")
+
+    def test_other_companies_get_404(self):
+        other = Contact.objects.exclude(tin_number=self.tin).order_by("id").first()
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {SyntheticDataGenerator.token(other.tin_number)}")
+        self.assertEqual(client.get(self.url).status_code, 404)
+
+
+class RequestInstrumentationTests(TestCase):
+    """Opt-in per-request query/latency log line and Server-Timing header."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(
+                companies=1, contacts=2, items=0, receipts=0, documents=2, drafts=0
+            )
+        cls.token = SyntheticDataGenerator.token(SyntheticDataGenerator.company_tin(0, 7))
+
+    def get_documents(self):
+        # The middleware chain is built on a client's first request
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        with redirect_stdout(StringIO()):
+            return client.get("/api/get-documents")
+
+    def test_off_by_default(self):
+        with self.assertNoLogs("global_config.instrumentation"):
+            response = self.get_documents()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Server-Timing", response)
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, REQUEST_INSTRUMENTATION_MAX_QUERIES=1000)
+    def test_request_logged_with_its_queries(self):
+        with self.assertLogs("global_config.instrumentation", "INFO") as logs, \
+                CaptureQueriesContext(connection) as queries:
+            response = self.get_documents()
+        self.assertEqual(response.status_code, 200)
+        [line] = logs.records
+        self.assertEqual(line.levelno, logging.INFO)
+        record = json.loads(line.getMessage())
+        self.assertEqual(record["queries"], len(queries))
+        self.assertEqual(record["path"], "/api/get-documents")
+        self.assertEqual(record["view"], response.resolver_match.view_name)
+        self.assertEqual(record["company_tin"], SyntheticDataGenerator.company_tin(0, 7))
+        self.assertEqual(record["response_bytes"], len(response.content))
+        self.assertNotIn("flags", record)
+        self.assertRegex(response["Server-Timing"], rf'^db;dur=[\d.]+;desc="{len(queries)} queries", app;dur=')
+
+    @override_settings(REQUEST_INSTRUMENTATION=True, REQUEST_INSTRUMENTATION_MAX_QUERIES=0)
+    def test_flagged_over_the_query_budget(self):
+        with self.assertLogs("global_config.instrumentation", "WARNING") as logs:
+            self.get_documents()
+        self.assertEqual(json.loads(logs.records[0].getMessage())["flags"], ["too_many_queries"])
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class MetricsEndpointTests(TestCase):
+    """/metrics is public and reports what the instrumented paths observed."""
+
+    @classmethod
+    def setUpTestData(cls):
+        with redirect_stdout(StringIO()):
+            SyntheticDataGenerator(seed=7).generate(
+                companies=1, contacts=2, items=2, receipts=2, documents=0, drafts=0
+            )
+        cls.token = SyntheticDataGenerator.token(SyntheticDataGenerator.company_tin(0, 7))
+
+    @staticmethod
+    def sample(name, labels=None):
+        return metrics.prometheus_client.REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    @unittest.skipIf(metrics.prometheus_client is None, "prometheus_client is not installed")
+    def test_search_latency_scraped_without_a_token(self):
+        before = {
+            group_by: self.sample("receipt_search_seconds_count", {"group_by": group_by})
+            for group_by in ("none", "invalid")
+        }
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        with redirect_stdout(StringIO()):
+            self.assertEqual(client.get("/api/receipts/search/").status_code, 200)
+            self.assertEqual(client.get("/api/receipts/search/", {"group_by": "x" * 40}).status_code, 400)
+            response = Client().get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], metrics.prometheus_client.CONTENT_TYPE_LATEST)
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertIn(b'receipt_search_seconds_count{group_by="invalid"}', response.content)
+        for group_by, count in before.items():
+            self.assertEqual(self.sample("receipt_search_seconds_count", {"group_by": group_by}), count + 1)
+
+    @unittest.skipIf(metrics.prometheus_client is None, "prometheus_client is not installed")
+    def test_receipt_creation_tracked_on_success_only(self):
+        created = self.sample("receipts_created_total")
+        lines = self.sample("receipt_lines_sum")
+
+        @metrics.track_receipt_creation
+        def create(validated_data):
+            if validated_data.pop("fail", False):
+                raise ValueError
+            validated_data.pop("items")
+
+        create({"items": [{}, {}, {}]})
+        with self.assertRaises(ValueError):
+            create({"items": [{}], "fail": True})
+        self.assertEqual(self.sample("receipts_created_total"), created + 1)
+        self.assertEqual(self.sample("receipt_lines_sum"), lines + 3)
+
+    def test_unavailable_without_prometheus_client(self):
+        with mock.patch.object(metrics, "prometheus_client", None):
+            response = Client().get("/metrics")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(Client().post("/metrics").status_code, 405)
+
+
+class SyntheticDataTests(TestCase):
+    """The generator is reproducible and consistent; the benchmark command reports every case."""
+
+    SIZES = {"companies": 2, "contacts": 4, "items": 6, "receipts": 5, "lines": 3, "documents": 3, "drafts": 2}
+
+    def generate(self, seed=7):
+        with redirect_stdout(StringIO()):
+            return SyntheticDataGenerator(seed=seed, batch_size=4, today=date(2024, 6, 30)).generate(**self.SIZES)
+
+    @staticmethod
+    def snapshot():
+        return (
+            list(Receipt.objects.order_by("recorded_by__tin_number", "receipt_number").values_list(
+                "recorded_by__tin_number", "receipt_number", "receipt_date", "issued_by__tin_number", "expired_vat",
+            )),
+            list(ReceiptLine.objects.order_by("receipt__recorded_by__tin_number", "receipt__receipt_number", "id")
+                 .values_list("item__item_code", "quantity", "unit_cost", "tax_amount")),
+        )
+
+    def test_same_seed_same_data(self):
+        with transaction.atomic():
+            self.generate()
+            first = self.snapshot()
+            transaction.set_rollback(True)
+        self.assertFalse(Receipt.objects.exists())
+        counts = self.generate()
+        self.assertEqual(self.snapshot(), first)
+        self.assertEqual(counts, {
+            "companies": 2, "contacts": 4, "items": 6, "receipts": 10, "lines": ReceiptLine.objects.count(),
+            "documents": 6, "drafts": 4,
+        })
+        self.assertEqual(ReceiptDocument.objects.filter(linked_receipt__isnull=True).count(), 6)
+
+    def test_rows_match_the_services(self):
+        self.generate()
+        for contact in Contact.objects.all():
+            self.assertEqual(contact.search_name, normalize_contact_name(contact.name))
+        for line in ReceiptLine.objects.select_related("item"):
+            rate = Decimal("10.0") if line.tax_type == "TOT" and line.item_type != "goods" else TAX_RATES[line.tax_type]
+            expected = ((line.quantity * line.unit_cost - line.discount_amount) * rate / 100).quantize(
+                Decimal("0.01"), rounding=ROUND_HALF_UP
+            )
+            self.assertEqual(line.tax_amount, expected)
+        for receipt in Receipt.objects.all():
+            tax = sum((line.tax_amount for line in receipt.items.all()), Decimal("0.00"))
+            self.assertEqual(receipt.expired_vat, tax if is_date_expired(receipt.receipt_date) else Decimal("0.00"))
+
+    def test_benchmark_reports_each_case(self):
+        self.generate()
+        tin = SyntheticDataGenerator.company_tin(0, 7)
+        output = Path(self.enterContext(tempfile.TemporaryDirectory()), "benchmark.json")
+        # The test runner has already set up the test environment
+        with mock.patch("core.management.commands.benchmark_endpoints.setup_test_environment"), \
+                mock.patch("core.management.commands.benchmark_endpoints.teardown_test_environment"):
+            call_command(
+                "benchmark_endpoints", tin=tin, repeat=2, only=["search_group_by_month", "document_list"],
+                output=str(output), locmem_cache=True, stdout=StringIO(),
+            )
+        report = json.loads(output.read_text())
+        self.assertEqual(report["meta"]["company_tin"], tin)
+        self.assertEqual(report["meta"]["database"], connection.vendor)
+        self.assertEqual([result["name"] for result in report["results"]], ["search_group_by_month", "document_list"])
+        for result in report["results"]:
+            self.assertEqual((result["status"], result["runs"]), (200, 2))
+            self.assertGreater(result["queries"], 0)
+            self.assertLessEqual(result["ms"]["min"], result["ms"]["median"])
@@ -0,0 +1,414 @@
+# core/views/AsyncReadViews.py
+"""
+Async variants of the read-heavy endpoints, served in place of the DRF
+views under ASGI (ASYNC_READ_VIEWS, see global_config/asgi.py and
+with_async_views). Same URLs, parameters and JSON: they reuse the sync
+views' querysets, serializers, pagination classes and renderer, and the
+sync views stay what the API docs describe.
+
+An ASGI worker keeps serving other requests while one waits on the
+database. Within one request, Django's async ORM still runs queries one at
+a time in the request's thread, so gather_queries() runs a view's
+independent queries (page + count / summary, the four lookup tables) on
+separate connections when ASYNC_PARALLEL_QUERIES is on.
+"""
+
+import asyncio
+import math
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Q
+from django.http import HttpResponse
+from django.urls import URLPattern
+from django.views import View
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.models.contact import Contact
+from core.serializers.sparse_fields import resolve_sparse_fields
+from core.services import metrics
+from core.services.contact_tin_index import ContactTinIndex
+from core.views.ContactLookupview import ContactLookupView
+from core.views.lookupviews import (
+    LookupTablesView,
+    ReceiptCategoryListAPIView,
+    ReceiptKindListAPIView,
+    ReceiptNameListAPIView,
+    ReceiptTypeListAPIView,
+)
+from core.views.ReceiptDisplayView import ReceiptListView
+from core.views.RegiserandDisplayDocumentsView import DocumentListView
+from core.views.search_receipts import ReceiptSearchView
+from global_config.renderers import FastJSONRenderer
+
+
+# ========================
+# Helpers
+# ========================
+def json_response(data, status_code=status.HTTP_200_OK):
+    """What the DRF view's Response renders to (same renderer, same bytes)."""
+    return HttpResponse(
+        FastJSONRenderer().render(data), status=status_code, content_type="application/json"
+    )
+
+
+def from_drf(response: Response):
+    return json_response(response.data, response.status_code)
+
+
+def sync_view(view_class, request):
+    """The DRF view set up as dispatch() would, for its queryset / serializer helpers."""
+    view = view_class()
+    view.request = request
+    view.args, view.kwargs = (), {}
+    view.format_kwarg = None
+    return view
+
+
+def _on_own_connection(call):
+    def run():
+        close_old_connections()  # As around a request: drop broken / expired connections
+        try:
+            return call()
+        finally:
+            close_old_connections()
+
+    return run
+
+
+async def gather_queries(*calls):
+    """
+    Results of the sync callables `calls`, which must not depend on each
+    other. With ASYNC_PARALLEL_QUERIES each runs in its own thread, so on
+    its own connection (pooled with DB_POOL); otherwise one after another
+    in the request's thread, like the async ORM.
+    """
+    if not settings.ASYNC_PARALLEL_QUERIES:
+        return [await sync_to_async(call)() for call in calls]
+    return await asyncio.gather(*(
+        sync_to_async(_on_own_connection(call), thread_sensitive=False)() for call in calls
+    ))
+
+
+class AsyncPage:
+    """
+    PageNumberPagination semantics (page / page_size params, "last",
+    404 "Invalid page.", next / previous links) for a page whose rows are
+    fetched together with the count instead of after it.
+    """
+
+    def __init__(self, request, pagination_class):
+        pagination = pagination_class()
+        self.request = request
+        self.param = pagination.page_query_param
+        self.size = pagination.get_page_size(request)
+        self.message = pagination.invalid_page_message
+        raw = request.query_params.get(self.param) or 1
+        self.last = raw in pagination.last_page_strings
+        try:
+            self.number = None if self.last else int(raw)
+        except (TypeError, ValueError):
+            self.number = 0  # Invalid whatever the count
+
+    def num_pages(self, count):
+        return max(1, math.ceil(count / self.size))
+
+    def bounds(self):
+        offset = (self.number - 1) * self.size
+        return offset, offset + self.size
+
+    def is_valid(self, count):
+        return 1 <= self.number <= self.num_pages(count)
+
+    def not_found(self):
+        return json_response({"detail": str(self.message)}, status.HTTP_404_NOT_FOUND)
+
+    def links(self, count):
+        url = self.request.build_absolute_uri()
+        next_link = previous_link = None
+        if self.number < self.num_pages(count):
+            next_link = replace_query_param(url, self.param, self.number + 1)
+        if self.number > 1:
+            previous_link = (
+                remove_query_param(url, self.param) if self.number == 2
+                else replace_query_param(url, self.param, self.number - 1)
+            )
+        return next_link, previous_link
+
+    def data(self, count, results):
+        next_link, previous_link = self.links(count)
+        return {"count": count, "next": next_link, "previous": previous_link, "results": results}
+
+
+async def paginate(page, count_call, rows_call):
+    """
+    (count, extra, rows) with the count and page queries in flight at
+    once, or None for an invalid page. count_call() returns a
+    (count, extra) pair; rows_call(start, stop) the serialized page.
+    """
+    if page.last:  # Which page that is depends on the count
+        ((count, extra),) = await gather_queries(count_call)
+        page.number = page.num_pages(count)
+        (rows,) = await gather_queries(lambda: rows_call(*page.bounds()))
+    elif page.number < 1:
+        return None
+    else:
+        (count, extra), rows = await gather_queries(count_call, lambda: rows_call(*page.bounds()))
+    if not page.is_valid(count):
+        return None
+    return count, extra, rows
+
+
+# ========================
+# Lists
+# ========================
+class AsyncListView(View):
+    """A ListAPIView's queryset, serializer and pagination; page and count queried together."""
+
+    sync_view_class = None
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        view = sync_view(self.sync_view_class, request)
+        try:
+            queryset = view.filter_queryset(view.get_queryset())
+        except ValidationError as e:  # Sparse fieldsets
+            return json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+
+        page = AsyncPage(request, view.pagination_class)
+        result = await paginate(
+            page,
+            lambda: (queryset.count(), None),
+            lambda start, stop: view.get_serializer(queryset[start:stop], many=True).data,
+        )
+        if result is None:
+            return page.not_found()
+        count, _, rows = result
+        return json_response(page.data(count, rows))
+
+
+class AsyncReceiptListView(AsyncListView):
+    sync_view_class = ReceiptListView
+    use_read_replica = True
+
+
+class AsyncReceiptKindListView(AsyncListView):
+    sync_view_class = ReceiptKindListAPIView
+
+
+class AsyncReceiptNameListView(AsyncListView):
+    sync_view_class = ReceiptNameListAPIView
+
+
+class AsyncReceiptCategoryListView(AsyncListView):
+    sync_view_class = ReceiptCategoryListAPIView
+
+
+class AsyncReceiptTypeListView(AsyncListView):
+    sync_view_class = ReceiptTypeListAPIView
+
+
+class AsyncLookupTablesView(View):
+    """GET /api/lookups: the four tables queried at once."""
+
+    async def get(self, request):
+        keys = list(LookupTablesView.TABLES)
+        tables = await gather_queries(*(
+            lambda key=key: LookupTablesView.table(key) for key in keys
+        ))
+        return json_response(dict(zip(keys, tables)))
+
+
+# ========================
+# Documents
+# ========================
+class AsyncDocumentListView(View):
+    """
+    DocumentListView with the page fetched by LIMIT/OFFSET and the summary
+    computed by one aggregate query (instead of both from every document
+    in Python), the two running together.
+    """
+
+    use_read_replica = True
+
+    @staticmethod
+    def has_file(field):
+        return Q(**{f"{field}__isnull": False}) & ~Q(**{field: ""})
+
+    def summary(self, receipt_docs):
+        """(count, summary) with the keys and meaning of DocumentListView's summary."""
+        counts = receipt_docs.order_by().aggregate(
+            total=Count("id"),
+            main=Count("id", filter=self.has_file("main_receipt__main_receipt")),
+            withholding=Count("id", filter=self.has_file("withholding_receipt__withholding_receipt")),
+            uploaded=Count("id", filter=Q(status="uploaded")),
+            processed=Count("id", filter=Q(status="processed")),
+            rejected=Count("id", filter=Q(status="rejected")),
+            main_attachments=Count("id", filter=self.has_file("main_receipt__attachment")),
+            withholding_attachments=Count(
+                "id", filter=self.has_file("withholding_receipt__withholding_attachment")
+            ),
+        )
+        return counts["total"], {
+            'total_transactions': counts["total"],
+            'with_main_receipt': counts["main"],
+            'with_withholding_receipt': counts["withholding"],
+            'statuses': {
+                'uploaded': counts["uploaded"],
+                'processed': counts["processed"],
+                'rejected': counts["rejected"],
+            },
+            'has_attachments': {
+                'main': counts["main_attachments"],
+                'withholding': counts["withholding_attachments"],
+            }
+        }
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        company_tin = getattr(request, 'company_tin', None)
+        if not company_tin:
+            return json_response(
+                {"error": "Authentication failed: company TIN not found."},
+                status.HTTP_401_UNAUTHORIZED,
+            )
+
+        try:
+            company = await Contact.objects.aget(tin_number=company_tin)
+        except Contact.DoesNotExist:
+            company = await Contact.objects.acreate(
+                tin_number=company_tin,
+                name="New Company",
+                address="Address not provided"
+            )
+
+        view = sync_view(DocumentListView, request)
+        receipt_docs = view.filter_documents(request, company)
+        if isinstance(receipt_docs, Response):
+            return from_drf(receipt_docs)  # Invalid date filter
+
+        def rows(start, stop):
+            documents = [view.document_row(doc, company) for doc in receipt_docs[start:stop]]
+            return view.get_serializer(documents, many=True).data
+
+        page = AsyncPage(request, view.pagination_class)
+        result = await paginate(page, lambda: self.summary(receipt_docs), rows)
+        if result is None:
+            return page.not_found()
+        count, summary, documents = result
+        data = page.data(count, documents)
+        data['summary'] = summary
+        return json_response(data)
+
+
+# ========================
+# Search and lookups
+# ========================
+class AsyncReceiptSearchView(View):
+    """ReceiptSearchView (filters, grouping, sparse fields) on the async ORM."""
+
+    use_read_replica = True
+
+    async def get(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        request = Request(request)
+        response = await self.search(request)
+        group_by = request.query_params.get("group_by") or "none"
+        if response.status_code == status.HTTP_400_BAD_REQUEST:
+            group_by = "invalid"  # Keep label values bounded
+        metrics.SEARCH_SECONDS.labels(group_by).observe(time.perf_counter() - started)
+        return response
+
+    async def search(self, request):
+        view = ReceiptSearchView()
+        group_by = request.query_params.get("group_by")
+        tax_type = request.query_params.get("tax_type")
+        receipts = view.filtered_receipts(request.query_params)
+
+        if group_by:
+            grouped = view.grouping_queryset(receipts, group_by)
+            if isinstance(grouped, dict):
+                return json_response(grouped, status.HTTP_400_BAD_REQUEST)
+            return json_response({
+                "grouped": True,
+                "group_by": group_by,
+                "data": [row async for row in grouped],
+            })
+
+        try:
+            fields = resolve_sparse_fields(
+                request.query_params, view.SEARCH_FIELDS, view.EXPANDABLE_FIELDS
+            )
+        except ValidationError as e:
+            return json_response(e.detail, status.HTTP_400_BAD_REQUEST)
+
+        # Prefetches included; serializing then only reads loaded rows
+        receipts = view.project_receipts(receipts, fields, tax_type)
+        results = [view.serialize_receipt(r, fields) async for r in receipts]
+        response_data = {"grouped": False, "count": len(results), "data": results}
+        if request.query_params.get("include_archived") == "true":
+            response_data["archived"] = [
+                view.serialize_archived(stub, fields)
+                async for stub in view.archived_receipts(request.query_params)
+            ]
+        return json_response(response_data)
+
+
+class AsyncContactLookupView(View):
+    """ContactLookupView: same validation and output, async ORM."""
+
+    async def get(self, request):
+        request = Request(request)
+        view = ContactLookupView()
+        parsed = view.parse(request.query_params)
+        if isinstance(parsed, Response):
+            return from_drf(parsed)
+        tin_number, tin_prefix, limit = parsed
+
+        if tin_prefix:
+            company_tin = getattr(request, 'company_tin', None)
+            # In-memory index; may (re)load from the database, so off the event loop
+            contact_ids = await sync_to_async(ContactTinIndex.search)(tin_prefix, limit, company_tin)
+            if not contact_ids:
+                return from_drf(view.no_prefix_match())
+            contacts = await Contact.objects.only('name', 'tin_number', 'address').ain_bulk(contact_ids)
+            return json_response(view.prefix_results(contact_ids, contacts))
+
+        try:
+            contact = await Contact.objects.aget(tin_number=tin_number)
+        except Contact.DoesNotExist:
+            return from_drf(view.not_found())
+        return json_response(view.contact_data(contact))
+
+
+# ========================
+# URL wiring
+# ========================
+ASYNC_VARIANTS = {
+    ReceiptSearchView: AsyncReceiptSearchView,
+    DocumentListView: AsyncDocumentListView,
+    ReceiptListView: AsyncReceiptListView,
+    ContactLookupView: AsyncContactLookupView,
+    LookupTablesView: AsyncLookupTablesView,
+    ReceiptKindListAPIView: AsyncReceiptKindListView,
+    ReceiptNameListAPIView: AsyncReceiptNameListView,
+    ReceiptCategoryListAPIView: AsyncReceiptCategoryListView,
+    ReceiptTypeListAPIView: AsyncReceiptTypeListView,
+}
+
+
+def with_async_views(patterns):
+    """`patterns` with the views in ASYNC_VARIANTS replaced by their async variant."""
+    swapped = []
+    for pattern in patterns:
+        variant = ASYNC_VARIANTS.get(getattr(pattern.callback, "cls", None))
+        if variant is not None:
+            pattern = URLPattern(pattern.pattern, variant.as_view(), pattern.default_args, pattern.name)
+        swapped.append(pattern)
+    return swapped
@@ -3,8 +3,25 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
-from core.models.Receipt import Receipt
-from core.models.contact import Contact
+from core.services.receipt_number_bloom import (
+    find_existing_receipt_numbers,
+    normalize_receipt_number,
+)
+
+
+def _validate_company_tin(company_tin):
+    """Returns an error Response, or None if the TIN from the token is usable."""
+    if not company_tin:
+        return Response(
+            {"error": "Authentication failed: company TIN not found."},
+            status=status.HTTP_401_UNAUTHORIZED
+        )
+    if not company_tin.isdigit() or len(company_tin) != 10:
+        return Response(
+            {"error": "Invalid company TIN."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return None
 
 
 class CheckReceiptExistsView(APIView):
@@ -28,32 +45,54 @@ class CheckReceiptExistsView(APIView):
                 {"error": "receipt_number is required."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        if not company_tin:
+        error = _validate_company_tin(company_tin)
+        if error:
+            return error
+
+        # Bloom filter → DB only when the number might exist (no company → no receipt)
+        existing = find_existing_receipt_numbers(company_tin, [receipt_number])
+        exists = normalize_receipt_number(receipt_number) in existing
+
+        return Response({"exists": exists}, status=status.HTTP_200_OK)
+
+
+class BatchCheckReceiptExistsView(APIView):
+    """
+    Check many receipt numbers at once for the authenticated company.
+    Usage: POST /api/check-receipts-exist/
+           {"receipt_numbers": ["INV-001", "INV-002"]}
+    Returns: {"results": {"INV-001": true, "INV-002": false}}
+    """
+    permission_classes = []
+    MAX_RECEIPT_NUMBERS = 500
+
+    def post(self, request):
+        company_tin = getattr(request, 'company_tin', None)
+        receipt_numbers = request.data.get('receipt_numbers')
+
+        if not isinstance(receipt_numbers, list) or not receipt_numbers:
             return Response(
-                {"error": "Authentication failed: company TIN not found."},
-                status=status.HTTP_401_UNAUTHORIZED
+                {"error": "receipt_numbers must be a non-empty list."},
+                status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Validate TIN format
-        if not company_tin.isdigit() or len(company_tin) != 10:
+        if len(receipt_numbers) > self.MAX_RECEIPT_NUMBERS:
             return Response(
-                {"error": "Invalid company TIN."},
+                {"error": f"At most {self.MAX_RECEIPT_NUMBERS} receipt numbers per request."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Find the company (recorded_by)
-        try:
-            recorded_by = Contact.objects.get(tin_number__iexact=company_tin)
-        except Contact.DoesNotExist:
+        if not all(isinstance(n, str) and n.strip() for n in receipt_numbers):
             return Response(
-                {"exists": False},  # Safe: no company → no receipt
-                status=status.HTTP_200_OK
+                {"error": "receipt_numbers must contain non-empty strings."},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        error = _validate_company_tin(company_tin)
+        if error:
+            return error
 
-        # Check if receipt exists for this company
-        exists = Receipt.objects.filter(
-            receipt_number__iexact=receipt_number,
-            recorded_by=recorded_by
-        ).exists()
+        existing = find_existing_receipt_numbers(company_tin, receipt_numbers)
+        results = {
+            number: normalize_receipt_number(number) in existing
+            for number in receipt_numbers
+        }
 
-        return Response({"exists": exists}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"results": results}, status=status.HTTP_200_OK)
@@ -0,0 +1,187 @@
+# core/views/ChunkedUploadView.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.permissions import AllowAny
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from core.services.chunked_upload import ChunkedUploadError, ChunkedUploadStore
+from core.views.RegiserandDisplayDocumentsView import UploadReceiptDocumentView
+
+# Form keys UploadReceiptSerializer reads files from
+UPLOAD_FILE_KEYS = (
+    "main_receipt_data.main_receipt",
+    "main_receipt_data.attachment",
+    "withholding_receipt_data.withholding_receipt",
+    "withholding_receipt_data.withholding_attachment",
+)
+
+
+def _error_response(error):
+    data = {"error": str(error)}
+    if error.offset is not None:
+        data["offset"] = error.offset
+    return Response(data, status=error.status)
+
+
+def _unauthorized():
+    return Response(
+        {"error": "Authentication failed: company TIN not found."},
+        status=status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+class ChunkedUploadInitView(APIView):
+    """
+    Start a resumable upload of one file.
+
+    1. POST /api/uploads {"filename", "size", "content_type"} → upload_id
+    2. PUT /api/uploads/<upload_id> with Content-Range: bytes <start>-<end>/<size>
+       and the raw bytes, in order; GET it to learn the offset to resume from
+    3. POST /api/uploads/commit with the usual upload fields (as JSON) and
+       "files": {"main_receipt_data.main_receipt": "<upload_id>", ...}
+    """
+
+    permission_classes = [AllowAny]
+    parser_classes = [JSONParser]
+
+    @swagger_auto_schema(
+        operation_summary="Start a chunked upload",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["filename", "size"],
+            properties={
+                "filename": openapi.Schema(type=openapi.TYPE_STRING),
+                "size": openapi.Schema(type=openapi.TYPE_INTEGER, description="Total size in bytes"),
+                "content_type": openapi.Schema(type=openapi.TYPE_STRING),
+            },
+        ),
+        responses={201: "upload_id, offset, chunk_size", 400: "Invalid request", 413: "File too large"},
+    )
+    def post(self, request):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return _unauthorized()
+        try:
+            upload = ChunkedUploadStore.init(
+                company_tin,
+                request.data.get("filename"),
+                request.data.get("size"),
+                request.data.get("content_type"),
+            )
+        except ChunkedUploadError as e:
+            return _error_response(e)
+        upload["chunk_size"] = ChunkedUploadStore.CHUNK_SIZE
+        return Response(upload, status=status.HTTP_201_CREATED)
+
+
+class ChunkedUploadDetailView(APIView):
+    """Status (GET), next chunk (PUT) or abort (DELETE) of a chunked upload."""
+
+    permission_classes = [AllowAny]
+    parser_classes = []  # PUT bodies are raw bytes, streamed to disk
+
+    def get(self, request, upload_id):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return _unauthorized()
+        try:
+            return Response(ChunkedUploadStore.get(upload_id, company_tin))
+        except ChunkedUploadError as e:
+            return _error_response(e)
+
+    @swagger_auto_schema(
+        operation_summary="Upload a chunk",
+        manual_parameters=[
+            openapi.Parameter("Content-Range", openapi.IN_HEADER, type=openapi.TYPE_STRING,
+                              required=True, description="bytes <start>-<end>/<size>"),
+        ],
+        responses={
+            200: "New offset",
+            400: "Bad Content-Range or short body",
+            404: "Upload not found or expired",
+            409: "Chunk does not start at the current offset (offset returned)",
+            416: "Range outside the file",
+        },
+    )
+    def put(self, request, upload_id):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return _unauthorized()
+        try:
+            upload = ChunkedUploadStore.write_chunk(
+                upload_id, company_tin, request.headers.get("Content-Range"), request.stream
+            )
+        except ChunkedUploadError as e:
+            return _error_response(e)
+        return Response(upload)
+
+    def delete(self, request, upload_id):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return _unauthorized()
+        try:
+            ChunkedUploadStore.get(upload_id, company_tin)
+        except ChunkedUploadError as e:
+            return _error_response(e)
+        ChunkedUploadStore.discard(upload_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ChunkedUploadCommitView(UploadReceiptDocumentView):
+    """
+    Create the receipt document from completed chunked uploads.
+    Same fields and response as upload-receipt-documents (sent as JSON),
+    plus "files": {form key: upload_id}. The assembled files are moved into
+    media/ (no copy), and their md5 from upload time is used for the
+    duplicate check. Uploads are removed once the document is created.
+    """
+
+    parser_classes = [JSONParser]
+
+    def create(self, request, *args, **kwargs):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return _unauthorized()
+
+        upload_ids = request.data.get("files")
+        if not isinstance(upload_ids, dict) or not upload_ids:
+            return Response(
+                {"error": "'files' must map upload fields to upload ids."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        unknown = set(upload_ids) - set(UPLOAD_FILE_KEYS)
+        if unknown:
+            return Response(
+                {"error": f"Unknown file fields: {', '.join(sorted(unknown))}. Use: {', '.join(UPLOAD_FILE_KEYS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        files, hashes = {}, {}
+        try:
+            for key, upload_id in upload_ids.items():
+                files[key], hashes[key] = ChunkedUploadStore.assemble(str(upload_id), company_tin)
+        except ChunkedUploadError as e:
+            for upload in files.values():
+                upload.close()
+            return _error_response(e)
+
+        self._upload_context = {"files": files, "file_hashes": hashes}
+        try:
+            response = super().create(request, *args, **kwargs)
+        finally:
+            for upload in files.values():
+                upload.close()
+
+        for key in files:
+            upload_id = str(upload_ids[key])
+            # Created, or the data was already moved into storage: nothing to resume
+            if response.status_code == status.HTTP_201_CREATED or not ChunkedUploadStore.has_data(upload_id):
+                ChunkedUploadStore.discard(upload_id)
+        return response
+
+    def get_upload_context(self):
+        return self._upload_context
@@ -3,19 +3,51 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from core.models.contact import Contact
+from core.services.contact_tin_index import ContactTinIndex, TIN_LENGTH
+from core.services.contact_name_search import normalize_contact_name, search_contacts_by_name
 
 
 class ContactLookupView(APIView):
     """
     Lookup contacts by:
-    - tin_prefix=123 → returns ALL matching contacts with FULL data
+    - tin_prefix=123 → typeahead: up to `limit` (default 20, max 100) matching
+      contacts with FULL data, the company's most-used contacts first
     - tin_number=1234567890 → returns single contact with FULL data
     """
     permission_classes = []  # Change to [IsAuthenticated] if needed
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 100
 
     def get(self, request):
-        tin_number = request.query_params.get('tin_number', '').strip()
-        tin_prefix = request.query_params.get('tin_prefix', '').strip()
+        parsed = self.parse(request.query_params)
+        if isinstance(parsed, Response):
+            return parsed
+        tin_number, tin_prefix, limit = parsed
+
+        # Handle: tin_prefix search (e.g., user typing)
+        if tin_prefix:
+            # In-memory index → at most `limit` ids, company's most-used first
+            company_tin = getattr(request, 'company_tin', None)
+            contact_ids = ContactTinIndex.search(tin_prefix, limit, company_tin)
+            if not contact_ids:
+                return self.no_prefix_match()
+
+            # 🔽 Get full contact data (name, tin, address): one primary-key query
+            contacts = Contact.objects.only('name', 'tin_number', 'address').in_bulk(contact_ids)
+            return Response(self.prefix_results(contact_ids, contacts), status=status.HTTP_200_OK)
+
+        # Handle: exact tin_number lookup
+        try:
+            contact = Contact.objects.get(tin_number=tin_number)
+            # 🔽 Return full data
+            return Response(self.contact_data(contact), status=status.HTTP_200_OK)
+        except Contact.DoesNotExist:
+            return self.not_found()
+
+    def parse(self, params):
+        """(tin_number, tin_prefix, limit) from the query string, or a 400 Response."""
+        tin_number = params.get('tin_number', '').strip()
+        tin_prefix = params.get('tin_prefix', '').strip()
 
         if not tin_number and not tin_prefix:
             return Response(
@@ -23,52 +55,87 @@ class ContactLookupView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Handle: tin_prefix search (e.g., user typing)
         if tin_prefix:
-            if not tin_prefix.isdigit():
+            if not (tin_prefix.isascii() and tin_prefix.isdigit()) or len(tin_prefix) > TIN_LENGTH:
                 return Response(
-                    {"error": "tin_prefix must contain only digits."},
+                    {"error": "tin_prefix must contain only digits (at most 10)."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-
-            # 🔽 Get full contact data (name, tin, address)
-            contacts = Contact.objects.filter(tin_number__startswith=tin_prefix)
-
-            if not contacts.exists():
+            try:
+                limit = int(params.get('limit', self.DEFAULT_LIMIT))
+            except ValueError:
+                limit = 0
+            if not 1 <= limit <= self.MAX_LIMIT:
                 return Response(
-                    {"error": "No contacts found with matching TIN prefix."},
-                    status=status.HTTP_404_NOT_FOUND
+                    {"error": f"limit must be between 1 and {self.MAX_LIMIT}."},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
+            return None, tin_prefix, limit
 
-            # Serialize full data
-            results = [
-                {
-                    "name": c.name,
-                    "tin_number": c.tin_number,
-                    "address": c.address
-                }
-                for c in contacts
-            ]
-            return Response(results, status=status.HTTP_200_OK)
+        if not (tin_number.isascii() and tin_number.isdigit()) or len(tin_number) != 10:
+            return Response(
+                {"error": "TIN must be exactly 10 digits."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return tin_number, None, None
 
-        # Handle: exact tin_number lookup
-        if tin_number:
-            if not tin_number.isdigit() or len(tin_number) != 10:
-                return Response(
-                    {"error": "TIN must be exactly 10 digits."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+    @staticmethod
+    def contact_data(contact):
+        return {
+            "name": contact.name,
+            "tin_number": contact.tin_number,
+            "address": contact.address
+        }
 
-            try:
-                contact = Contact.objects.get(tin_number=tin_number)
-                # 🔽 Return full data
-                return Response({
-                    "name": contact.name,
-                    "tin_number": contact.tin_number,
-                    "address": contact.address
-                }, status=status.HTTP_200_OK)
-            except Contact.DoesNotExist:
-                return Response(
-                    {"error": "Contact not found."},
-                    status=status.HTTP_404_NOT_FOUND
-                )
\ No newline at end of file
+    def prefix_results(self, contact_ids, contacts):
+        return [
+            self.contact_data(contacts[contact_id])
+            for contact_id in contact_ids
+            if contact_id in contacts  # Deleted since the index was synced
+        ]
+
+    @staticmethod
+    def no_prefix_match():
+        return Response(
+            {"error": "No contacts found with matching TIN prefix."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    @staticmethod
+    def not_found():
+        return Response(
+            {"error": "Contact not found."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+class ContactNameSearchView(APIView):
+    """
+    Fuzzy contact search by name (Latin or Amharic script), for when the TIN
+    isn't known. Tolerates typos, spacing/punctuation and Amharic homophone
+    spellings.
+    Usage: GET /api/contacts/search/?name=abebe&limit=10
+    Returns: [{"id", "name", "tin_number", "address", "score"}, ...] best first
+    """
+    permission_classes = []
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 50
+
+    def get(self, request):
+        name = request.query_params.get('name', '').strip()
+        if len(normalize_contact_name(name)) < 2:
+            return Response(
+                {"error": "name must contain at least 2 letters or digits."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = int(request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = 0
+        if not 1 <= limit <= self.MAX_LIMIT:
+            return Response(
+                {"error": f"limit must be between 1 and {self.MAX_LIMIT}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = search_contacts_by_name(name, limit)
+        return Response(results, status=status.HTTP_200_OK)
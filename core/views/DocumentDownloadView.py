@@ -0,0 +1,67 @@
+# core/views/DocumentDownloadView.py
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from core.models.Documents import ReceiptDocument
+from core.services.document_files import DOCUMENT_FILES, DocumentFileServer
+
+
+class DocumentFileDownloadView(APIView):
+    """
+    Stream one file of a ReceiptDocument (main receipt, withholding receipt
+    or their attachments) to the company it belongs to.
+    Supports Range requests, ETag / If-None-Match and long-lived caching.
+    """
+
+    @swagger_auto_schema(
+        operation_summary="Download a receipt document file",
+        operation_description="""
+            kind: main | main-attachment | withholding | withholding-attachment.
+            Honours Range (206/416), If-None-Match (304) and If-Range.
+            Add ?download=1 for Content-Disposition: attachment.
+        """,
+        manual_parameters=[
+            openapi.Parameter("v", openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Content version (ETag) from the document list; enables immutable caching"),
+            openapi.Parameter("download", openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Send as an attachment instead of inline"),
+        ],
+        responses={
+            200: "File content",
+            206: "Partial content",
+            304: "Not modified",
+            401: "Unauthorized - company TIN not found",
+            404: "Document or file not found",
+            416: "Range not satisfiable",
+        },
+    )
+    def get(self, request, id, kind):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        if kind not in DOCUMENT_FILES:
+            return Response(
+                {"error": f"Unknown file kind. Use one of: {', '.join(DOCUMENT_FILES)}."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        document = (
+            ReceiptDocument.objects.select_related("main_receipt", "withholding_receipt")
+            .filter(id=id, for_company__tin_number=company_tin)
+            .first()
+        )
+        resolved = DocumentFileServer.resolve(document, kind) if document else None
+        response = DocumentFileServer.serve(request, *resolved) if resolved else None
+        if response is None:
+            return Response(
+                {"error": "Document file not found."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return response
@@ -11,6 +11,7 @@ from core.models.contact import Contact
 from core.models.Documents import ReceiptDocument
 from core.models.DraftReceipt import DraftReceipt
 from core.serializers.DraftDataSerializer import DraftDataSerializer
+from core.services import metrics
 
 
 class DraftsView(APIView):
@@ -148,6 +149,7 @@ class DraftsView(APIView):
             draft.data = clean_data
             draft.receipt_number = receipt_number
             draft.save()
+            metrics.DRAFT_AUTOSAVES.inc()
 
             return Response({"message": "Draft saved"}, status=200)
 
@@ -0,0 +1,231 @@
+# core/views/ExportView.py
+from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+
+from drf_yasg.utils import swagger_auto_schema
+from drf_yasg import openapi
+
+from core.models.ExportJob import ExportJob
+from core.services import receipt_export
+from core.services.document_files import DocumentFileServer
+from core.services.export_jobs import CONTENT_TYPES, ExportQueue
+from core.services.receipt_filters import RECEIPT_FILTER_PARAMS
+
+RECENT_JOBS = 20
+
+
+def serialize_export_job(request, job):
+    data = {
+        "id": job.id,
+        "format": job.format,
+        "mode": job.mode,
+        "filters": job.filters,
+        "status": job.status,
+        "progress": job.progress,
+        "rows_done": job.rows_done,
+        "rows_total": job.rows_total,
+        "error": job.error or None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "url": request.build_absolute_uri(reverse("export-detail", kwargs={"id": job.id})),
+        "download_url": None,
+    }
+    if job.status == ExportJob.SUCCEEDED and job.file:
+        data["download_url"] = request.build_absolute_uri(
+            reverse("export-download", kwargs={"id": job.id})
+        )
+    return data
+
+
+class ExportJobListCreateView(APIView):
+    """
+    POST: queue a receipt export (CSV / XLSX / PDF) built from the
+    ReceiptSearchView filters; returns 202 with the job to poll.
+    GET: the company's most recent export jobs.
+    """
+
+    permission_classes = [AllowAny]  # Handled by middleware
+
+    @swagger_auto_schema(
+        operation_summary="Queue a receipt export",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=["format"],
+            properties={
+                "format": openapi.Schema(type=openapi.TYPE_STRING, enum=list(receipt_export.EXPORT_FORMATS)),
+                "mode": openapi.Schema(type=openapi.TYPE_STRING, enum=list(receipt_export.EXPORT_MODES),
+                                       description="receipts (default) or lines"),
+                "filters": openapi.Schema(type=openapi.TYPE_OBJECT,
+                                          description=f"Any of: {', '.join(RECEIPT_FILTER_PARAMS)}"),
+            },
+        ),
+        responses={202: "Job queued", 400: "Invalid format, mode or filters, or a PDF over the row limit", 401: "Unauthorized"},
+    )
+    def post(self, request):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+
+        export_format = request.data.get("format")
+        mode = request.data.get("mode") or "receipts"
+        filters = request.data.get("filters") or {}
+        if export_format not in receipt_export.EXPORT_FORMATS:
+            return Response(
+                {"error": f"format must be one of: {', '.join(receipt_export.EXPORT_FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if mode not in receipt_export.EXPORT_MODES:
+            return Response(
+                {"error": f"mode must be one of: {', '.join(receipt_export.EXPORT_MODES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not isinstance(filters, dict):
+            return Response({"error": "filters must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+        unknown = set(filters) - set(RECEIPT_FILTER_PARAMS)
+        if unknown:
+            return Response(
+                {"error": f"Unknown filters: {', '.join(sorted(unknown))}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if export_format == "pdf" and mode != "receipts":
+            return Response(
+                {"error": "PDF exports are available in receipts mode only."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if (export_format == "xlsx" and receipt_export.openpyxl is None) or (
+            export_format == "pdf" and receipt_export.HTML is None
+        ):
+            return Response(
+                {"error": f"{export_format.upper()} exports are not available on this server."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if export_format == "pdf":
+            # Checked here so the client learns it now, not from a cut-short report
+            count = receipt_export.ReceiptExport(
+                company_tin, {key: str(value) for key, value in filters.items()}, mode
+            ).count()
+            if count > receipt_export.PDF_MAX_ROWS:
+                return Response(
+                    {"error": f"PDF exports are limited to {receipt_export.PDF_MAX_ROWS} receipts "
+                              f"(these filters match {count}). Narrow the filters or export CSV/XLSX."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        job = ExportQueue.enqueue(company_tin, export_format, mode, filters)
+        return Response(serialize_export_job(request, job), status=status.HTTP_202_ACCEPTED)
+
+    def get(self, request):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        jobs = ExportJob.objects.filter(company_tin=company_tin)[:RECENT_JOBS]
+        return Response({"data": [serialize_export_job(request, job) for job in jobs]})
+
+
+class ExportJobDetailView(APIView):
+    """Status and progress of one export job."""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, id):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        job = ExportJob.objects.filter(id=id, company_tin=company_tin).first()
+        if job is None:
+            return Response({"error": "Export not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(serialize_export_job(request, job))
+
+
+class ExportJobDownloadView(APIView):
+    """The finished export file (Range / ETag aware, like document downloads)."""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request, id):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        job = ExportJob.objects.filter(id=id, company_tin=company_tin).first()
+        if job is None:
+            return Response({"error": "Export not found."}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != ExportJob.SUCCEEDED or not job.file:
+            return Response(
+                {"error": f"Export is {job.status}; nothing to download yet."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        filename = f"receipts_{job.mode}_{job.created_at:%Y%m%d}_{job.id}.{job.format}"
+        response = DocumentFileServer.serve(
+            request, job.file, filename, CONTENT_TYPES[job.format], as_attachment=True
+        )
+        if response is None:
+            return Response({"error": "Export file is no longer available."}, status=status.HTTP_410_GONE)
+        return response
+
+
+class ReceiptCSVExportView(APIView):
+    """
+    GET /api/receipts/export.csv?mode=receipts|lines&<ReceiptSearchView filters>
+
+    Streams the company's receipts (or their lines) as CSV while reading
+    them: server-side cursor, constant memory, header sent immediately.
+    Use POST /api/exports for XLSX / PDF or to download later.
+    """
+
+    permission_classes = [AllowAny]
+    use_read_replica = True
+
+    @swagger_auto_schema(
+        operation_summary="Stream receipts as CSV",
+        manual_parameters=[
+            openapi.Parameter("mode", openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=list(receipt_export.EXPORT_MODES),
+                              description="receipts (one row per receipt, default) or lines"),
+        ] + [
+            openapi.Parameter(name, openapi.IN_QUERY, type=openapi.TYPE_STRING)
+            for name in RECEIPT_FILTER_PARAMS
+        ],
+        responses={200: "CSV stream", 400: "Invalid mode", 401: "Unauthorized"},
+    )
+    def get(self, request):
+        company_tin = getattr(request, "company_tin", None)
+        if not company_tin:
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        mode = request.query_params.get("mode") or "receipts"
+        if mode not in receipt_export.EXPORT_MODES:
+            return Response(
+                {"error": f"mode must be one of: {', '.join(receipt_export.EXPORT_MODES)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        export = receipt_export.ReceiptExport(company_tin, request.query_params, mode)
+        response = StreamingHttpResponse(
+            receipt_export.iter_csv(export), content_type="text/csv; charset=utf-8"
+        )
+        filename = f"receipts_{mode}_{timezone.localdate():%Y%m%d}.csv"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "no-store"
+        response["X-Accel-Buffering"] = "no"  # Let nginx pass chunks through as they come
+        return response
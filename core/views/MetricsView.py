@@ -0,0 +1,19 @@
+# core/views/MetricsView.py
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from core.services import metrics
+
+
+@require_GET
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint (GET /metrics, no JWT). A plain Django view:
+    no DRF negotiation or rendering on every scrape.
+    """
+    if metrics.prometheus_client is None:
+        return HttpResponse("prometheus_client is not installed.\n", status=503, content_type="text/plain")
+    body, content_type = metrics.render()
+    response = HttpResponse(body, content_type=content_type)
+    response["Cache-Control"] = "no-store"
+    return response
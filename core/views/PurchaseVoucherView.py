@@ -1,12 +1,13 @@
 from rest_framework.generics import CreateAPIView
 from core.models.PurchaseVoucher import PurchaseVoucher
 from core.serializers.PurchaseVoucherSerializer import PurchaseVoucherSerializer
+from core.services.idempotency import IdempotencyKeyMixin
 
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
-class CreatePurchaseVoucherView(CreateAPIView):
+class CreatePurchaseVoucherView(IdempotencyKeyMixin, CreateAPIView):
     queryset = PurchaseVoucher.objects.all()
     serializer_class = PurchaseVoucherSerializer
 
@@ -14,8 +15,9 @@ class CreatePurchaseVoucherView(CreateAPIView):
         operation_summary="Create Purchase Voucher with File Uploads",
         operation_description="""
             Upload a new purchase voucher with optional document and attachment.
-            Files are stored as binary data in the database.
+            Files are stored in media storage and returned as `document_url` / `attachment_url`.
             Use `multipart/form-data` for file uploads.
+            Send an `Idempotency-Key` header to make retries safe.
         """,
         request_body=PurchaseVoucherSerializer,  # File fields will now be recognized
         consumes=["multipart/form-data"],
@@ -5,8 +5,10 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from core.models.Receipt import Receipt, ThirtyPercentWithholdingReceipt
 from core.models.Documents import ReceiptDocument  # ← Add this
+from core.services.receipt_archive import ReceiptArchive
 from core.serializers.ReceiptDisplaySerializer import (
     ReceiptDisplaySerializer,
+    ReceiptListSerializer,
     ThirtyPercentWithholdingReceiptSerializer,
 )
 from core.serializers.DocumentSerializer import (
@@ -23,17 +25,20 @@ from rest_framework import status
 # views.py
 from rest_framework import generics
 from django.db.models import Q
+from django.http import Http404
 
 
 class ReceiptListView(generics.ListAPIView):
     """
     GET /api/receipts/
-    List all receipts where:
-      - The user's company is either the issuer OR receiver
+    List all receipts recorded by the user's company.
     Ordered by date (newest first).
+    Query count per page is constant (see ReceiptQuerySet.for_fields).
+    Sparse fieldsets: ?fields=receipt_number,receipt_date,total&expand=items
     """
 
-    serializer_class = ReceiptDisplaySerializer
+    serializer_class = ReceiptListSerializer
+    use_read_replica = True
     # permission_classes = [IsAuthenticated]  # Optional: if you have DRF auth too
 
     def get_queryset(self):
@@ -41,42 +46,51 @@ class ReceiptListView(generics.ListAPIView):
         if not user_info:
             return Receipt.objects.none()
 
-        user_tin = user_info["tin"]
-        company_name = user_info["company_name"]
-        print(f"📄 {company_name} is fetching receipts...")
-
-        queryset = (
-            Receipt.objects.select_related("issued_by", "issued_to")
-            .prefetch_related(
-                "items__item",  # ← Critical: pre-load all item data
-            )
-            .filter(
-                Q(issued_by__tin_number=user_tin) | Q(issued_to__tin_number=user_tin)
-            )
-            .order_by("-receipt_date")
+        # recorded_by scoping → served by the (recorded_by, receipt_date) index
+        fields = self.get_serializer_class().requested_fields(self.request)
+        return (
+            Receipt.objects.for_fields(fields)
+            .filter(recorded_by__tin_number=user_info["tin"])
+            .order_by("-receipt_date", "-id")
         )
 
-        print(f"✅ Found {queryset.count()} receipts for {company_name}")
-        return queryset
-
 
 class ReceiptDetailView(generics.RetrieveAPIView):
     """
     GET /api/receipts/{id}/
     Retrieve a single receipt with all details.
+    Accepts the same ?fields= / ?exclude= / ?expand= params as the list.
+    Receipts of archived fiscal years are read from the archive ("archived": true).
     """
 
-    queryset = Receipt.objects.select_related("issued_by", "issued_to")
-    serializer_class = ReceiptDisplaySerializer
+    serializer_class = ReceiptListSerializer
     lookup_field = "id"
 
+    def get_queryset(self):
+        fields = self.get_serializer_class().requested_fields(self.request)
+        return Receipt.objects.for_fields(fields)
+
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        try:
+            instance = self.get_object()
+        except Http404:
+            return self.retrieve_archived(request)
         serializer = self.get_serializer(instance)
         return Response(
             {"success": True, "data": serializer.data}, status=status.HTTP_200_OK
         )
 
+    def retrieve_archived(self, request):
+        """Receipts of archived fiscal years: their data as of archiving (see ReceiptArchive)."""
+        fields = self.get_serializer_class().requested_fields(request)
+        data = ReceiptArchive.display(self.kwargs[self.lookup_field])
+        if data is None:
+            raise Http404
+        return Response(
+            {"success": True, "archived": True, "data": {name: data[name] for name in fields if name in data}},
+            status=status.HTTP_200_OK,
+        )
+
 
 class ThirtyPercentWithholdingReceiptListCreateView(ListCreateAPIView):
     queryset = ThirtyPercentWithholdingReceipt.objects.all()
@@ -3,6 +3,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 
 from core.models.Documents import MainReceiptDocument, ReceiptDocument, WithholdingReceiptDocument
+from core.services.document_files import DocumentFileServer
 from core.serializers.DocumentSerializer import (
     DocumentListItemSerializer,
     UploadReceiptSerializer,
@@ -88,8 +89,9 @@ from rest_framework.permissions import AllowAny
 
 from core.models.contact import Contact
 from core.serializers.DocumentSerializer import UploadReceiptSerializer
+from core.services.idempotency import IdempotencyKeyMixin
 
-class UploadReceiptDocumentView(CreateAPIView):
+class UploadReceiptDocumentView(IdempotencyKeyMixin, CreateAPIView):
     """
     Upload a receipt document with zero input required beyond file.
 
@@ -97,6 +99,8 @@ class UploadReceiptDocumentView(CreateAPIView):
     - Allows same receipt_number + date for corrections
     - Warns if duplicate detected
     - Blocks only if exact file re-uploaded
+    - Idempotency-Key header: a retried upload gets the first response back
+      without the file being read or hashed again
     """
     queryset = ReceiptDocument.objects.all()
     serializer_class = UploadReceiptSerializer
@@ -127,7 +131,7 @@ class UploadReceiptDocumentView(CreateAPIView):
 
         serializer = self.get_serializer(
             data=request.data,
-            context={'request': request, 'for_company': for_company}
+            context={'request': request, 'for_company': for_company, **self.get_upload_context()}
         )
         serializer.is_valid(raise_exception=False)  # ⚠️ Don't raise on warning
 
@@ -161,6 +165,12 @@ class UploadReceiptDocumentView(CreateAPIView):
                 {"error": f"Upload failed: {str(e)}"},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+    def get_upload_context(self):
+        """Extra serializer context (the chunked-upload commit passes its assembled files)."""
+        return {}
+
+
 class ReceiptDocumentListView(ListAPIView):
     """
     View to list all uploaded receipt documents.
@@ -222,22 +232,26 @@ class DocumentListItemSerializer(serializers.Serializer):
     main_file_url = serializers.URLField(allow_null=True)
     main_filename = serializers.CharField(allow_null=True)
     main_content_type = serializers.CharField(allow_null=True)
+    main_download_url = serializers.URLField(allow_null=True)
 
     # Main attachment
     main_attachment_url = serializers.URLField(allow_null=True)
     main_attachment_filename = serializers.CharField(allow_null=True)
     main_attachment_content_type = serializers.CharField(allow_null=True)
+    main_attachment_download_url = serializers.URLField(allow_null=True)
     has_main_attachment = serializers.BooleanField()
 
     # Withholding receipt
     withholding_file_url = serializers.URLField(allow_null=True)
     withholding_filename = serializers.CharField(allow_null=True)
     withholding_content_type = serializers.CharField(allow_null=True)
+    withholding_download_url = serializers.URLField(allow_null=True)
 
     # Withholding attachment
     withholding_attachment_url = serializers.URLField(allow_null=True)
     withholding_attachment_filename = serializers.CharField(allow_null=True)
     withholding_attachment_content_type = serializers.CharField(allow_null=True)
+    withholding_attachment_download_url = serializers.URLField(allow_null=True)
     has_withholding_attachment = serializers.BooleanField()
 
 class StandardResultsSetPagination(pagination.PageNumberPagination):
@@ -292,6 +306,7 @@ class DocumentListView(generics.GenericAPIView):
     """
     serializer_class = DocumentListItemSerializer
     pagination_class = DocumentPagination
+    use_read_replica = True
 
     def get(self, request, *args, **kwargs):
         company_tin = getattr(request, 'company_tin', None)
@@ -311,7 +326,41 @@ class DocumentListView(generics.GenericAPIView):
                 address="Address not provided"
             )
 
-        # Get filters
+        receipt_docs = self.filter_documents(request, company)
+        if isinstance(receipt_docs, Response):
+            return receipt_docs  # Invalid date filter
+
+        # Convert to list of dicts (for serialization)
+        documents = [self.document_row(doc, company) for doc in receipt_docs]
+
+        # Sort by uploaded_at (newest first)
+        documents.sort(key=lambda x: x['uploaded_at'], reverse=True)
+
+        # Paginate
+        page = self.paginate_queryset(documents)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+
+        # Add summary
+        response.data['summary'] = {
+            'total_transactions': len(documents),
+            'with_main_receipt': len([d for d in documents if d['main_file_url']]),
+            'with_withholding_receipt': len([d for d in documents if d['withholding_file_url']]),
+            'statuses': {
+                'uploaded': len([d for d in documents if d['status'] == 'uploaded']),
+                'processed': len([d for d in documents if d['status'] == 'processed']),
+                'rejected': len([d for d in documents if d['status'] == 'rejected'])
+            },
+            'has_attachments': {
+                'main': len([d for d in documents if d['has_main_attachment']]),
+                'withholding': len([d for d in documents if d['has_withholding_attachment']])
+            }
+        }
+
+        return response
+
+    def filter_documents(self, request, company):
+        """The company's documents matching ?status= / ?search= / dates, or a 400 Response."""
         status_filter = request.query_params.get('status', None)
         search = request.query_params.get('search', None)
 
@@ -362,71 +411,59 @@ class DocumentListView(generics.GenericAPIView):
                 Q(notes__icontains=search)
             )
 
-        # Convert to list of dicts (for serialization)
-        documents = []
-        for doc in receipt_docs:
-            # Get main receipt data
-            main = doc.main_receipt
-            withholding = doc.withholding_receipt
-
-            item = {
-                "id": doc.id,
-                "receipt_number": main.receipt_number if main else None,
-                "withholding_receipt_number": withholding.withholding_receipt_number if withholding else None,
-                "company_tin": company.tin_number,
-                "uploaded_at": doc.uploaded_at,
-                "status": doc.status,
-
-                # Main receipt
-                "main_file_url": self.get_file_url(main.main_receipt if main else None),
-                "main_filename": main.main_receipt_filename if main else None,
-                "main_content_type": main.main_receipt_content_type if main else None,
-
-                # Main attachment
-                "main_attachment_url": self.get_file_url(main.attachment if main else None),
-                "main_attachment_filename": main.attachment_filename if main else None,
-                "main_attachment_content_type": main.attachment_content_type if main else None,
-                "has_main_attachment": bool(main.attachment) if main else False,
-
-                # Withholding receipt
-                "withholding_file_url": self.get_file_url(withholding.withholding_receipt if withholding else None),
-                "withholding_filename": withholding.withholding_receipt_filename if withholding else None,
-                "withholding_content_type": withholding.withholding_receipt_content_type if withholding else None,
-
-                # Withholding attachment
-                "withholding_attachment_url": self.get_file_url(withholding.withholding_attachment if withholding else None),
-                "withholding_attachment_filename": withholding.withholding_attachment_filename if withholding else None,
-                "withholding_attachment_content_type": withholding.withholding_attachment_content_type if withholding else None,
-                "has_withholding_attachment": bool(withholding.withholding_attachment) if withholding else False,
-            }
-            documents.append(item)
-
-        # Sort by uploaded_at (newest first)
-        documents.sort(key=lambda x: x['uploaded_at'], reverse=True)
-
-        # Paginate
-        page = self.paginate_queryset(documents)
-        serializer = self.get_serializer(page, many=True)
-        response = self.get_paginated_response(serializer.data)
-
-        # Add summary
-        response.data['summary'] = {
-            'total_transactions': len(documents),
-            'with_main_receipt': len([d for d in documents if d['main_file_url']]),
-            'with_withholding_receipt': len([d for d in documents if d['withholding_file_url']]),
-            'statuses': {
-                'uploaded': len([d for d in documents if d['status'] == 'uploaded']),
-                'processed': len([d for d in documents if d['status'] == 'processed']),
-                'rejected': len([d for d in documents if d['status'] == 'rejected'])
-            },
-            'has_attachments': {
-                'main': len([d for d in documents if d['has_main_attachment']]),
-                'withholding': len([d for d in documents if d['has_withholding_attachment']])
-            }
+        return receipt_docs
+
+    def document_row(self, doc, company):
+        """One DocumentListItemSerializer row (needs main_receipt / withholding_receipt selected)."""
+        # Get main receipt data
+        main = doc.main_receipt
+        withholding = doc.withholding_receipt
+
+        return {
+            "id": doc.id,
+            "receipt_number": main.receipt_number if main else None,
+            "withholding_receipt_number": withholding.withholding_receipt_number if withholding else None,
+            "company_tin": company.tin_number,
+            "uploaded_at": doc.uploaded_at,
+            "status": doc.status,
+
+            # Main receipt
+            "main_file_url": self.get_file_url(main.main_receipt if main else None),
+            "main_filename": main.main_receipt_filename if main else None,
+            "main_content_type": main.main_receipt_content_type if main else None,
+            # Range/ETag-aware download, versioned by the content hash
+            "main_download_url": self.get_download_url(
+                doc, "main", main.main_receipt if main else None,
+                main.main_receipt_hash if main else None,
+            ),
+
+            # Main attachment
+            "main_attachment_url": self.get_file_url(main.attachment if main else None),
+            "main_attachment_filename": main.attachment_filename if main else None,
+            "main_attachment_content_type": main.attachment_content_type if main else None,
+            "main_attachment_download_url": self.get_download_url(
+                doc, "main-attachment", main.attachment if main else None
+            ),
+            "has_main_attachment": bool(main.attachment) if main else False,
+
+            # Withholding receipt
+            "withholding_file_url": self.get_file_url(withholding.withholding_receipt if withholding else None),
+            "withholding_filename": withholding.withholding_receipt_filename if withholding else None,
+            "withholding_content_type": withholding.withholding_receipt_content_type if withholding else None,
+            "withholding_download_url": self.get_download_url(
+                doc, "withholding", withholding.withholding_receipt if withholding else None
+            ),
+
+            # Withholding attachment
+            "withholding_attachment_url": self.get_file_url(withholding.withholding_attachment if withholding else None),
+            "withholding_attachment_filename": withholding.withholding_attachment_filename if withholding else None,
+            "withholding_attachment_content_type": withholding.withholding_attachment_content_type if withholding else None,
+            "withholding_attachment_download_url": self.get_download_url(
+                doc, "withholding-attachment", withholding.withholding_attachment if withholding else None
+            ),
+            "has_withholding_attachment": bool(withholding.withholding_attachment) if withholding else False,
         }
 
-        return response
-
     def get_file_url(self, file_field):
         """Safely get file URL"""
         if file_field and hasattr(file_field, 'url'):
@@ -434,4 +471,10 @@ class DocumentListView(generics.GenericAPIView):
                 return file_field.url
             except ValueError:
                 return None
-        return None
\ No newline at end of file
+        return None
+
+    def get_download_url(self, doc, kind, file_field, version=None):
+        """URL of DocumentFileDownloadView for this file, or None if there is no file"""
+        if not file_field:
+            return None
+        return DocumentFileServer.download_url(self.request, doc.id, kind, version)
\ No newline at end of file
@@ -8,11 +8,13 @@ from core.models.contact import Contact
 from core.serializers.DocumentSerializer import UploadReceiptSerializer
 from core.serializers.ReceiptSerializer import ReceiptSerializer
 from core.services.ReceiptService import ReceiptService
+from core.services.idempotency import IdempotencyKeyMixin
 from rest_framework import generics
 from rest_framework.parsers import MultiPartParser, FormParser
 
 
-class CreateReceiptView(CreateAPIView):
+class CreateReceiptView(IdempotencyKeyMixin, CreateAPIView):
+    """Create a receipt. Send an `Idempotency-Key` header to make retries safe."""
     serializer_class = ReceiptSerializer
     permission_classes = [AllowAny]  # Handled by middleware
 
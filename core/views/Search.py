@@ -1,10 +1,12 @@
 # views.py
-from rest_framework.views import APIView
+from rest_framework.generics import GenericAPIView
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Q
+from django.db.models import Min, OuterRef, Q, Subquery, Sum
 
 from core.serializers.ReceiptLineSearchSerializer import ReceiptLineSearchSerializer
+from core.managers.receipt_managers import MONEY_FIELD
 from core.models.Receipt import ReceiptLine
 
 # 🔽 Import for Swagger
@@ -12,56 +14,118 @@ from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
 
 
-class SearchView(APIView):
+class DeclarationLinePagination(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "count": self.page.paginator.count,
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "data": data,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class SearchView(GenericAPIView):
     """
-    Retrieve all receipt lines that have a non-empty declaration number.
+    Retrieve the company's receipt lines that have a non-empty declaration number,
+    one line per item and declaration number.
     """
 
+    serializer_class = ReceiptLineSearchSerializer
+    pagination_class = DeclarationLinePagination
+    use_read_replica = True
+
+    def get_queryset(self):
+        company_tin = getattr(self.request, "company_tin", None)
+
+        # Tax of the line's whole receipt (claimable / non-claimable VAT),
+        # computed in SQL instead of one query per row
+        receipt_tax = (
+            ReceiptLine.objects.filter(receipt=OuterRef("receipt"))
+            .values("receipt")
+            .annotate(value=Sum("tax_amount"))
+            .values("value")
+        )
+
+        # Same predicate as the partial index on ReceiptLine.declaration_number
+        lines = ReceiptLine.objects.filter(
+            ~Q(declaration_number__isnull=True),
+            ~Q(declaration_number__exact=""),
+            receipt__recorded_by__tin_number=company_tin,
+        )
+        prefix = self.request.query_params.get("declaration_number", "").strip()
+        if prefix:
+            lines = lines.filter(declaration_number__startswith=prefix)
+
+        # One line per (item, declaration number): its first recorded line.
+        # Merged catalog items (merge_temp_items) keep every declaration.
+        # GROUP BY rather than DISTINCT ON, so SQLite runs it too.
+        first_lines = lines.values("item_id", "declaration_number").annotate(first=Min("id")).values("first")
+        return (
+            ReceiptLine.objects.filter(id__in=first_lines)
+            .select_related("item", "receipt", "receipt__issued_to")
+            .only(
+                "quantity",
+                "unit_cost",
+                "tax_amount",
+                "discount_amount",
+                "item_description",
+                "declaration_number",
+                "item__item_code",
+                "receipt__receipt_number",
+                "receipt__receipt_date",
+                "receipt__issued_to__name",
+            )
+            .annotate(receipt_tax=Subquery(receipt_tax, output_field=MONEY_FIELD))
+            .order_by("item_id", "declaration_number", "id")
+        )
+
     @swagger_auto_schema(
         operation_summary="Get All Receipt Lines with Declaration Numbers",
         operation_description="""
-            Retrieve all receipt line items where the associated item's 
-            declaration number is set (not null or empty).
+            Retrieve the company's receipt line items whose declaration number
+            is set (not null or empty), one line per item and declaration number.
+            Filter with ?declaration_number=<prefix>; paginated with ?page= / ?page_size=.
         """,
+        manual_parameters=[
+            openapi.Parameter(
+                "declaration_number",
+                openapi.IN_QUERY,
+                description="Only items whose declaration number starts with this value",
+                type=openapi.TYPE_STRING,
+            ),
+        ],
         responses={
             200: openapi.Response(
-                description="List of receipt lines with declaration numbers (deduplicated by item)",
+                description="List of receipt lines with declaration numbers (deduplicated by item and declaration number)",
                 schema=ReceiptLineSearchSerializer(many=True),
             ),
+            401: "Unauthorized - company TIN not found",
             404: "Not Found - No items have declaration numbers",
         },
     )
     def get(self, request):
         """
-        Handle GET request to fetch all receipt lines that have declaration numbers.
+        Handle GET request to fetch the receipt lines that have declaration numbers.
         """
-        # Query: filter lines where item.declaration_number is not null and not empty
-        lines = ReceiptLine.objects.filter(
-            ~Q(item__declaration_number__isnull=True),
-            ~Q(item__declaration_number__exact=""),
-        ).select_related("item", "receipt", "receipt__issued_to")
+        if not getattr(request, "company_tin", None):
+            return Response(
+                {"error": "Authentication failed: company TIN not found."},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
 
-        if not lines.exists():
+        page = self.paginate_queryset(self.get_queryset())
+        if not page:
             return Response(
                 {"message": "No items found with declaration numbers."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Deduplicate by item.id
-        seen = set()
-        unique_lines = []
-        for line in lines:
-            if line.item.id not in seen:
-                unique_lines.append(line)
-                seen.add(line.item.id)
-
-        # Serialize the data
-        serializer = ReceiptLineSearchSerializer(unique_lines, many=True)
-
-        return Response(
-            {"count": len(serializer.data), "data": serializer.data},
-            status=status.HTTP_200_OK,
-        )
-
-
-
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
@@ -2,6 +2,8 @@
 
 from rest_framework import generics
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from core.models.look_up_tables import (
     ReceiptName,
     ReceiptKind,
@@ -66,3 +68,27 @@ class ReceiptTypeCreateView(generics.CreateAPIView):
     queryset = ReceiptType.objects.all()
     serializer_class = ReceiptTypeSerializer
     permission_classes = [AllowAny]
+
+
+# ----------- All four, for form setup ----------
+class LookupTablesView(APIView):
+    """
+    GET /api/lookups
+    Every receipt kind, name, category and type in one response (unpaginated).
+    """
+    permission_classes = [AllowAny]
+
+    TABLES = {
+        "receipt_kinds": (ReceiptKind, ReceiptKindSerializer),
+        "receipt_names": (ReceiptName, ReceiptNameSerializer),
+        "receipt_categories": (ReceiptCatagory, ReceiptCategorySerializer),
+        "receipt_types": (ReceiptType, ReceiptTypeSerializer),
+    }
+
+    @classmethod
+    def table(cls, key):
+        model, serializer_class = cls.TABLES[key]
+        return serializer_class(model.objects.order_by("id"), many=True).data
+
+    def get(self, request):
+        return Response({key: self.table(key) for key in self.TABLES})
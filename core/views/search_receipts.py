@@ -1,6 +1,6 @@
+import time
 from decimal import Decimal
 from datetime import datetime
-from functools import reduce
 from django.db.models import (
     Count,
     Sum,
@@ -12,38 +12,116 @@ from django.db.models import (
     F,
     Q,
 )
+from django.db.models import Prefetch
 from django.http import HttpResponse
+from rest_framework.exceptions import ValidationError
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-import operator
 
-from core.models.Receipt import Receipt
+from core.models.ArchivedReceipt import ArchivedReceipt
+from core.models.Receipt import Receipt, ReceiptLine, is_date_expired
+from core.serializers.sparse_fields import resolve_sparse_fields
+from core.services import metrics
+from core.services.receipt_filters import filter_archived_receipts, filter_receipts
 
 
 class ReceiptSearchView(APIView):
     """
     API Endpoint: GET /api/receipts/search/
     Supports filtering, grouping, and searching across Receipt model.
+    Ungrouped results accept ?fields= / ?exclude= / ?expand=items, and
+    ?include_archived=true to also list matching receipts of archived fiscal
+    years under "archived" (without items).
     """
 
+    # Ungrouped row fields, in response order
+    SEARCH_FIELDS = [
+        "receipt_number",
+        "receipt_date",
+        "calendar_type",
+        "issued_by",
+        "issued_to",
+        "category",
+        "kind",
+        "name",
+        "type",
+        "subtotal",
+        "tax",
+        "total",
+        "claimable_vat",
+        "non_claimable_vat",
+        "is_vat_expired",
+        "reason",
+        "created_at",
+        "items",
+    ]
+    EXPANDABLE_FIELDS = ("items",)
+    use_read_replica = True
+
+    # What each row field needs from the database (default: same-name column)
+    FIELD_PLAN = {
+        "issued_by": {"columns": ["issued_by__name"], "related": ["issued_by"]},
+        "issued_to": {"columns": ["issued_to__name"], "related": ["issued_to"]},
+        "category": {"columns": ["receipt_category__name"], "related": ["receipt_category"]},
+        "kind": {"columns": ["receipt_kind__name"], "related": ["receipt_kind"]},
+        "name": {"columns": ["receipt_name__name"], "related": ["receipt_name"]},
+        "type": {"columns": ["receipt_type__name"], "related": ["receipt_type"]},
+        "subtotal": {},
+        "tax": {},
+        "total": {},
+        "claimable_vat": {"columns": ["receipt_date"]},
+        "non_claimable_vat": {"columns": ["receipt_date"]},
+        "is_vat_expired": {"columns": ["receipt_date"]},
+        "reason": {"columns": ["reason_of_receiving"]},
+        "items": {},
+    }
+
     def get(self, request, *args, **kwargs):
-        # Extract query parameters
-        query = request.query_params.get("query", "").strip()
+        started = time.perf_counter()
+        response = self.search(request)
+        group_by = request.query_params.get("group_by") or "none"
+        if response.status_code == status.HTTP_400_BAD_REQUEST:
+            group_by = "invalid"  # Keep label values bounded
+        metrics.SEARCH_SECONDS.labels(group_by).observe(time.perf_counter() - started)
+        return response
+
+    def search(self, request):
         group_by = request.query_params.get("group_by")
-        receipt_number = request.query_params.get("receipt_number")
-        category = request.query_params.get("category")
-        kind = request.query_params.get("kind")
-        name = request.query_params.get("name")
-        receipt_type = request.query_params.get("type")
-        issued_to = request.query_params.get("issued_to")
-        issued_by = request.query_params.get("issued_by")
-        calendar_type = request.query_params.get("calendar_type")
-        is_vat_expired = request.query_params.get("is_vat_expired")
-        from_date = request.query_params.get("from_date")
-        to_date = request.query_params.get("to_date")
-        tax_type = request.query_params.get("tax_type")  # New filter for tax_type
+        tax_type = request.query_params.get("tax_type")
+        receipts = self.filtered_receipts(request.query_params)
+
+        # === Handle Grouping ===
+        if group_by:
+            response_data = self.handle_grouping(receipts, group_by)
+            if isinstance(response_data, dict) and "error" in response_data:
+                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
+            return Response(response_data)
+
+        # === Default: Serialize Receipt List (sparse fieldsets) ===
+        try:
+            fields = resolve_sparse_fields(
+                request.query_params, self.SEARCH_FIELDS, self.EXPANDABLE_FIELDS
+            )
+        except ValidationError as e:
+            return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        receipts = self.project_receipts(receipts, fields, tax_type)
+        results = [self.serialize_receipt(r, fields) for r in receipts]
+
+        response_data = {
+            "grouped": False,
+            "count": len(results),
+            "data": results,
+        }
+        if request.query_params.get("include_archived") == "true":
+            response_data["archived"] = [
+                self.serialize_archived(stub, fields)
+                for stub in self.archived_receipts(request.query_params)
+            ]
+        return Response(response_data)
 
+    def filtered_receipts(self, params):
         # Start with all receipts
         receipts = Receipt.objects.select_related(
             "receipt_category",
@@ -54,131 +132,149 @@ class ReceiptSearchView(APIView):
             "issued_by",
         ).all()
 
-        # === Apply Filters ===
-        if receipt_number:
-            receipts = receipts.filter(receipt_number__iexact=receipt_number)
-
-        if category:
-            categories = [cat.strip() for cat in category.split(",") if cat.strip()]
-            if categories:
-                q_objects = reduce(
-                    operator.or_,
-                    (Q(receipt_category__name__iexact=cat) for cat in categories),
-                )
-                receipts = receipts.filter(q_objects)
-
-        if kind:
-            receipts = receipts.filter(receipt_kind__name__iexact=kind)
-
-        if name:
-            receipts = receipts.filter(receipt_name__name__iexact=name)
-
-        if receipt_type:
-            receipts = receipts.filter(receipt_type__name__iexact=receipt_type)
-
-        if issued_to:
-            receipts = receipts.filter(issued_to__name__icontains=issued_to)
+        # === Apply Filters (shared with the CSV / export job paths) ===
+        return filter_receipts(receipts, params)
 
-        if issued_by:
-            receipts = receipts.filter(issued_by__name__icontains=issued_by)
+    def project_receipts(self, receipts, fields, tax_type=None):
+        """
+        Translate the selected fields into ORM projection: only the columns,
+        joins, annotations and prefetches those fields need.
+        """
+        columns, related = {"id"}, set()
+        for name in fields:
+            plan = self.FIELD_PLAN.get(name, {"columns": [name]})
+            columns.update(plan.get("columns", []))
+            related.update(plan.get("related", []))
 
-        if calendar_type:
-            receipts = receipts.filter(calendar_type=calendar_type)
+        if related:
+            receipts = receipts.select_related(None).select_related(*sorted(related))
+        else:
+            receipts = receipts.select_related(None)
+        receipts = receipts.only(*sorted(columns))
 
-        if from_date:
-            receipts = receipts.filter(receipt_date__gte=from_date)
+        # subtotal/tax/total only count lines of the requested tax_type
+        if {"subtotal", "tax", "total"} & set(fields):
+            receipts = receipts.with_totals(tax_type=tax_type, prefix="line")
+        # claimable / non-claimable VAT are based on the whole receipt
+        if {"claimable_vat", "non_claimable_vat"} & set(fields):
+            receipts = receipts.with_totals()
 
-        if to_date:
-            receipts = receipts.filter(receipt_date__lte=to_date)
-
-        if is_vat_expired == "true":
-            receipts = receipts.filter(expired_vat__gt=Decimal("0.00"))
-        elif is_vat_expired == "false":
-            receipts = receipts.filter(expired_vat=Decimal("0.00"))
-
-        # Filter by tax_type on related items if requested
-        if tax_type:
-            receipts = receipts.filter(items__tax_type__iexact=tax_type).distinct()
-
-        # Global search (unless receipt_number was used specifically)
-        if query and not receipt_number:
-            receipts = receipts.filter(
-                Q(receipt_number__icontains=query)
-                | Q(receipt_category__name__icontains=query)
-                | Q(receipt_kind__name__icontains=query)
-                | Q(receipt_name__name__icontains=query)
-                | Q(issued_to__name__icontains=query)
-                | Q(issued_by__name__icontains=query)
-                | Q(reason_of_receiving__icontains=query)
-            )
-
-        # === Handle Grouping ===
-        if group_by:
-            response_data = self.handle_grouping(receipts, group_by)
-            if isinstance(response_data, dict) and "error" in response_data:
-                return Response(response_data, status=status.HTTP_400_BAD_REQUEST)
-            return Response(response_data)
+        if "items" in fields:
+            lines = ReceiptLine.objects.select_related("item")
+            if tax_type:
+                lines = lines.filter(tax_type__iexact=tax_type)
+            receipts = receipts.prefetch_related(Prefetch("items", queryset=lines))
 
-        # === Default: Serialize Full Receipt List ===
-        results = []
-        for r in receipts:
-            items_qs = r.items.all()
-            tax_type_filter = request.query_params.get("tax_type")
-            if tax_type_filter:
-                items_qs = items_qs.filter(tax_type__iexact=tax_type_filter)
+        return receipts
 
-            subtotal = sum(line.subtotal for line in items_qs)
-            tax = sum(line.tax_amount for line in items_qs)
-            total = subtotal + tax
-            items_data = []
-            for item in items_qs:
-                items_data.append(
+    def serialize_receipt(self, r, fields):
+        row = {}
+        for name in fields:
+            if name == "receipt_number":
+                row[name] = r.receipt_number
+            elif name == "receipt_date":
+                row[name] = r.receipt_date
+            elif name == "calendar_type":
+                row[name] = r.get_calendar_type_display()
+            elif name == "issued_by":
+                row[name] = r.issued_by.name
+            elif name == "issued_to":
+                row[name] = r.issued_to.name
+            elif name == "category":
+                row[name] = r.receipt_category.name if r.receipt_category else None
+            elif name == "kind":
+                row[name] = r.receipt_kind.name
+            elif name == "name":
+                row[name] = r.receipt_name.name
+            elif name == "type":
+                row[name] = r.receipt_type.name
+            elif name == "subtotal":
+                row[name] = float(r.line_subtotal)
+            elif name == "tax":
+                row[name] = float(r.line_tax)
+            elif name == "total":
+                row[name] = float(r.line_subtotal + r.line_tax)
+            elif name == "claimable_vat":
+                row[name] = float(Decimal("0.00") if r.is_vat_expired else r.annotated_tax)
+            elif name == "non_claimable_vat":
+                row[name] = float(r.annotated_tax if r.is_vat_expired else Decimal("0.00"))
+            elif name == "is_vat_expired":
+                row[name] = r.is_vat_expired
+            elif name == "reason":
+                row[name] = r.reason_of_receiving
+            elif name == "created_at":
+                row[name] = r.created_at
+            elif name == "items":
+                row[name] = [
                     {
-                        "item_code": item.item.item_code,
-                        "item_description": item.item.item_description,
-                        "quantity": float(item.quantity),
-                        "unit_cost": float(item.item.unit_cost),
-                        "subtotal": float(item.subtotal),
-                        "tax_type": item.item.tax_type,
-                        "tax_amount": float(item.tax_amount),
-                        "total":float(item.tax_amount +item.subtotal)
-                        
+                        "item_code": line.item.item_code,
+                        "item_description": line.item_description,
+                        "quantity": float(line.quantity),
+                        "unit_cost": float(line.unit_cost),
+                        "subtotal": float(line.subtotal),
+                        "tax_type": line.tax_type,
+                        "tax_amount": float(line.tax_amount),
+                        "total": float(line.tax_amount + line.subtotal),
                     }
-                )
-
-            results.append(
-                {
-                    "receipt_number": r.receipt_number,
-                    "receipt_date": r.receipt_date,
-                    "calendar_type": r.get_calendar_type_display(),
-                    "issued_by": r.issued_by.name,
-                    "issued_to": r.issued_to.name,
-                    "category": r.receipt_category.name if r.receipt_category else None,
-                    "kind": r.receipt_kind.name,
-                    "name": r.receipt_name.name,
-                    "type": r.receipt_type.name,
-                    "subtotal": float(subtotal),
-                    "tax": float(tax),
-                    "total": float(total),
-                    "claimable_vat": float(r.claimable_vat),
-                    "non_claimable_vat": float(r.non_claimable_vat),
-                    "is_vat_expired": r.is_vat_expired,
-                    "reason": r.reason_of_receiving,
-                    "created_at": r.created_at,
-                    "items": items_data,
-                }
-            )
+                    for line in r.items.all()
+                ]
+        return row
 
-        return Response(
-            {
-                "grouped": False,
-                "count": len(results),
-                "data": results,
-            }
+    def archived_receipts(self, params):
+        """Stubs of archived receipts matching the filters (see ReceiptArchive)."""
+        stubs = ArchivedReceipt.objects.select_related(
+            "receipt_category",
+            "receipt_kind",
+            "receipt_name",
+            "receipt_type",
+            "issued_to",
+            "issued_by",
         )
+        return filter_archived_receipts(stubs, params)
+
+    def serialize_archived(self, stub, fields):
+        """
+        Same row as serialize_receipt plus the id (GET /api/receipts/{id}/
+        has the items). Totals are over all the receipt's lines.
+        """
+        tax = stub.tax
+        expired = is_date_expired(stub.receipt_date)
+        values = {
+            "receipt_number": stub.receipt_number,
+            "receipt_date": stub.receipt_date,
+            "calendar_type": dict(Receipt.CALENDAR_CHOICES).get(stub.calendar_type, stub.calendar_type),
+            "issued_by": stub.issued_by.name,
+            "issued_to": stub.issued_to.name,
+            "category": stub.receipt_category.name if stub.receipt_category else None,
+            "kind": stub.receipt_kind.name,
+            "name": stub.receipt_name.name,
+            "type": stub.receipt_type.name,
+            "subtotal": float(stub.subtotal),
+            "tax": float(tax),
+            "total": float(stub.subtotal + tax),
+            "claimable_vat": float(Decimal("0.00") if expired else tax),
+            "non_claimable_vat": float(tax if expired else Decimal("0.00")),
+            "is_vat_expired": expired,
+            "reason": stub.reason_of_receiving,
+            "created_at": stub.created_at,
+        }
+        row = {"id": stub.id}
+        row.update((name, values[name]) for name in fields if name in values)
+        return row
 
     def handle_grouping(self, receipts, group_by):
         """Handles dynamic grouping using database-level calculations."""
+        grouped = self.grouping_queryset(receipts, group_by)
+        if isinstance(grouped, dict):
+            return grouped  # Invalid group_by
+        return {
+            "grouped": True,
+            "group_by": group_by,
+            "data": list(grouped),
+        }
+
+    def grouping_queryset(self, receipts, group_by):
+        """The grouped values() queryset, or an {"error": ...} dict for an unknown group_by."""
         group_mapping = {
             "category": "receipt_category__name",
             "kind": "receipt_kind__name",
@@ -285,11 +381,7 @@ class ReceiptSearchView(APIView):
                     "expired_vat",
                 )
             )
-            return {
-                "grouped": True,
-                "group_by": "vat_status",
-                "data": list(data),
-            }
+            return data
 
         # Normal grouping
         field = group_mapping.get(group_by)
@@ -365,9 +457,4 @@ class ReceiptSearchView(APIView):
             ),
             total_expired_vat=Sum("expired_vat"),
         )
-
-        return {
-            "grouped": True,
-            "group_by": group_by,
-            "data": list(annotated),
-        }
+        return annotated
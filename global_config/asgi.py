@@ -2,6 +2,9 @@
 ASGI config for receipt_management project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serves the read endpoints with their async variants (ASYNC_READ_VIEWS), e.g.
+
+    uvicorn global_config.asgi:application --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -11,6 +14,15 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'receipt_management.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'global_config.settings')
+os.environ.setdefault('ASYNC_READ_VIEWS', 'True')
 
 application = get_asgi_application()
+
+# Connect (or fill the pool) before the first request, as in wsgi.py
+from django.conf import settings  # noqa: E402
+
+if settings.DB_WARMUP:
+    from core.services.db_warmup import warm_up
+
+    warm_up()
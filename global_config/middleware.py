@@ -16,7 +16,7 @@ class JwtAuthMiddleware(MiddlewareMixin):
             return None
 
         # Public paths
-        public_paths = ["/swagger/", "/redoc/", "/api/docs/"]
+        public_paths = ["/swagger/", "/redoc/", "/api/docs/", "/metrics"]
         if any(request.path.startswith(path) for path in public_paths):
             return None
 
@@ -44,4 +44,325 @@ class JwtAuthMiddleware(MiddlewareMixin):
         except Exception as e:
             return JsonResponse({"error": str(e)}, status=401)
 
-        return None
\ No newline at end of file
+        return None
+
+# ========================
+# Response compression
+# ========================
+import gzip
+import re
+
+from decouple import config
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_sequence
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli or gzip, picked from the client's
+    Accept-Encoding (q-values honoured, brotli preferred on a tie).
+
+    - only bodies >= RESPONSE_COMPRESSION_MIN_BYTES (default 1 KiB)
+    - only text-like content types (JSON, CSV, HTML, ...), never PDFs/images
+    - responses that already carry a Content-Encoding are left untouched
+    - byte-range capable responses (file downloads) are sent as stored
+    - streaming responses are gzipped on the fly
+    """
+
+    min_bytes = config("RESPONSE_COMPRESSION_MIN_BYTES", default=1024, cast=int)
+    gzip_level = 6
+    brotli_quality = 5  # Good ratio at a fraction of the max-quality CPU cost
+
+    COMPRESSIBLE_TYPES = (
+        "application/json",
+        "application/javascript",
+        "application/xml",
+        "text/",
+    )
+    _coding_re = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$")
+
+    @classmethod
+    def accepted_encodings(cls, header: str) -> dict:
+        """'br;q=1.0, gzip;q=0.8, *;q=0' → {'br': 1.0, 'gzip': 0.8, '*': 0.0}"""
+        accepted = {}
+        for part in (header or "").lower().split(","):
+            match = cls._coding_re.match(part)
+            if not match:
+                continue
+            try:
+                quality = float(match.group(2)) if match.group(2) else 1.0
+            except ValueError:
+                continue
+            accepted[match.group(1)] = quality
+        return accepted
+
+    def choose_encoding(self, header: str, streaming: bool):
+        accepted = self.accepted_encodings(header)
+        wildcard = accepted.get("*", 0.0)
+        candidates = ["gzip"] if (streaming or brotli is None) else ["br", "gzip"]
+        best, best_quality = None, 0.0
+        for coding in candidates:
+            quality = accepted.get(coding, wildcard)
+            if quality > best_quality:
+                best, best_quality = coding, quality
+        return best
+
+    def is_compressible(self, response) -> bool:
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        return content_type.startswith(self.COMPRESSIBLE_TYPES) or content_type.endswith("+json")
+
+    def compress(self, content: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(content, quality=self.brotli_quality)
+        return gzip.compress(content, compresslevel=self.gzip_level, mtime=0)
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding") or not self.is_compressible(response):
+            return response
+        # Range offsets refer to the stored bytes, not a compressed stream
+        if response.status_code == 206 or response.get("Accept-Ranges") == "bytes":
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+        if response.streaming and getattr(response, "is_async", False):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self.choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""), response.streaming
+        )
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_sequence(response.streaming_content)
+            # Compressed size is unknown until the stream ends
+            del response.headers["Content-Length"]
+        else:
+            compressed = self.compress(response.content, encoding)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # Compressed bytes differ from the original: strong ETags become weak
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+# ========================
+# Request instrumentation
+# ========================
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+instrumentation_logger = logging.getLogger("global_config.instrumentation")
+
+
+class _QueryRecorder:
+    """connection.execute_wrapper callback: counts and times every statement."""
+
+    MAX_SQL_LENGTH = 500
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = 0.0
+        self.slowest_sql = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.count += 1
+            self.total += duration
+            if duration >= self.slowest:
+                self.slowest = duration
+                self.slowest_sql = sql[: self.MAX_SQL_LENGTH]  # Statement only, never params
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Opt-in (REQUEST_INSTRUMENTATION=True) per-request metrics:
+    SQL query count / total time / slowest statement, view name, company
+    TIN, response size and wall time.
+
+    - one JSON log line per request on the "global_config.instrumentation"
+      logger; WARNING with "flags" when over REQUEST_INSTRUMENTATION_MAX_QUERIES
+      queries or REQUEST_INSTRUMENTATION_SLOW_MS milliseconds, INFO otherwise
+    - a Server-Timing header (db / app / total) for browser dev tools
+
+    Sits right outside JwtAuthMiddleware, so request.company_tin is known by
+    the time the response comes back. Sizes are before compression; for
+    streaming responses only the queries run before the first byte count.
+    Under ASGI, queries a view runs on other threads (gather_queries) are
+    not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "REQUEST_INSTRUMENTATION", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.max_queries = getattr(settings, "REQUEST_INSTRUMENTATION_MAX_QUERIES", 50)
+        self.slow_ms = getattr(settings, "REQUEST_INSTRUMENTATION_SLOW_MS", 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        recorder = _QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(recorder))
+            response = await self.get_response(request)
+        return self.record(request, response, recorder, start)
+
+    def record(self, request, response, recorder, start):
+        wall_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.total * 1000
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": self.view_name(request),
+            "status": response.status_code,
+            "company_tin": getattr(request, "company_tin", None),
+            "queries": recorder.count,
+            "db_ms": round(db_ms, 2),
+            "slowest_query_ms": round(recorder.slowest * 1000, 2),
+            "slowest_query": recorder.slowest_sql,
+            "response_bytes": None if response.streaming else len(response.content),
+            "streaming": response.streaming,
+            "wall_ms": round(wall_ms, 2),
+        }
+        flags = []
+        if recorder.count > self.max_queries:
+            flags.append("too_many_queries")
+        if wall_ms > self.slow_ms:
+            flags.append("slow")
+        if flags:
+            record["flags"] = flags
+        instrumentation_logger.log(
+            logging.WARNING if flags else logging.INFO, json.dumps(record, default=str)
+        )
+
+        response.headers["Server-Timing"] = ", ".join([
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries"',
+            f"app;dur={max(wall_ms - db_ms, 0):.1f}",
+            f"total;dur={wall_ms:.1f}",
+        ])
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, "resolver_match", None)
+        if match is None:
+            return None
+        return match.view_name or match._func_path
+
+
+# ========================
+# Read-replica routing
+# ========================
+from global_config import routers
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Sends the reads of GET/HEAD requests to views marked
+    `use_read_replica = True` to a read replica (global_config/routers.py),
+    unless the company wrote within DB_REPLICA_STICKY_SECONDS. Pins the
+    company to the primary after a request that writes.
+
+    Not loaded without DATABASE_REPLICAS. Streaming responses (CSV export)
+    keep reading from the same replica while their body is produced.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "DATABASE_REPLICAS", None):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        scope = routers.ReplicaScope()
+        request.replica_scope = scope
+        with routers.replica_scope(scope):
+            response = self.get_response(request)
+        if self.should_pin(request, scope):
+            routers.pin_to_primary(getattr(request, "company_tin", None))
+        if response.streaming and scope.alias is not None and not scope.wrote:
+            response.streaming_content = self.in_scope(response.streaming_content, scope)
+        return response
+
+    async def __acall__(self, request):
+        scope = routers.ReplicaScope()
+        request.replica_scope = scope
+        with routers.replica_scope(scope):
+            response = await self.get_response(request)
+        if self.should_pin(request, scope):
+            await sync_to_async(routers.pin_to_primary)(getattr(request, "company_tin", None))
+        if response.streaming and scope.alias is not None and not scope.wrote and not response.is_async:
+            response.streaming_content = self.in_scope(response.streaming_content, scope)
+        return response
+
+    @staticmethod
+    def should_pin(request, scope):
+        return scope.wrote or request.method not in ("GET", "HEAD", "OPTIONS")
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return None
+        view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+        if getattr(view_class or view_func, "use_read_replica", False):
+            if not routers.is_pinned(getattr(request, "company_tin", None)):
+                request.replica_scope.alias = routers.pick_replica()
+        return None
+
+    @staticmethod
+    def in_scope(chunks, scope):
+        """Re-enter the request's scope around each chunk the server pulls."""
+        chunks = iter(chunks)
+        while True:
+            with routers.replica_scope(scope):
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            yield chunk
@@ -1,30 +1,99 @@
-# myproject/routers.py
+# global_config/routers.py
+"""
+Read-replica routing (settings.DATABASE_REPLICAS, see DB_REPLICA_HOSTS).
 
-class AuthDatabaseRouter:
-    """
-    A router to control database operations on the custom User model.
-    """
-    route_app_labels = {'auth', 'core'}  # Adjust if User is in 'core'
+Writes always go to "default". Reads go to a replica only inside a replica
+scope, and only until the scope writes or enters a transaction:
 
+- ReplicaRoutingMiddleware opens one for GET/HEAD requests to views whose
+  class sets `use_read_replica = True` (search, receipt and document lists,
+  exports); GET and HEAD only, so the same class can still write on POST
+- read_replica() opens one explicitly, e.g. in export jobs
+
+Read-your-writes: a request that writes, and any POST/PUT/PATCH/DELETE,
+pins its company to the primary for DB_REPLICA_STICKY_SECONDS (a cache
+flag, so it holds across workers). Keep that above the replicas' usual lag.
+"""
+
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_KEY = "replica_pin:{}"
+
+
+class ReplicaScope:
+    """Where reads go for the current request / block (alias None: primary)."""
+
+    def __init__(self, alias=None, pin_on_write=True):
+        self.alias = alias
+        self.pin_on_write = pin_on_write  # First write sends the remaining reads to the primary
+        self.wrote = False
+
+
+_scope = ContextVar("replica_scope", default=None)
+
+
+def pick_replica():
+    replicas = settings.DATABASE_REPLICAS
+    return random.choice(replicas) if replicas else None
+
+
+def pin_to_primary(company_tin):
+    if company_tin:
+        cache.set(PIN_KEY.format(company_tin), True, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def is_pinned(company_tin) -> bool:
+    return bool(company_tin) and cache.get(PIN_KEY.format(company_tin)) is not None
+
+
+@contextmanager
+def replica_scope(scope):
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def read_replica(company_tin=None):
+    """Send this block's reads to a replica (unless `company_tin` wrote recently)."""
+    alias = None if is_pinned(company_tin) else pick_replica()
+    with replica_scope(ReplicaScope(alias, pin_on_write=False)) as scope:
+        yield scope
+
+
+class ReplicaRouter:
     def db_for_read(self, model, **hints):
-        if model._meta.app_label in self.route_app_labels:
-            return 'auth_db'
-        return 'default'
+        scope = _scope.get()
+        if (
+            scope is None
+            or scope.alias is None
+            or scope.wrote
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block  # Read what the transaction wrote
+        ):
+            return DEFAULT_DB_ALIAS
+        return scope.alias
 
     def db_for_write(self, model, **hints):
-        if model._meta.app_label in self.route_app_labels:
-            return 'auth_db'
-        return 'default'
+        scope = _scope.get()
+        if scope is not None and scope.pin_on_write:
+            scope.wrote = True
+        # Explicit: otherwise saving an instance read from a replica would go back to it
+        return DEFAULT_DB_ALIAS
 
     def allow_relation(self, obj1, obj2, **hints):
-        if (
-            obj1._meta.app_label in self.route_app_labels or
-            obj2._meta.app_label in self.route_app_labels
-        ):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
             return True
         return None
-
-    def allow_migrate(self, db, app_label, model_name=None, **hints):
-        if app_label in self.route_app_labels:
-            return db == 'auth_db'
-        return db == 'default'
\ No newline at end of file
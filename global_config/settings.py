@@ -1,7 +1,9 @@
+import copy
 import os
 from pathlib import Path
 from datetime import timedelta
 from decouple import config, Csv
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -17,6 +19,8 @@ DEBUG = config("DEBUG", default="True").lower() in ("true", "1", "yes")
 
 # CORS SETTINGS
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "Server-Timing"]
 
 ALLOWED_HOSTS = ["*"]
 
@@ -28,6 +32,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # Trigram lookups (contact name search)
     # Your apps
     "core",  # Make sure this app exists (apps.py, __init__.py)
     # Third-party apps
@@ -45,14 +50,25 @@ MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    # gzip/brotli for large JSON/CSV bodies
+    "global_config.middleware.CompressionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # Per-request query count / latency logs + Server-Timing (opt-in, see below)
+    "global_config.middleware.RequestInstrumentationMiddleware",
     # ✅ Custom JWT middleware (assumed for Spring Boot JWT)
     "global_config.middleware.JwtAuthMiddleware",
+    # Reads of marked views on a replica (only with DB_REPLICA_HOSTS, see below)
+    "global_config.middleware.ReplicaRoutingMiddleware",
 ]
 
+# Request instrumentation (RequestInstrumentationMiddleware): off unless enabled
+REQUEST_INSTRUMENTATION = config("REQUEST_INSTRUMENTATION", default=False, cast=bool)
+REQUEST_INSTRUMENTATION_MAX_QUERIES = config("REQUEST_INSTRUMENTATION_MAX_QUERIES", default=50, cast=int)
+REQUEST_INSTRUMENTATION_SLOW_MS = config("REQUEST_INSTRUMENTATION_SLOW_MS", default=1000, cast=int)
+
 ROOT_URLCONF = "global_config.urls"
 
 TEMPLATES = [
@@ -82,7 +98,20 @@ CACHES = {
     }
 }
 
+# Local runs (benchmark servers) without Redis: CACHE_BACKEND=locmem
+if config("CACHE_BACKEND", default="redis") == "locmem":
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 WSGI_APPLICATION = "global_config.wsgi.application"
+ASGI_APPLICATION = "global_config.asgi.application"
+
+# Async variants of the read endpoints (core/views/AsyncReadViews.py);
+# global_config/asgi.py turns this on, WSGI workers keep the sync views
+ASYNC_READ_VIEWS = config("ASYNC_READ_VIEWS", default=False, cast=bool)
+# Run an async view's independent queries (page + count, the four lookup
+# tables, ...) at the same time, each on its own connection. Needs a pool
+# (DB_POOL) or persistent connections sized for it; off: one after another.
+ASYNC_PARALLEL_QUERIES = config("ASYNC_PARALLEL_QUERIES", default=False, cast=bool)
 
 # ✅ Neon Database Configuration
 DATABASES = {
@@ -97,9 +126,78 @@ DATABASES = {
             "sslmode": "require",
             "channel_binding": config("DB_CHANNEL_BINDING", default="require"),
         },
+        # Reuse connections across requests instead of a TCP+TLS+SCRAM
+        # handshake per request; health checks drop ones the server closed
+        "CONN_MAX_AGE": config("DB_CONN_MAX_AGE", default=60, cast=int),
+        "CONN_HEALTH_CHECKS": True,
     },
 }
 
+# psycopg 3 connection pool per process (DB_POOL=True, needs psycopg[pool]).
+# Replaces CONN_MAX_AGE: the pool keeps DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE
+# connections open and hands them to requests, checking them on checkout.
+if config("DB_POOL", default=False, cast=bool):
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": config("DB_POOL_MIN_SIZE", default=2, cast=int),
+        "max_size": config("DB_POOL_MAX_SIZE", default=10, cast=int),
+        "timeout": config("DB_POOL_TIMEOUT", default=10, cast=float),  # Wait for a free connection
+        "max_idle": config("DB_POOL_MAX_IDLE", default=300, cast=float),
+    }
+
+# Server-side prepared statements (psycopg 3 only; off by default because
+# the Neon "-pooler" endpoint is PgBouncer in transaction mode, which needs
+# max_prepared_statements set to support them)
+DB_PREPARE_THRESHOLD = config("DB_PREPARE_THRESHOLD", default=0, cast=int)
+if DB_PREPARE_THRESHOLD:
+    DATABASES["default"]["OPTIONS"]["server_side_binding"] = True
+    DATABASES["default"]["OPTIONS"]["prepare_threshold"] = DB_PREPARE_THRESHOLD
+
+# Open connections (or the pool) and run the hot statements when a worker
+# starts, see core/services/db_warmup.py
+DB_WARMUP = config("DB_WARMUP", default=False, cast=bool)
+
+# Local runs (benchmarks, query-count checks) without Postgres: DB_ENGINE=sqlite
+if config("DB_ENGINE", default="postgresql") == "sqlite":
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": config("SQLITE_PATH", default=str(BASE_DIR / "db.sqlite3")),
+    }
+
+# Read replicas (global_config/routers.py): same credentials as the primary,
+# one alias per host. Search, document lists and exports read from them.
+# With DB_ENGINE=sqlite, SQLITE_REPLICA_PATHS adds separate files as
+# stand-ins (not replicated: what the tests use to tell the two apart).
+DATABASE_REPLICAS = []
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    for index, path in enumerate(config("SQLITE_REPLICA_PATHS", default="", cast=Csv()), start=1):
+        DATABASES[f"replica_{index}"] = {"ENGINE": "django.db.backends.sqlite3", "NAME": path}
+        DATABASE_REPLICAS.append(f"replica_{index}")
+else:
+    for index, host in enumerate(config("DB_REPLICA_HOSTS", default="", cast=Csv()), start=1):
+        DATABASES[f"replica_{index}"] = {
+            **DATABASES["default"],
+            "HOST": host,
+            "OPTIONS": copy.deepcopy(DATABASES["default"]["OPTIONS"]),
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_REPLICAS.append(f"replica_{index}")
+DATABASE_ROUTERS = ["global_config.routers.ReplicaRouter"]
+# After a write, a company reads from the primary for this long (> replica lag)
+DB_REPLICA_STICKY_SECONDS = config("DB_REPLICA_STICKY_SECONDS", default=10, cast=int)
+
+# Postgres range partitioning of receipts and lines by fiscal year (opt-in:
+# `manage.py partition_receipts --convert`, see core/services/receipt_partitions.py).
+# With it on, `migrate` also creates the partitions for the coming years.
+RECEIPT_PARTITIONING = config("RECEIPT_PARTITIONING", default=False, cast=bool)
+RECEIPT_FISCAL_YEAR_START = config("RECEIPT_FISCAL_YEAR_START", default="07-08")  # MM-DD (Hamle 1)
+RECEIPT_PARTITION_YEARS_AHEAD = config("RECEIPT_PARTITION_YEARS_AHEAD", default=2, cast=int)
+
+# Cold archive (`manage.py archive_receipts`, see core/services/receipt_archive.py):
+# receipts of fiscal years older than the current one and this many closed
+# ones move to gzipped JSON Lines files in media storage, behind stubs.
+RECEIPT_ARCHIVE_KEEP_YEARS = config("RECEIPT_ARCHIVE_KEEP_YEARS", default=5, cast=int)
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = "/static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
@@ -118,6 +216,11 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 40,
+    # orjson-backed JSON (falls back to the stdlib renderer if orjson is missing)
+    "DEFAULT_RENDERER_CLASSES": [
+        "global_config.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 # JWT Settings
@@ -144,3 +247,19 @@ SWAGGER_SETTINGS = {
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
 SESSION_CACHE_ALIAS = "default"
+
+# Logging: instrumentation lines go to stdout (gunicorn / container logs)
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "global_config.instrumentation": {
+            "handlers": ["console"],
+            "level": config("REQUEST_INSTRUMENTATION_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -6,6 +6,9 @@ from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 
+from core import api_urls
+from core.views.MetricsView import metrics_view
+
 schema_view = get_schema_view(
     openapi.Info(
         title="Receipt Management API",
@@ -17,11 +20,13 @@ schema_view = get_schema_view(
     ),
     public=True,
     permission_classes=[permissions.AllowAny],
+    patterns=[path('api/', include(api_urls.sync_urlpatterns))],  # Not the ASGI variants
 )
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('core.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 
     # Swagger docs
     re_path(r'^swagger(?P<format>\.json|\.yaml)$', schema_view.without_ui(cache_timeout=0), name='schema-json'),
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'global_config.settings')
 
 application = get_wsgi_application()
+
+# Connect (or fill the pool) before the first request. Per worker: don't
+# combine with gunicorn --preload, forked workers must not share connections.
+from django.conf import settings  # noqa: E402
+
+if settings.DB_WARMUP:
+    from core.services.db_warmup import warm_up
+
+    warm_up()